@@ -1,10 +1,15 @@
 # admin.py faylini to'g'rilaymiz
 
 from django.contrib import admin
-from .models import Course, Module, Lesson, Question, Answer, UserProgress, UserQuestion, ListeningLesson, \
-    ListeningQuestion, ListeningOption, GapFillingQuestion, GapOption, TrueFalseNotGiven, MatchingQuestion, SpeakingLesson, SpeakingQuestion, SpeakingAttempt,ReadingLesson, ReadingQuestion, ReadingAnswer, UserReadingProgress
+from .models import Course, Module, Lesson, Question, Answer, LessonProgress, UserQuestion, ListeningLesson, \
+    ListeningQuestion, ListeningOption, GapFillingQuestion, GapOption, TrueFalseNotGiven, MatchingQuestion, SpeakingLesson, SpeakingQuestion, SpeakingAttempt,TTSCacheEntry,ChunkedUpload,ReadingLesson, ReadingQuestion, ReadingAnswer, UserReadingProgress
+from django.conf import settings
+from django.template.response import TemplateResponse
+from django.urls import path
 from django.utils.html import format_html
 
+from .timing import stage_percentiles
+
 
 @admin.register(Course)
 class CourseAdmin(admin.ModelAdmin):
@@ -73,11 +78,17 @@ class LessonAdmin(admin.ModelAdmin):
     video_preview.short_description = 'Video manbasi'
 
 
-@admin.register(UserProgress)
-class UserProgressAdmin(admin.ModelAdmin):
-    list_display = ('user', 'lesson', 'completed', 'score', 'completed_at')
-    list_filter = ('completed', 'lesson__module__course')
-    search_fields = ('user__username', 'lesson__title')
+@admin.register(LessonProgress)
+class LessonProgressAdmin(admin.ModelAdmin):
+    list_display = ('user', 'content_object', 'content_type', 'completed', 'score', 'completed_at')
+    list_filter = ('completed', 'content_type')
+    search_fields = ('user__username',)
+    list_select_related = ('user', 'content_type')
+
+    def get_queryset(self, request):
+        # content_object (va uning __str__ idagi modul) - har bir qator uchun alohida so'rov emas,
+        # dars turi bo'yicha bittadan
+        return super().get_queryset(request).prefetch_related('content_object__module')
 
 
 @admin.register(UserQuestion)
@@ -153,12 +164,35 @@ class SpeakingLessonAdmin(admin.ModelAdmin):
     )
 
 
+class StageLatencyAdminMixin:
+    """Urinishlar ro'yxatiga bosqichlar kechikishi sahifasi (<model>/latency/)"""
+    pipeline = None
+
+    def get_urls(self):
+        opts = self.model._meta
+        return [
+            path('latency/', self.admin_site.admin_view(self.latency_view),
+                 name=f'{opts.app_label}_{opts.model_name}_latency'),
+        ] + super().get_urls()
+
+    def latency_view(self, request):
+        context = dict(
+            self.admin_site.each_context(request),
+            opts=self.model._meta,
+            title=f"{self.model._meta.verbose_name_plural}: bosqichlar kechikishi (ms)",
+            rows=stage_percentiles(self.pipeline, self.model, limit=settings.STAGE_LATENCY_SAMPLE),
+            sample=settings.STAGE_LATENCY_SAMPLE,
+        )
+        return TemplateResponse(request, 'admin/stage_latency.html', context)
+
+
 @admin.register(SpeakingAttempt)
-class SpeakingAttemptAdmin(admin.ModelAdmin):
+class SpeakingAttemptAdmin(StageLatencyAdminMixin, admin.ModelAdmin):
+    pipeline = 'speaking'
     list_display = ('user', 'speaking_lesson', 'overall_score', 'duration', 'created_at')
     list_filter = ('speaking_lesson__module__course', 'speaking_lesson', 'created_at')
     search_fields = ('user__username', 'speaking_lesson__title', 'transcript')
-    readonly_fields = ('created_at',)
+    readonly_fields = ('created_at', 'stage_timings')
 
     fieldsets = (
         ('Asosiy ma\'lumotlar', {
@@ -173,8 +207,18 @@ class SpeakingAttemptAdmin(admin.ModelAdmin):
         ('Tahlil', {
             'fields': ('ai_feedback', 'suggestions')
         }),
+        ('Bosqichlar vaqti', {
+            'fields': ('stage_timings',)
+        }),
     )
 
+
+@admin.register(TTSCacheEntry)
+class TTSCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('key', 'engine', 'lang', 'size', 'hits', 'last_used_at')
+    list_filter = ('engine', 'lang')
+    readonly_fields = ('key', 'created_at', 'last_used_at')
+
 class ReadingAnswerInline(admin.TabularInline):
     model = ReadingAnswer
     extra = 4
@@ -232,11 +276,12 @@ from django.utils.html import format_html
 # ... avvalgi adminlar ...
 
 @admin.register(WritingAttempt)
-class WritingAttemptAdmin(admin.ModelAdmin):
+class WritingAttemptAdmin(StageLatencyAdminMixin, admin.ModelAdmin):
+    pipeline = 'writing'
     list_display = ('user', 'writing_lesson', 'overall_score', 'word_count', 'created_at')
     list_filter = ('writing_lesson__module__course', 'writing_lesson', 'created_at')
     search_fields = ('user__username', 'writing_lesson__title', 'answer_text')
-    readonly_fields = ('created_at',)
+    readonly_fields = ('created_at', 'stage_timings')
 
     fieldsets = (
         ('Asosiy ma\'lumotlar', {
@@ -248,6 +293,9 @@ class WritingAttemptAdmin(admin.ModelAdmin):
         ('Tahlil', {
             'fields': ('ai_feedback', 'suggestions')
         }),
+        ('Bosqichlar vaqti', {
+            'fields': ('stage_timings',)
+        }),
     )
 
 
@@ -286,4 +334,10 @@ class WritingLessonAdmin(admin.ModelAdmin):
 class UserWritingProgressAdmin(admin.ModelAdmin):
     list_display = ('user', 'writing_lesson', 'score', 'best_score', 'completed', 'attempts_count', 'completed_at')
     list_filter = ('completed', 'writing_lesson__module__course')
-    search_fields = ('user__username', 'writing_lesson__title')
\ No newline at end of file
+    search_fields = ('user__username', 'writing_lesson__title')
+
+@admin.register(ChunkedUpload)
+class ChunkedUploadAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'target', 'object_id', 'received', 'size', 'status', 'verify_status', 'user', 'updated_at')
+    list_filter = ('status', 'target')
+    readonly_fields = ('id', 'file_name', 'received', 'sha256', 'verify_status', 'verify_updated_at', 'created_at', 'updated_at')
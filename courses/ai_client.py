@@ -0,0 +1,136 @@
+# courses/ai_client.py - Jarayon bo'yicha umumiy (qayta ishlatiladigan) GigaChat klienti
+#
+# Har bir tahlil uchun yangi GigaChat(...) ochilsa, har safar TLS ulanishi va
+# OAuth token qaytadan olinadi. Bu yerda bitta klient saqlanadi: httpx ulanishlari
+# keep-alive orqali qayta ishlatiladi, token esa muddati tugaguncha keshda turadi.
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import httpx
+from django.conf import settings
+from gigachat import GigaChat
+
+logger = logging.getLogger(__name__)
+
+
+class GigaChatClientManager:
+    """GigaChat klienti, bir vaqtdagi so'rovlar chegarasi va statistika"""
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+        self._slots = None
+        self._listeners = []
+        self._stats = {
+            'calls': 0,
+            'failures': 0,
+            'clients_created': 0,
+            'warm_calls': 0,
+            'token_refreshes': 0,
+            'token_reuses': 0,
+            'total_seconds': 0.0,
+        }
+
+    @property
+    def slots(self):
+        """Bir vaqtda bajariladigan so'rovlar semafori (AI_MAX_CONCURRENT_CALLS)"""
+        if self._slots is None:
+            with self._lock:
+                if self._slots is None:
+                    self._slots = threading.BoundedSemaphore(settings.AI_MAX_CONCURRENT_CALLS)
+        return self._slots
+
+    def get_client(self):
+        """Mavjud klientni qaytarish yoki yangisini yaratish"""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = GigaChat(
+                        credentials=settings.GIGACHAT_CREDENTIALS,
+                        verify_ssl_certs=settings.GIGACHAT_VERIFY_SSL_CERTS,
+                        model=settings.GIGACHAT_MODEL,
+                        timeout=settings.GIGACHAT_TIMEOUT,
+                    )
+                    self._stats['clients_created'] += 1
+        return self._client
+
+    def reset(self):
+        """Klientni yopish (keyingi so'rovda yangisi yaratiladi)"""
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            try:
+                client.close()
+            except Exception:
+                logger.exception("GigaChat client close failed")
+
+    @contextmanager
+    def session(self):
+        """Semafor slotini egallab, umumiy klientni berish.
+
+        Foydalanish:
+            with gigachat_client.session() as giga:
+                response = giga.chat(prompt)
+        """
+        with self.slots:
+            warm = self._client is not None
+            client = self.get_client()
+            token_before = client.token
+            started = time.perf_counter()
+            ok = False
+            try:
+                yield client
+                ok = True
+            except httpx.TransportError:
+                # Ulanish buzilgan - keyingi so'rov yangi klient bilan ochiladi
+                self.reset()
+                raise
+            finally:
+                token_reused = token_before is not None and client.token == token_before
+                self._record({
+                    'event': 'gigachat.session',
+                    'ok': ok,
+                    'duration': time.perf_counter() - started,
+                    'warm_client': warm,
+                    'token_reused': token_reused,
+                })
+
+    def _record(self, event):
+        with self._lock:
+            self._stats['calls'] += 1
+            self._stats['total_seconds'] += event['duration']
+            if not event['ok']:
+                self._stats['failures'] += 1
+            if event['warm_client']:
+                self._stats['warm_calls'] += 1
+            if event['token_reused']:
+                self._stats['token_reuses'] += 1
+            else:
+                self._stats['token_refreshes'] += 1
+            listeners = list(self._listeners)
+
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception:
+                logger.exception("GigaChat instrumentation listener failed")
+
+    def add_listener(self, callback):
+        """Har bir so'rovdan keyin chaqiriladigan funksiya (event dict qabul qiladi)"""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        with self._lock:
+            self._listeners.remove(callback)
+
+    def stats(self):
+        """Keep-alive va token qayta ishlatilishi statistikasi"""
+        with self._lock:
+            return dict(self._stats)
+
+
+gigachat_client = GigaChatClientManager()
@@ -0,0 +1,130 @@
+# courses/answer_keys.py - Testlar uchun kompilyatsiya qilingan javoblar kalitlari
+#
+# Kalit - {forma maydoni: to'g'ri javob}; grading.grade() shu kalit bo'yicha baholaydi.
+# Har bir kalit savollar sonidan qat'i nazar o'zgarmas miqdordagi so'rov bilan yig'iladi.
+
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from .metrics import record_cache, record_cache_lookup
+from .models import Answer, ListeningOption, Question, ReadingAnswer, ReadingQuestion
+
+logger = logging.getLogger(__name__)
+
+ANSWER_KEY_CACHE_KEY = 'listening_answer_key:{lesson_id}:{version}'
+
+
+def compile_listening_answer_key(listening):
+    """Listening darsi uchun javoblar kalitini yig'ish.
+
+    Natija: {forma maydoni nomi: normallashtirilgan to'g'ri javob}. To'g'ri varianti
+    belgilanmagan multiple choice savollari uchun qiymat None bo'ladi.
+    """
+    answer_key = {}
+
+    if listening.listening_type == 'multiple_choice':
+        correct_options = Prefetch('options', queryset=ListeningOption.objects.filter(is_correct=True),
+                                   to_attr='correct_options')
+        for question in listening.questions.prefetch_related(correct_options):
+            correct_option = question.correct_options[0] if question.correct_options else None
+            answer_key[f'question_{question.id}'] = str(correct_option.id) if correct_option else None
+
+    elif listening.listening_type == 'gap_filling':
+        for gap in listening.gap_fillings.prefetch_related('options'):
+            for gap_opt in gap.options.all():
+                answer_key[f'gap_{gap.id}_{gap_opt.gap_letter}'] = gap_opt.correct_word.lower()
+
+    elif listening.listening_type == 'true_false_not_given':
+        for tfng in listening.tfng_questions.all():
+            answer_key[f'tfng_{tfng.id}'] = tfng.correct_answer
+
+    elif listening.listening_type == 'matching':
+        for match in listening.matching_questions.all():
+            try:
+                correct_matches = json.loads(match.correct_matches)
+            except ValueError:
+                correct_matches = None
+            # Admin kiritgan JSON obyekt bo'lmasa ([], null, "...") savol baholanmaydi
+            if not isinstance(correct_matches, dict):
+                logger.warning("Matching question #%s has invalid correct_matches", match.id,
+                               extra={'listening_id': listening.id, 'match_id': match.id})
+                continue
+            for key, value in correct_matches.items():
+                answer_key[f'match_{match.id}_{key}'] = str(value)
+
+    return answer_key
+
+
+def get_listening_answer_key(listening):
+    """Javoblar kalitini keshdan olish. Kalit versiyasi - darsning updated_at vaqti."""
+    key = ANSWER_KEY_CACHE_KEY.format(lesson_id=listening.id,
+                                      version=int(listening.updated_at.timestamp() * 1000000))
+    answer_key = cache.get(key)
+    record_cache_lookup('answer_key', answer_key)
+    if answer_key is None:
+        answer_key = compile_listening_answer_key(listening)
+        cache.set(key, answer_key, settings.ANSWER_KEY_CACHE_TIMEOUT)
+    return answer_key
+
+
+def correct_choice_keys(questions, answer_model, owner_field, gradable=None):
+    """MCQ savollari: {dars id: {question_<id>: to'g'ri variant id (str) yoki None}}.
+
+    gradable(question) False bo'lgan savollar uchun ham qiymat None.
+    """
+    correct_choices = Prefetch('answers', queryset=answer_model.objects.filter(is_correct=True),
+                               to_attr='correct_choices')
+    answer_keys = {}
+    for question in questions.prefetch_related(correct_choices):
+        correct_choice = question.correct_choices[0] if question.correct_choices else None
+        if gradable is not None and not gradable(question):
+            correct_choice = None
+        answer_keys.setdefault(getattr(question, owner_field), {})[f'question_{question.id}'] = \
+            str(correct_choice.id) if correct_choice else None
+    return answer_keys
+
+
+def compile_lesson_answer_keys(lesson_ids):
+    """Bir nechta dars testi kaliti (2 ta so'rov). Faqat 'single' savollar avtomatik
+    baholanadi, qolganlari - None."""
+    questions = Question.objects.filter(lesson_id__in=lesson_ids).order_by('lesson_id', 'id')
+    return correct_choice_keys(questions, Answer, 'lesson_id',
+                               gradable=lambda question: question.question_type == 'single')
+
+
+def compile_lesson_answer_key(lesson):
+    return compile_lesson_answer_keys([lesson.id]).get(lesson.id, {})
+
+
+def compile_reading_answer_keys(reading_ids):
+    """Bir nechta reading testi kaliti (savollar tartibida, 2 ta so'rov)"""
+    questions = ReadingQuestion.objects.filter(reading_lesson_id__in=reading_ids).order_by('reading_lesson_id',
+                                                                                             'order', 'id')
+    return correct_choice_keys(questions, ReadingAnswer, 'reading_lesson_id')
+
+
+def compile_reading_answer_key(reading):
+    return compile_reading_answer_keys([reading.id]).get(reading.id, {})
+
+
+def get_listening_answer_keys(listenings):
+    """Bir nechta listening kaliti: keshdan bitta get_many, topilmaganlari kompilyatsiya qilinadi"""
+    keys = {ANSWER_KEY_CACHE_KEY.format(lesson_id=listening.id,
+                                        version=int(listening.updated_at.timestamp() * 1000000)): listening
+            for listening in listenings}
+    cached = cache.get_many(list(keys))
+    missing = {}
+    answer_keys = {}
+    for key, listening in keys.items():
+        if key in cached:
+            answer_keys[listening.id] = cached[key]
+        else:
+            answer_keys[listening.id] = missing[key] = compile_listening_answer_key(listening)
+    record_cache('answer_key', hits=len(keys) - len(missing), misses=len(missing))
+    if missing:
+        cache.set_many(missing, settings.ANSWER_KEY_CACHE_TIMEOUT)
+    return answer_keys
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class CoursesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'courses'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
+        from .ai_client import gigachat_client
+        from .metrics import record_gigachat_call
+
+        gigachat_client.add_listener(record_gigachat_call)
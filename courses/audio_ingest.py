@@ -0,0 +1,165 @@
+# courses/audio_ingest.py - STT oldidan audio faylni 16 kHz mono PCM ga keltirish
+#
+# Brauzer MediaRecorder odatda webm/opus yuboradi, fayl nomi esa .wav bo'lishi
+# mumkin - sr.AudioFile bunday faylni o'qiy olmaydi. Bu yerda konteyner fayl
+# boshidagi baytlardan aniqlanadi, ffmpeg stdout orqali oqim sifatida 16 kHz mono
+# 16-bit PCM ga dekodlanadi (vaqtinchalik fayl yo'q), boshidagi va oxiridagi
+# jimlik kesiladi. STT bosqichi ixcham PCM buferni oladi.
+
+import logging
+import operator
+import subprocess
+import time
+import wave
+
+import speech_recognition as sr
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+PCM_READ_SIZE = 64 * 1024
+
+# VAD freymi (soniya)
+FRAME_SECONDS = 0.03
+
+# sr.AudioFile ffmpeg'siz o'qiy oladigan konteynerlar
+SR_CONTAINERS = ('wav', 'aiff', 'flac')
+
+CONTAINER_EXTENSIONS = {
+    'wav': 'wav', 'aiff': 'aiff', 'flac': 'flac', 'webm': 'webm',
+    'ogg': 'ogg', 'mp3': 'mp3', 'mp4': 'm4a',
+}
+
+
+def sniff_container(header):
+    """Fayl boshidagi baytlar bo'yicha konteyner turi (noma'lum bo'lsa None)"""
+    if header[:4] == b'RIFF' and header[8:12] == b'WAVE':
+        return 'wav'
+    if header[:4] == b'FORM' and header[8:12] in (b'AIFF', b'AIFC'):
+        return 'aiff'
+    if header[:4] == b'fLaC':
+        return 'flac'
+    if header[:4] == b'\x1a\x45\xdf\xa3':
+        return 'webm'
+    if header[:4] == b'OggS':
+        return 'ogg'
+    if header[:3] == b'ID3' or (len(header) > 1 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0):
+        return 'mp3'
+    if header[4:8] == b'ftyp':
+        return 'mp4'
+    return None
+
+
+def detect_container(path):
+    with open(path, 'rb') as f:
+        return sniff_container(f.read(16))
+
+
+def is_canonical_wav(path):
+    """Fayl allaqachon 16 kHz mono 16-bit WAV mi"""
+    try:
+        with wave.open(path) as wav:
+            return (wav.getnchannels(), wav.getsampwidth(), wav.getframerate()) == (1, SAMPLE_WIDTH, SAMPLE_RATE)
+    except (wave.Error, EOFError):
+        return False
+
+
+def decode_with_ffmpeg(path):
+    """ffmpeg orqali oqim sifatida 16 kHz mono s16le PCM ga dekodlash"""
+    process = subprocess.Popen([
+        settings.FFMPEG_BINARY, '-v', 'error', '-i', path, '-vn',
+        '-ac', '1', '-ar', str(SAMPLE_RATE), '-f', 's16le', '-',
+    ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    pcm = bytearray()
+    for chunk in iter(lambda: process.stdout.read(PCM_READ_SIZE), b''):
+        pcm.extend(chunk)
+    process.stdout.close()
+    stderr = process.stderr.read().decode('utf-8', 'replace').strip()
+    process.stderr.close()
+    if process.wait() != 0:
+        raise ValueError(f"ffmpeg audio dekodlashda xato: {stderr.splitlines()[-1] if stderr else process.returncode}")
+    return bytes(pcm)
+
+
+def decode_with_sr(path):
+    """ffmpeg'siz zaxira yo'l (faqat WAV/AIFF/FLAC)"""
+    with sr.AudioFile(path) as source:
+        audio = sr.Recognizer().record(source)
+    return audio.get_raw_data(convert_rate=SAMPLE_RATE, convert_width=SAMPLE_WIDTH)
+
+
+def decode(path, container):
+    if container == 'wav' and is_canonical_wav(path):
+        with wave.open(path) as wav:
+            return wav.readframes(wav.getnframes())
+
+    try:
+        return decode_with_ffmpeg(path)
+    except (OSError, ValueError) as e:
+        if container not in SR_CONTAINERS:
+            raise
+        logger.warning("ffmpeg decode failed for %s (%s), falling back to speech_recognition", path, e)
+        return decode_with_sr(path)
+
+
+def frame_energies(raw, sample_rate):
+    """Har bir freymning o'rtacha kvadrat energiyasi (16-bit PCM)"""
+    samples = memoryview(raw).cast('h')
+    frame_size = max(1, int(sample_rate * FRAME_SECONDS))
+    energies = []
+    for offset in range(0, len(samples), frame_size):
+        frame = samples[offset:offset + frame_size]
+        energies.append(sum(map(operator.mul, frame, frame)) / len(frame))
+    return energies, frame_size
+
+
+def vad_threshold(energies):
+    """Nutq chegarasi: shovqin darajasi (eng past 10% freymlar) * STT_VAD_ENERGY_RATIO.
+
+    Jimliksiz yozuvda chegara eng baland freymdan oshib ketmasligi uchun cheklanadi.
+    """
+    if not energies:
+        return settings.STT_VAD_MIN_ENERGY
+    ordered = sorted(energies)
+    ratio = settings.STT_VAD_ENERGY_RATIO
+    floor = ordered[len(ordered) // 10]
+    return max(settings.STT_VAD_MIN_ENERGY, min(floor * ratio, ordered[-1] / ratio))
+
+
+def trim_silence(pcm, energies, frame_size, threshold, padding_frames):
+    """Boshidagi va oxiridagi jim freymlarni kesish. Natija: (pcm, boshidan kesilgan namunalar soni)"""
+    voiced = [index for index, energy in enumerate(energies) if energy >= threshold]
+    if not voiced:
+        return b'', 0
+    first = max(0, voiced[0] - padding_frames) * frame_size
+    last = min(len(energies), voiced[-1] + 1 + padding_frames) * frame_size
+    return pcm[first * SAMPLE_WIDTH:last * SAMPLE_WIDTH], first
+
+
+def ingest(path):
+    """Audio faylni STT uchun tayyorlash.
+
+    Natija: (pcm, sample_rate, stats) - pcm 16 kHz mono 16-bit, jimliklar kesilgan;
+    stats['offset'] - kesilgan boshlang'ich jimlik (soniya).
+    """
+    started = time.perf_counter()
+    container = detect_container(path)
+    pcm = decode(path, container)
+
+    energies, frame_size = frame_energies(pcm, SAMPLE_RATE)
+    padding_frames = int(settings.STT_VAD_PADDING * SAMPLE_RATE / frame_size)
+    trimmed, offset = trim_silence(pcm, energies, frame_size, vad_threshold(energies), padding_frames)
+
+    stats = {
+        'container': container or 'unknown',
+        'decoded_seconds': round(len(pcm) / SAMPLE_WIDTH / SAMPLE_RATE, 2),
+        'offset': offset / SAMPLE_RATE,
+        'trimmed_seconds': round(len(trimmed) / SAMPLE_WIDTH / SAMPLE_RATE, 2),
+        'pcm_bytes': len(trimmed),
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+    logger.info("Audio ingest %s: %s", path, stats)
+    return trimmed, SAMPLE_RATE, stats
@@ -0,0 +1,18 @@
+# courses/checks.py - `manage.py check --deploy` ogohlantirishlari
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.compatibility, deploy=True)
+def check_metrics_multiproc_dir(app_configs, **kwargs):
+    """Web va worker jarayonlari metrikalari bitta papkada jamlanishi kerak"""
+    if not settings.METRICS_ENABLED or settings.PROMETHEUS_MULTIPROC_DIR_CONFIGURED:
+        return []
+    return [Warning(
+        "PROMETHEUS_MULTIPROC_DIR sozlanmagan - metrikalar lokal vaqtinchalik papkaga yoziladi.",
+        hint="Web va `manage.py run_workers` alohida konteynerlarda ishlasa, ikkalasiga ulangan umumiy "
+             "disk papkasini PROMETHEUS_MULTIPROC_DIR ga bering, aks holda worker metrikalari /metrics da "
+             "ko'rinmaydi.",
+        id='courses.W001',
+    )]
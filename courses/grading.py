@@ -0,0 +1,81 @@
+# courses/grading.py - Obyektiv testlar uchun umumiy baholash
+#
+# Lesson, listening (MCQ, gap filling, TFNG, matching) va reading testlari bitta
+# kompilyatsiya qilingan javoblar kaliti ({forma maydoni: to'g'ri javob}) bo'yicha
+# bir o'tishda tekshiriladi. Kalitni yig'ish savollar soniga bog'liq bo'lmagan
+# o'zgarmas miqdordagi so'rov bilan bajariladi (answer_keys.py), baholashning
+# o'zi bazaga murojaat qilmaydi.
+
+from collections import namedtuple
+
+
+# Dars turi -> o'tish bali (%)
+PASS_MARKS = {
+    'video': 70,
+    'listening': 50,
+    'reading': 60,  # IELTS standard
+}
+
+
+class GradeResult(namedtuple('GradeResult', 'correct total results')):
+    """(to'g'ri javoblar soni, jami savollar soni, {maydon: correct/wrong/not_answered})"""
+    __slots__ = ()
+
+    @property
+    def score(self):
+        return (self.correct / self.total) * 100 if self.total > 0 else 0
+
+    def passed(self, lesson_type):
+        """Savolsiz test o'tilgan hisoblanmaydi"""
+        return self.total > 0 and self.score >= PASS_MARKS[lesson_type]
+
+
+def normalize_text(value):
+    return str(value).strip().lower()
+
+
+# Maydon prefiksi -> (javobni kalit ko'rinishiga keltirish, kalitsiz/javobsiz savol
+# 'not_answered' hisoblanadimi). Ro'yxatda yo'q prefikslar - str() bilan solishtiriladi.
+FIELD_RULES = {
+    'question_': (str, True),     # MCQ (lesson, listening, reading): variant id
+    'gap_': (normalize_text, False),
+    'tfng_': (str, False),
+    'match_': (str, False),
+}
+DEFAULT_RULE = (str, False)
+
+
+def field_rule(field):
+    return FIELD_RULES.get(field[:field.find('_') + 1], DEFAULT_RULE)
+
+
+def normalize_answer(field, value):
+    """Foydalanuvchi javobini kalitdagi ko'rinishga keltirish"""
+    return field_rule(field)[0](value)
+
+
+def grade(answer_key, data, fields=None):
+    """Javoblarni kalit bo'yicha bir o'tishda tekshirish (bazaga murojaatsiz).
+
+    fields - faqat shu maydonlar baholanadi (default: kalitdagi hamma maydonlar);
+    kalitda yo'q maydon noto'g'ri hisoblanadi.
+    """
+    correct = total = 0
+    results = {}
+    missing = object()
+
+    for field in answer_key if fields is None else fields:
+        total += 1
+        expected = answer_key.get(field, missing)
+        user_answer = data.get(field)
+        normalize, unanswerable = field_rule(field)
+
+        if unanswerable and (not user_answer or expected is None):
+            results[field] = 'not_answered'
+        elif user_answer and expected is not missing and normalize(user_answer) == expected:
+            correct += 1
+            results[field] = 'correct'
+        else:
+            results[field] = 'wrong'
+
+    return GradeResult(correct, total, results)
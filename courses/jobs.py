@@ -0,0 +1,234 @@
+# courses/jobs.py - Ma'lumotlar bazasi jadvali asosidagi fon vazifalari navbati
+#
+# Tashqi broker ishlatilmaydi: har bir navbat - bu status maydoni bor model.
+# Worker oqimlari 'pending' holatidagi yozuvni UPDATE ... WHERE status='pending'
+# orqali atomik egallaydi, shuning uchun bir nechta jarayon (gunicorn workerlari,
+# `manage.py run_workers`) bir vaqtda ishlashi mumkin.
+
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+DONE = 'done'
+FAILED = 'failed'
+
+# Navbat nomi -> sozlamalar
+#   model        - navbat jadvali
+#   handler      - yozuvni qayta ishlovchi funksiya (instance qabul qiladi)
+#   first_stage  - egallangan yozuvning dastlabki holati
+#   inline       - web jarayoni ichidagi workerlar ham bajarsinmi (default True)
+#   *_field      - status/xato/vaqt maydonlari nomi (default: status, error_message, updated_at)
+JOB_QUEUES = {
+    'speaking': {
+        'model': 'courses.SpeakingAttempt',
+        'handler': 'courses.views.run_speaking_attempt',
+        'first_stage': 'stt',
+    },
+    'writing': {
+        'model': 'courses.WritingAttempt',
+        'handler': 'courses.views.run_writing_attempt',
+        'first_stage': 'analysis',
+    },
+    # Og'ir ffmpeg ishi - faqat `manage.py run_workers` jarayonida
+    'transcode': {
+        'model': 'courses.Lesson',
+        'handler': 'courses.transcode.run_lesson_transcode',
+        'first_stage': 'transcoding',
+        'inline': False,
+        'status_field': 'transcode_status',
+        'error_field': 'transcode_error',
+        'updated_field': 'transcode_updated_at',
+    },
+    'listening_audio': {
+        'model': 'courses.ListeningLesson',
+        'handler': 'courses.listening_audio.run_listening_audio',
+        'first_stage': 'processing',
+        'inline': False,
+        'status_field': 'audio_status',
+        'error_field': 'audio_error',
+        'updated_field': 'audio_updated_at',
+    },
+    # Bo'laklab yuklangan faylning sha256 tekshiruvi (courses/uploads.py)
+    'upload_verify': {
+        'model': 'courses.ChunkedUpload',
+        'handler': 'courses.uploads.run_upload_verify',
+        'first_stage': 'verifying',
+        'status_field': 'verify_status',
+        'updated_field': 'verify_updated_at',
+    },
+}
+
+
+class JobQueue:
+    """Bitta navbat bilan ishlash"""
+
+    def __init__(self, name, model, handler, first_stage, inline=True, status_field='status',
+                 error_field='error_message', updated_field='updated_at'):
+        self.name = name
+        self.model_label = model
+        self.handler_path = handler
+        self.first_stage = first_stage
+        self.inline = inline
+        self.status_field = status_field
+        self.error_field = error_field
+        self.updated_field = updated_field
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    def _filter(self, **kwargs):
+        return self.model.objects.filter(**kwargs)
+
+    def pending(self):
+        return self._filter(**{self.status_field: PENDING})
+
+    def depth(self):
+        """Navbatda kutayotgan yozuvlar soni"""
+        return self.pending().count()
+
+    def set_status(self, instance, status, error=None):
+        """Yozuv holatini yangilash (faqat status maydonlari yoziladi)"""
+        values = {self.status_field: status, self.updated_field: timezone.now()}
+        if error is not None:
+            values[self.error_field] = error
+        self._filter(pk=instance.pk).update(**values)
+        for field, value in values.items():
+            setattr(instance, field, value)
+
+    def heartbeat(self, instance, status):
+        """Uzoq ishlayotgan yozuv "tirik": faqat holati hali `status` bo'lsa vaqt yangilanadi.
+
+        Ish davomida yozuv qayta navbatga qo'yilgan bo'lsa (pending) holati o'zgartirilmaydi.
+        """
+        return bool(self._filter(pk=instance.pk, **{self.status_field: status}).update(
+            **{self.updated_field: timezone.now()}
+        ))
+
+    def claim(self):
+        """Navbatdagi eng eski yozuvni egallash. Bo'sh bo'lsa None."""
+        candidates = self.pending().order_by('pk').values_list('pk', flat=True)[:5]
+        for pk in candidates:
+            claimed = self._filter(pk=pk, **{self.status_field: PENDING}).update(
+                **{self.status_field: self.first_stage, self.updated_field: timezone.now()}
+            )
+            if claimed:
+                return self.model.objects.get(pk=pk)
+        return None
+
+    def requeue_stale(self):
+        """Worker to'xtab qolgan (uzoq vaqt yangilanmagan) yozuvlarni navbatga qaytarish"""
+        deadline = timezone.now() - timedelta(seconds=settings.JOB_STALE_TIMEOUT)
+        return self.model.objects.exclude(
+            **{f'{self.status_field}__in': [PENDING, DONE, FAILED]}
+        ).filter(**{f'{self.updated_field}__lt': deadline}).update(
+            **{self.status_field: PENDING, self.updated_field: timezone.now()}
+        )
+
+    def run(self, instance):
+        """Yozuvni handler orqali qayta ishlash, xatolikda 'failed' holatiga o'tkazish"""
+        handler = import_string(self.handler_path)
+        try:
+            handler(instance)
+        except Exception as e:
+            logger.exception("Job %s #%s failed", self.name, instance.pk)
+            self.set_status(instance, FAILED, error=str(e))
+
+
+def get_queue(name):
+    return JobQueue(name, **JOB_QUEUES[name])
+
+
+_wakeup = threading.Event()
+
+
+def enqueue(queue_name, instance):
+    """Yozuvni navbatga qo'yish va workerlarni uyg'otish"""
+    queue = get_queue(queue_name)
+    queue.set_status(instance, PENDING, error='')
+    ensure_inline_workers()
+    _wakeup.set()
+
+
+class WorkerPool:
+    """Navbatlarni qayta ishlovchi oqimlar to'plami"""
+
+    def __init__(self, queue_names=None, threads=1, poll_interval=None):
+        self.queue_names = list(queue_names or JOB_QUEUES)
+        self.threads = threads
+        self.poll_interval = poll_interval if poll_interval is not None else settings.JOB_POLL_INTERVAL
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for index in range(self.threads):
+            thread = threading.Thread(target=self._loop, name=f'job-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        _wakeup.set()
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def run_once(self):
+        """Har bir navbatdan bittadan yozuvni qayta ishlash. Ish bo'lgan bo'lsa True."""
+        worked = False
+        for name in self.queue_names:
+            queue = get_queue(name)
+            instance = queue.claim()
+            if instance is not None:
+                queue.run(instance)
+                worked = True
+        return worked
+
+    def _loop(self):
+        last_stale_check = 0
+        try:
+            while not self._stop.is_set():
+                close_old_connections()
+                if time.monotonic() - last_stale_check > settings.JOB_STALE_TIMEOUT / 2:
+                    for name in self.queue_names:
+                        get_queue(name).requeue_stale()
+                    last_stale_check = time.monotonic()
+
+                try:
+                    worked = self.run_once()
+                except Exception:
+                    logger.exception("Job worker error")
+                    worked = False
+
+                if not worked:
+                    _wakeup.wait(self.poll_interval)
+                    _wakeup.clear()
+        finally:
+            connection.close()
+
+
+_inline_pool = None
+_inline_lock = threading.Lock()
+
+
+def ensure_inline_workers():
+    """Web jarayoni ichidagi workerlarni (AI_INLINE_WORKERS > 0 bo'lsa) bir marta ishga tushirish"""
+    global _inline_pool
+    if _inline_pool is not None or settings.AI_INLINE_WORKERS <= 0:
+        return
+    with _inline_lock:
+        if _inline_pool is None:
+            queue_names = [name for name in JOB_QUEUES if get_queue(name).inline]
+            _inline_pool = WorkerPool(queue_names, threads=settings.AI_INLINE_WORKERS).start()
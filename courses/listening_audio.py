@@ -0,0 +1,177 @@
+# courses/listening_audio.py - Listening audiolarini normallashtirish va siqish
+#
+# O'qituvchilar yuklagan mp3 lar har xil bitreyt va balandlikda (masalan, 320kbps
+# Cambridge IELTS disklari). 'listening_audio' navbatida ffmpeg:
+#   - ovoz balandligini loudnorm bilan normallashtiradi va past bitreytli mono
+#     AAC/Opus versiya yaratadi (LISTENING_AUDIO_CODEC),
+#   - davomiylikni modelga yozadi (pleer/timer faylni yuklamasdan biladi),
+#   - pleer uchun to'lqin shakli (peaks) JSON faylini yaratadi.
+
+import array
+import json
+import logging
+import math
+import os
+import subprocess
+import sys
+import time
+import uuid
+
+from django.conf import settings
+from django.utils import timezone
+
+from .jobs import DONE, get_queue
+from .transcode import HEARTBEAT_INTERVAL, TranscodeError, run_ffmpeg
+
+logger = logging.getLogger(__name__)
+
+COMPRESSED_DIR = 'listening_audios/compressed'
+WAVEFORM_DIR = 'listening_audios/waveforms'
+
+# kodek nomi -> (ffmpeg encoder, fayl kengaytmasi)
+AUDIO_CODECS = {
+    'aac': ('aac', 'm4a'),
+    'opus': ('libopus', 'webm'),
+}
+
+# To'lqin shakli uchun dekodlash chastotasi (aniq ovoz kerak emas)
+PEAKS_SAMPLE_RATE = 8000
+PCM_READ_SIZE = 64 * 1024
+
+
+def probe_duration(path):
+    output = run_ffmpeg([
+        settings.FFPROBE_BINARY, '-v', 'error', '-show_entries', 'format=duration', '-of', 'json', path,
+    ])
+    duration = json.loads(output).get('format', {}).get('duration')
+    if not duration:
+        raise TranscodeError("Audio davomiyligini aniqlab bo'lmadi")
+    return float(duration)
+
+
+def encode_args(source, output):
+    encoder, _ = AUDIO_CODECS[settings.LISTENING_AUDIO_CODEC]
+    return [
+        settings.FFMPEG_BINARY, '-y', '-v', 'error', '-i', source, '-vn',
+        '-af', settings.LISTENING_AUDIO_LOUDNORM,
+        '-ac', '1', '-ar', '48000' if encoder == 'libopus' else '44100',
+        '-c:a', encoder, '-b:a', settings.LISTENING_AUDIO_BITRATE,
+        output,
+    ]
+
+
+def decode_pcm(source, heartbeat=None):
+    """Audioni mono 16-bit PCM bo'laklari sifatida o'qish (xotiraga to'liq yuklamasdan)"""
+    process = subprocess.Popen([
+        settings.FFMPEG_BINARY, '-v', 'error', '-i', source, '-vn',
+        '-ac', '1', '-ar', str(PEAKS_SAMPLE_RATE), '-f', 's16le', '-',
+    ], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    last_beat = time.monotonic()
+    try:
+        for chunk in iter(lambda: process.stdout.read(PCM_READ_SIZE), b''):
+            if heartbeat and time.monotonic() - last_beat > HEARTBEAT_INTERVAL:
+                heartbeat()
+                last_beat = time.monotonic()
+            yield chunk
+    finally:
+        process.stdout.close()
+        if process.wait() != 0:
+            raise TranscodeError("ffmpeg audio dekodlashda xato")
+
+
+def peaks_from_pcm(chunks, duration, buckets):
+    """PCM oqimidan `buckets` ta maksimal amplituda (0..1)"""
+    samples_per_bucket = max(1, math.ceil(duration * PEAKS_SAMPLE_RATE / buckets))
+    peaks = []
+    current = 0
+    filled = 0
+    leftover = b''
+
+    for chunk in chunks:
+        chunk = leftover + chunk
+        usable = len(chunk) - len(chunk) % 2
+        leftover = chunk[usable:]
+        samples = array.array('h', chunk[:usable])
+        if sys.byteorder == 'big':
+            samples.byteswap()
+
+        position = 0
+        while position < len(samples):
+            take = min(samples_per_bucket - filled, len(samples) - position)
+            window = samples[position:position + take]
+            current = max(current, max(window), -min(window))
+            filled += take
+            position += take
+            if filled == samples_per_bucket:
+                peaks.append(current)
+                current = filled = 0
+
+    if filled:
+        peaks.append(current)
+
+    return [round(min(peak, 32767) / 32767, 3) for peak in peaks[:buckets]]
+
+
+def process_listening_audio(listening, heartbeat=None):
+    """Siqilgan audio, to'lqin shakli va davomiylik. Natija: (audio nomi, waveform nomi, davomiylik)"""
+    source = listening.audio_file.path
+    duration = probe_duration(source)
+
+    version = uuid.uuid4().hex[:8]
+    _, extension = AUDIO_CODECS[settings.LISTENING_AUDIO_CODEC]
+    audio_name = f'{COMPRESSED_DIR}/listening_{listening.id}_{version}.{extension}'
+    waveform_name = f'{WAVEFORM_DIR}/listening_{listening.id}_{version}.json'
+    audio_path = os.path.join(settings.MEDIA_ROOT, audio_name)
+    waveform_path = os.path.join(settings.MEDIA_ROOT, waveform_name)
+    os.makedirs(os.path.dirname(audio_path), exist_ok=True)
+    os.makedirs(os.path.dirname(waveform_path), exist_ok=True)
+
+    try:
+        run_ffmpeg(encode_args(source, audio_path), heartbeat)
+        peaks = peaks_from_pcm(decode_pcm(source, heartbeat), duration, settings.LISTENING_WAVEFORM_PEAKS)
+        with open(waveform_path, 'w') as f:
+            json.dump({'duration': round(duration, 3), 'peaks': peaks}, f, separators=(',', ':'))
+    except Exception:
+        for path in (audio_path, waveform_path):
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+
+    return audio_name, waveform_name, duration
+
+
+def run_listening_audio(listening):
+    """'listening_audio' navbati handleri"""
+    queue = get_queue('listening_audio')
+
+    if not listening.audio_file:
+        queue.set_status(listening, 'done', error='')
+        return
+
+    source_name = listening.audio_file.name
+    old_files = [f.name for f in (listening.audio_compressed, listening.audio_waveform) if f]
+    audio_name, waveform_name, duration = process_listening_audio(
+        listening, heartbeat=lambda: queue.heartbeat(listening, queue.first_stage))
+
+    # update() - updated_at (javoblar kaliti versiyasi) o'zgarmasligi uchun.
+    # Ish davomida admin audioni almashtirgan bo'lsa (yangi fayl allaqachon navbatda) natija eskirgan.
+    finished = type(listening).objects.filter(
+        pk=listening.pk, audio_file=source_name, audio_status=queue.first_stage,
+    ).update(audio_compressed=audio_name, audio_waveform=waveform_name, audio_duration=duration,
+             audio_status=DONE, audio_error='', audio_updated_at=timezone.now())
+    storage = listening.audio_compressed.storage
+    if not finished:
+        for name in (audio_name, waveform_name):
+            storage.delete(name)
+        logger.info("Listening #%s audio changed during processing, result of %s dropped", listening.pk, source_name)
+        return
+
+    listening.audio_compressed.name = audio_name
+    listening.audio_waveform.name = waveform_name
+    listening.audio_duration = duration
+    listening.audio_status = DONE
+
+    for name in old_files:
+        storage.delete(name)
+
+    logger.info("Listening #%s audio processed: %s (%.1fs)", listening.pk, audio_name, duration)
@@ -0,0 +1,261 @@
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from courses import views
+from courses.answer_keys import compile_reading_answer_keys, get_listening_answer_keys
+from courses.management.commands.generate_bench_data import BENCH_PREFIX, bench_courses, bench_users
+from courses.models import Module, ListeningLesson, ReadingLesson, WritingLesson
+from courses.query_budget import collect_queries
+from courses.timing import percentile
+
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, 'benchmarks', 'baseline.json')
+
+ESSAY = ("Some people believe that technology makes our lives easier, while others think it creates new "
+         "problems. In my opinion, the benefits clearly outweigh the drawbacks. ") * 3
+
+
+class Dataset:
+    """Benchmark ma'lumotlari (generate_bench_data) va javoblar kalitlari"""
+
+    def __init__(self, prefix):
+        courses = bench_courses(prefix)
+        self.users = list(bench_users(prefix).values_list('id', flat=True))
+        self.modules = list(Module.objects.filter(course__in=courses).values_list('id', flat=True))
+        if not self.users or not self.modules:
+            raise CommandError(f"'{prefix}' ma'lumotlari topilmadi - avval: manage.py generate_bench_data")
+
+        listenings = list(ListeningLesson.objects.filter(module_id__in=self.modules))
+        self.listening_keys = get_listening_answer_keys(listenings)
+        readings = list(ReadingLesson.objects.filter(module_id__in=self.modules).values_list('id', flat=True))
+        self.reading_keys = compile_reading_answer_keys(readings)
+        self.writings = list(WritingLesson.objects.filter(module_id__in=self.modules).values_list('id', flat=True))
+
+
+def answers(answer_key, rng):
+    """Kalit bo'yicha javoblar (taxminan 70% to'g'ri)"""
+    return {field: expected if rng.random() < 0.7 else '0' for field, expected in answer_key.items()}
+
+
+# Ssenariy: (dataset, rng) -> [(so'rov nomi, method, url, payload)]
+def browse_module(dataset, rng):
+    return [('module_detail', 'get', reverse('module_detail', args=[rng.choice(dataset.modules)]), None)]
+
+
+def listening_test(dataset, rng):
+    listening_id, answer_key = rng.choice(list(dataset.listening_keys.items()))
+    return [
+        ('listening_detail', 'get', reverse('listening_detail', args=[listening_id]), None),
+        ('submit_listening_test', 'post', reverse('submit_listening_test', args=[listening_id]),
+         answers(answer_key, rng)),
+    ]
+
+
+def reading_test(dataset, rng):
+    reading_id, answer_key = rng.choice(list(dataset.reading_keys.items()))
+    return [
+        ('reading_detail', 'get', reverse('reading_detail', args=[reading_id]), None),
+        ('submit_reading_test', 'post', reverse('submit_reading_test', args=[reading_id]),
+         dict(answers(answer_key, rng), time_spent=rng.randint(60, 1200))),
+    ]
+
+
+def submit_writing(dataset, rng):
+    writing_id = rng.choice(dataset.writings)
+    return [
+        ('writing_detail', 'get', reverse('writing_detail', args=[writing_id]), None),
+        ('submit_writing', 'post', reverse('submit_writing', args=[writing_id]),
+         {'answer_text': ESSAY, 'time_spent': rng.randint(300, 2400), 'word_count': len(ESSAY.split())}),
+    ]
+
+
+SCENARIOS = {
+    'browse_module': browse_module,
+    'listening_test': listening_test,
+    'reading_test': reading_test,
+    'submit_writing': submit_writing,
+}
+
+
+_users = {}
+_users_lock = threading.Lock()
+
+
+def bench_user(user_id):
+    """force_login uchun foydalanuvchi (oqimlar o'rtasida umumiy kesh)"""
+    with _users_lock:
+        if user_id not in _users:
+            _users[user_id] = User.objects.get(pk=user_id)
+        return _users[user_id]
+
+
+def run_iterations(dataset, scenario, iterations, seed):
+    """Bitta oqim: har bir iteratsiyada tasodifiy foydalanuvchi ssenariyni bajaradi.
+
+    Natija: {so'rov nomi: [(ms, so'rovlar soni, ok)]}
+    """
+    rng = random.Random(seed)
+    client = Client(SERVER_NAME='localhost')
+    samples = {}
+    try:
+        for _ in range(iterations):
+            client.cookies.clear()
+            client.force_login(bench_user(rng.choice(dataset.users)))
+            for name, method, url, payload in SCENARIOS[scenario](dataset, rng):
+                started = time.perf_counter()
+                with collect_queries() as stats:
+                    if method == 'get':
+                        response = client.get(url)
+                    else:
+                        response = client.post(url, json.dumps(payload), content_type='application/json')
+                elapsed = (time.perf_counter() - started) * 1000
+                ok = response.status_code < 400 and (method == 'get' or response.json().get('success', True))
+                samples.setdefault(name, []).append((elapsed, stats.count, ok))
+    finally:
+        connection.close()
+    return samples
+
+
+def summarize(samples, wall):
+    """{so'rov nomi: p50/p95/p99 (ms), so'rovlar/s, SQL so'rovlar, xatolar}"""
+    report = {}
+    for name, rows in sorted(samples.items()):
+        latencies = [elapsed for elapsed, _, _ in rows]
+        report[name] = {
+            'requests': len(rows),
+            'errors': sum(1 for _, _, ok in rows if not ok),
+            'throughput': round(len(rows) / wall, 2),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'mean_ms': round(statistics.mean(latencies), 2),
+            # Odatiy (kesh iliq) holatdagi va eng ko'p SQL so'rovlar soni
+            'queries': statistics.median_low(queries for _, queries, _ in rows),
+            'queries_max': max(queries for _, queries, _ in rows),
+        }
+    return report
+
+
+def compare(results, baseline, tolerance, latency=True):
+    """Baseline bilan solishtirish: SQL so'rovlar soni yoki p95 (tolerance ulushidan ko'p) oshgan joylar.
+
+    latency=False - faqat SQL so'rovlar soni (boshqa sharoitda olingan baseline uchun).
+    """
+    regressions = []
+    for scenario, requests in results.items():
+        for name, row in requests.items():
+            base = baseline.get(scenario, {}).get(name)
+            if not base:
+                continue
+            if row['queries'] > base['queries']:
+                regressions.append(f"{scenario}/{name}: queries {base['queries']} -> {row['queries']}")
+            if latency and row['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+                regressions.append(f"{scenario}/{name}: p95 {base['p95_ms']}ms -> {row['p95_ms']}ms")
+    return regressions
+
+
+class Command(BaseCommand):
+    help = ("Asosiy talaba oqimlari benchmarki (module_detail, listening/reading test, writing - AI o'rniga "
+            "lokal demo tahlil): p50/p95/p99 va throughput, baseline bilan solishtirish")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', action='append', dest='scenarios', choices=sorted(SCENARIOS),
+                            help="Ssenariy(lar), default: hammasi")
+        parser.add_argument('--iterations', type=int, default=50, help="Har bir oqimdagi iteratsiyalar")
+        parser.add_argument('--concurrency', type=int, default=1, help="Parallel oqimlar (talabalar)")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--prefix', default=BENCH_PREFIX)
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Solishtiriladigan baseline JSON")
+        parser.add_argument('--tolerance', type=float, default=0.5,
+                            help="p95 uchun ruxsat etilgan o'sish ulushi (0.5 = +50%%)")
+        parser.add_argument('--save-baseline', action='store_true', help="Natijani baseline sifatida yozish")
+        parser.add_argument('--json', dest='json_path', help="Natijani JSON faylga yozish")
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        dataset = Dataset(options['prefix'])
+        scenarios = options['scenarios'] or list(SCENARIOS)
+        results = {}
+
+        # Writing AI tahlili o'rniga lokal demo tahlil, sinxron rejimda; view'lardagi print() lar yutiladi
+        with override_settings(WRITING_QUEUE_ENABLED=False, QUERY_STATS_ENABLED=False, QUERY_BUDGET_STRICT=False), \
+                mock.patch.object(views, 'analyze_writing_with_ai', views.generate_demo_writing_analysis):
+            for scenario in scenarios:
+                started = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()), \
+                        ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                    chunks = list(pool.map(
+                        lambda worker: run_iterations(dataset, scenario, options['iterations'],
+                                                      options['seed'] * 1000 + worker),
+                        range(options['concurrency']),
+                    ))
+                wall = time.perf_counter() - started
+                connections.close_all()
+
+                samples = {}
+                for chunk in chunks:
+                    for name, rows in chunk.items():
+                        samples.setdefault(name, []).extend(rows)
+                results[scenario] = summarize(samples, wall)
+
+                for name, row in results[scenario].items():
+                    self.stdout.write(
+                        f"{scenario:>15} {name:<22} {row['requests']:>5} req, {row['throughput']:>7} req/s, "
+                        f"p50 {row['p50_ms']}ms, p95 {row['p95_ms']}ms, p99 {row['p99_ms']}ms, "
+                        f"{row['queries']} queries, {row['errors']} errors"
+                    )
+
+        report = {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'iterations': options['iterations'],
+                'concurrency': options['concurrency'],
+                'users': len(dataset.users),
+                'modules': len(dataset.modules),
+            },
+            'results': results,
+        }
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump(report, f, indent=2)
+
+        if options['save_baseline']:
+            os.makedirs(os.path.dirname(options['baseline']), exist_ok=True)
+            with open(options['baseline'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Baseline saved to {options['baseline']}")
+            return
+
+        if not os.path.exists(options['baseline']):
+            return
+        with open(options['baseline']) as f:
+            baseline = json.load(f)
+        # Kechikishlar faqat bir xil sharoitda (ma'lumotlar bazasi, parallel oqimlar) solishtiriladi
+        same_setup = all(baseline['meta'].get(key) == report['meta'][key] for key in ('database', 'concurrency'))
+        if not same_setup:
+            self.stdout.write(f"Baseline {baseline['meta']} differs from this run, comparing query counts only")
+        regressions = compare(results, baseline['results'], options['tolerance'], latency=same_setup)
+        for regression in regressions:
+            self.stdout.write(self.style.WARNING(f"REGRESSION {regression}"))
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}"))
+        elif options['fail_on_regression']:
+            raise CommandError(f"{len(regressions)} regression(s) against {options['baseline']}")
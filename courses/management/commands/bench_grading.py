@@ -0,0 +1,91 @@
+import json
+import time
+import timeit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from courses.answer_keys import compile_lesson_answer_key, compile_listening_answer_key, compile_reading_answer_key
+from courses.grading import grade
+from courses.models import Lesson, ListeningLesson, ReadingLesson
+
+KEY_COMPILERS = {
+    'lesson': (Lesson, compile_lesson_answer_key),
+    'listening': (ListeningLesson, compile_listening_answer_key),
+    'reading': (ReadingLesson, compile_reading_answer_key),
+}
+
+
+def synthetic_key(size):
+    """Har bir turdan teng ulushli kalit va yarmi to'g'ri javoblar"""
+    answer_key, data = {}, {}
+    for i in range(size):
+        field, expected, answer = [
+            (f'question_{i}', str(i), str(i) if i % 2 else '0'),
+            (f'gap_{i}_a', 'went', ' Went ' if i % 2 else 'go'),
+            (f'tfng_{i}', 'true', 'true' if i % 2 else 'false'),
+            (f'match_{i}_1', 'A', 'A' if i % 2 else 'B'),
+        ][i % 4]
+        answer_key[field] = expected
+        data[field] = answer
+    return answer_key, data
+
+
+class Command(BaseCommand):
+    help = "Test baholash tezligi: grading.grade() va haqiqiy darsda so'rovlar soni"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10,40,200', help="Sintetik kalit o'lchamlari (vergul bilan)")
+        parser.add_argument('--iterations', type=int, default=2000)
+        parser.add_argument('--lesson-type', choices=sorted(KEY_COMPILERS), help="Haqiqiy dars turi")
+        parser.add_argument('--id', type=int, dest='lesson_id', help="Haqiqiy dars id si")
+        parser.add_argument('--json', dest='json_path', help="Natijani JSON faylga yozish")
+
+    def handle(self, *args, **options):
+        report = {'synthetic': []}
+
+        for size in [int(size) for size in options['sizes'].split(',')]:
+            answer_key, data = synthetic_key(size)
+            seconds = timeit.timeit(lambda: grade(answer_key, data), number=options['iterations'])
+            row = {
+                'fields': size,
+                'us_per_submission': round(seconds / options['iterations'] * 1e6, 2),
+                'submissions_per_second': round(options['iterations'] / seconds),
+            }
+            report['synthetic'].append(row)
+            self.stdout.write(f"{size:>5} fields: {row['us_per_submission']} us/submission, "
+                              f"{row['submissions_per_second']} submissions/s")
+
+        if options['lesson_type']:
+            if not options['lesson_id']:
+                raise CommandError("--lesson-type bilan --id ham kerak")
+            model, compile_key = KEY_COMPILERS[options['lesson_type']]
+            try:
+                lesson = model.objects.get(pk=options['lesson_id'])
+            except model.DoesNotExist:
+                raise CommandError(f"{model.__name__} #{options['lesson_id']} topilmadi")
+
+            started = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                answer_key = compile_key(lesson)
+            compile_seconds = time.perf_counter() - started
+            started = time.perf_counter()
+            grade(answer_key, {field: expected for field, expected in answer_key.items()})
+            grade_seconds = time.perf_counter() - started
+
+            report['lesson'] = {
+                'type': options['lesson_type'],
+                'id': lesson.pk,
+                'fields': len(answer_key),
+                'compile_queries': len(queries),
+                'compile_ms': round(compile_seconds * 1000, 3),
+                'grade_ms': round(grade_seconds * 1000, 3),
+            }
+            self.stdout.write(f"{options['lesson_type']} #{lesson.pk}: {len(answer_key)} fields, "
+                              f"key compiled with {len(queries)} queries in {report['lesson']['compile_ms']}ms, "
+                              f"graded in {report['lesson']['grade_ms']}ms")
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump(report, f, indent=2)
@@ -0,0 +1,93 @@
+import json
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from courses import audio_ingest, stt
+from courses.timing import percentile
+
+AUDIO_EXTENSIONS = ('.wav', '.aif', '.aiff', '.flac', '.webm', '.ogg', '.mp3', '.m4a')
+
+
+def audio_seconds(path):
+    pcm = audio_ingest.decode(path, audio_ingest.detect_container(path))
+    return len(pcm) / audio_ingest.SAMPLE_WIDTH / audio_ingest.SAMPLE_RATE
+
+
+class Command(BaseCommand):
+    help = "STT engine'larini yozib olingan speaking audiolarida solishtirish (tezlik va kechikish)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--engine', action='append', dest='engines', choices=sorted(stt.STT_ENGINES),
+                            help="Solishtiriladigan engine(lar), default: google va STT_ENGINE")
+        parser.add_argument('--dir', default=os.path.join(settings.MEDIA_ROOT, 'speaking_audio'),
+                            help="Audio namunalar papkasi (default: media/speaking_audio)")
+        parser.add_argument('--limit', type=int, default=20, help="Nechta fayl ishlatilsin")
+        parser.add_argument('--concurrency', type=int, default=4,
+                            help="Bir vaqtda tanilayotgan fayllar (worker oqimlari)")
+        parser.add_argument('--json', dest='json_path', help="Natijani JSON faylga yozish")
+
+    def handle(self, *args, **options):
+        files = []
+        for root, _, names in os.walk(options['dir']):
+            files.extend(os.path.join(root, name) for name in sorted(names)
+                         if name.lower().endswith(AUDIO_EXTENSIONS))
+        files = files[:options['limit']]
+        if not files:
+            raise CommandError(f"{options['dir']} ichida audio namunalar topilmadi")
+
+        durations = {path: audio_seconds(path) for path in files}
+        total_audio = sum(durations.values())
+        engines = options['engines'] or sorted({'google', settings.STT_ENGINE})
+
+        self.stdout.write(f"{len(files)} files, {total_audio:.1f}s audio, concurrency={options['concurrency']}")
+
+        report = []
+        for name in engines:
+            started = time.perf_counter()
+            stt.get_engine(name)
+            load_seconds = time.perf_counter() - started
+
+            latencies, failures = [], 0
+
+            def run(path):
+                begin = time.perf_counter()
+                try:
+                    stt.transcribe(path, engine=name)
+                    return time.perf_counter() - begin, None
+                except Exception as e:
+                    return time.perf_counter() - begin, e
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                for latency, error in pool.map(run, files):
+                    latencies.append(latency)
+                    failures += error is not None
+            wall = time.perf_counter() - started
+
+            row = {
+                'engine': name,
+                'files': len(files),
+                'failures': failures,
+                'load_seconds': round(load_seconds, 3),
+                'wall_seconds': round(wall, 3),
+                'files_per_second': round(len(files) / wall, 3),
+                'realtime_factor': round(total_audio / wall, 2),
+                'latency_p50': round(statistics.median(latencies), 3),
+                'latency_p95': round(percentile(latencies, 95), 3),
+                'latency_max': round(max(latencies), 3),
+            }
+            report.append(row)
+            self.stdout.write(
+                f"{name:>8}: wall {row['wall_seconds']}s, {row['files_per_second']} files/s, "
+                f"x{row['realtime_factor']} realtime, p50 {row['latency_p50']}s, p95 {row['latency_p95']}s, "
+                f"failures {failures}, model load {row['load_seconds']}s"
+            )
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump({'audio_seconds': round(total_audio, 2), 'results': report}, f, indent=2)
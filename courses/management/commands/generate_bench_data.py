@@ -0,0 +1,142 @@
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from courses.models import Course, Module, Lesson, ListeningLesson, SpeakingLesson, ReadingLesson, WritingLesson, \
+    Question, Answer, ListeningQuestion, ListeningOption, ReadingQuestion, ReadingAnswer, LessonProgress
+from courses.progress import PROGRESS_MODELS, content_types, rebuild_module_summaries
+
+# Benchmark ma'lumotlari shu prefiks bilan yaratiladi va o'chiriladi
+BENCH_PREFIX = 'bench'
+BENCH_PASSWORD = 'bench-password'
+CHOICES = 'ABCD'
+
+
+def bench_courses(prefix=BENCH_PREFIX):
+    return Course.objects.filter(name__startswith=f'{prefix} ')
+
+
+def bench_users(prefix=BENCH_PREFIX):
+    return User.objects.filter(username__startswith=f'{prefix}_')
+
+
+def create_lessons(modules, per_module):
+    """Har bir modulga har bir turdan `per_module` ta dars. Natija: {dars turi: [dars]}"""
+    lessons = {lesson_type: [] for lesson_type in PROGRESS_MODELS}
+    for module in modules:
+        for i in range(per_module):
+            title = f"{module.title} #{i}"
+            lessons['video'].append(Lesson(module=module, title=f"{title} video", order=i,
+                                           video_url='https://www.youtube.com/watch?v=bench'))
+            lessons['listening'].append(ListeningLesson(
+                module=module, title=f"{title} listening", order=i, listening_type='multiple_choice',
+                audio_file='listening_audios/bench.mp3'))
+            lessons['speaking'].append(SpeakingLesson(
+                module=module, title=f"{title} speaking", order=i, description='-',
+                speaking_type='question_answer', instruction_text='-'))
+            lessons['reading'].append(ReadingLesson(
+                module=module, title=f"{title} reading", order=i, reading_type='multiple_choice',
+                description='-', reading_text='Lorem ipsum ' * 200, instruction='-'))
+            lessons['writing'].append(WritingLesson(
+                module=module, title=f"{title} writing", order=i, writing_type='task2', description='-',
+                task_text='-', instruction='-'))
+    return {lesson_type: model.objects.bulk_create(lessons[lesson_type])
+            for lesson_type, model in PROGRESS_MODELS.items()}
+
+
+def create_choice_questions(lessons, questions, question_model, owner_field, choice_model, choice_fields,
+                            **question_fields):
+    """Har bir darsga `questions` ta 4 variantli savol (to'g'risi - A)"""
+    ordered = any(field.name == 'order' for field in question_model._meta.fields)
+    created = question_model.objects.bulk_create([
+        question_model(question_text=f"Savol {i}", **{owner_field: lesson}, **question_fields,
+                       **({'order': i} if ordered else {}))
+        for lesson in lessons for i in range(questions)
+    ])
+    choice_model.objects.bulk_create([
+        choice_model(question=question, is_correct=letter == 'A', **choice_fields(letter))
+        for question in created for letter in CHOICES
+    ])
+
+
+class Command(BaseCommand):
+    help = "Benchmark uchun sintetik ma'lumotlar: kurslar x modullar x 5 dars turi x foydalanuvchilar progressi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--courses', type=int, default=2)
+        parser.add_argument('--modules', type=int, default=5, help="Har bir kursdagi modullar")
+        parser.add_argument('--lessons', type=int, default=3, help="Har bir moduldagi har bir turdagi darslar")
+        parser.add_argument('--questions', type=int, default=10, help="Video/listening/reading darsidagi savollar")
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--progress', type=float, default=0.3,
+                            help="Foydalanuvchi progressi bor darslar ulushi (0..1)")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--prefix', default=BENCH_PREFIX)
+        parser.add_argument('--flush', action='store_true', help="Avval shu prefiksli ma'lumotlarni o'chirish")
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+
+        if options['flush']:
+            deleted, _ = bench_courses(prefix).delete()
+            users, _ = bench_users(prefix).delete()
+            self.stdout.write(f"Flushed {deleted + users} rows")
+
+        with transaction.atomic():
+            courses = Course.objects.bulk_create([
+                Course(name=f"{prefix} course {i}", description='-', course_type='english')
+                for i in range(options['courses'])
+            ])
+            modules = Module.objects.bulk_create([
+                Module(course=course, title=f"{course.name} module {i}", order=i)
+                for course in courses for i in range(options['modules'])
+            ])
+            lessons = create_lessons(modules, options['lessons'])
+
+            create_choice_questions(lessons['video'], options['questions'], Question, 'lesson', Answer,
+                                    lambda letter: {'answer_text': letter})
+            create_choice_questions(lessons['listening'], options['questions'], ListeningQuestion,
+                                    'listening_lesson', ListeningOption,
+                                    lambda letter: {'option_text': letter, 'option_letter': letter})
+            create_choice_questions(lessons['reading'], options['questions'], ReadingQuestion, 'reading_lesson',
+                                    ReadingAnswer, lambda letter: {'answer_text': letter},
+                                    question_type='multiple_choice')
+
+            # Parol xeshi bitta marta hisoblanadi (hamma foydalanuvchida bir xil)
+            password = make_password(BENCH_PASSWORD)
+            offset = bench_users(prefix).count()
+            users = User.objects.bulk_create([
+                User(username=f"{prefix}_user_{offset + i}", password=password)
+                for i in range(options['users'])
+            ])
+
+            types = content_types()
+            all_lessons = [(types[lesson_type].id, lesson.id)
+                           for lesson_type, items in lessons.items() for lesson in items]
+            sample_size = int(len(all_lessons) * options['progress'])
+            now = timezone.now()
+            progress = []
+            for user in users:
+                for content_type_id, object_id in rng.sample(all_lessons, sample_size):
+                    score = rng.randint(0, 100)
+                    progress.append(LessonProgress(
+                        user=user, content_type_id=content_type_id, object_id=object_id, score=score,
+                        completed=score >= 50, completed_at=now if score >= 50 else None,
+                    ))
+            LessonProgress.objects.bulk_create(progress, batch_size=5000)
+
+        summaries = rebuild_module_summaries([module.id for module in modules])
+
+        self.stdout.write(
+            f"Created {len(courses)} courses, {len(modules)} modules, "
+            f"{sum(len(items) for items in lessons.values())} lessons, {len(users)} users, "
+            f"{len(progress)} progress rows, {summaries} module summaries "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from courses.jobs import enqueue
+from courses.models import ListeningLesson
+
+
+class Command(BaseCommand):
+    help = "Siqilgan audio versiyasi tayyor bo'lmagan listening darslarni 'listening_audio' navbatiga qo'yish"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Tayyor bo'lganlarini ham qaytadan qayta ishlash")
+        parser.add_argument('--listening', type=int, action='append', dest='listenings', help="Faqat shu dars(lar)")
+
+    def handle(self, *args, **options):
+        listenings = ListeningLesson.objects.exclude(audio_file='')
+        if options['listenings']:
+            listenings = listenings.filter(id__in=options['listenings'])
+        if not options['all']:
+            listenings = listenings.exclude(audio_status__in=['pending', 'processing', 'done'])
+
+        count = 0
+        for listening in listenings.only('id'):
+            enqueue('listening_audio', listening)
+            count += 1
+
+        self.stdout.write(f"Queued {count} listening lesson(s) for audio processing")
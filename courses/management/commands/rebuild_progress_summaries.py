@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from courses.models import Module
+from courses.progress import rebuild_module_summaries
+
+
+class Command(BaseCommand):
+    help = "Modullar bo'yicha yig'ma progressni (ModuleProgressSummary) LessonProgress dan qayta qurish"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--module', type=int, action='append', dest='modules', help="Faqat shu modul(lar)")
+        parser.add_argument('--course', type=int, action='append', dest='courses',
+                            help="Faqat shu kurs(lar) modullari")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        module_ids = None
+        if options['modules'] or options['courses']:
+            module_ids = set(options['modules'] or [])
+            if options['courses']:
+                module_ids.update(Module.objects.filter(course_id__in=options['courses']).values_list('id', flat=True))
+
+        started = time.perf_counter()
+        count = rebuild_module_summaries(module_ids, batch_size=options['batch_size'])
+        self.stdout.write(f"Rebuilt {count} module progress summaries in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from courses.jobs import JOB_QUEUES, WorkerPool
+
+
+class Command(BaseCommand):
+    help = "Fon vazifalari navbatini (speaking tahlili va h.k.) qayta ishlovchi workerlarni ishga tushirish"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=settings.AI_WORKER_THREADS,
+                            help="Worker oqimlari soni")
+        parser.add_argument('--queue', action='append', dest='queues', choices=sorted(JOB_QUEUES),
+                            help="Faqat shu navbat(lar)ni qayta ishlash")
+
+    def handle(self, *args, **options):
+        pool = WorkerPool(options['queues'], threads=options['threads'])
+        self.stdout.write(f"Workers started: {options['threads']} threads, queues: {', '.join(pool.queue_names)}")
+        pool.start()
+        try:
+            pool.join()
+        except KeyboardInterrupt:
+            pool.stop()
+            pool.join()
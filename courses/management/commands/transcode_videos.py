@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from courses.jobs import enqueue
+from courses.models import Lesson
+
+
+class Command(BaseCommand):
+    help = "Video fayli bor, lekin HLS versiyasi tayyor bo'lmagan darslarni 'transcode' navbatiga qo'yish"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Tayyor bo'lganlarini ham qaytadan o'girish")
+        parser.add_argument('--lesson', type=int, action='append', dest='lessons', help="Faqat shu dars(lar)")
+
+    def handle(self, *args, **options):
+        lessons = Lesson.objects.exclude(video_file='').exclude(video_file__isnull=True)
+        if options['lessons']:
+            lessons = lessons.filter(id__in=options['lessons'])
+        if not options['all']:
+            lessons = lessons.exclude(transcode_status__in=['pending', 'transcoding', 'done'])
+
+        count = 0
+        for lesson in lessons.only('id'):
+            enqueue('transcode', lesson)
+            count += 1
+
+        self.stdout.write(f"Queued {count} lesson(s) for transcoding")
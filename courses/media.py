@@ -0,0 +1,129 @@
+# courses/media.py - Media fayllarni Range (206 Partial Content) bilan berish
+#
+# Video/audio pleer faylning istalgan joyiga o'tganda brauzer `Range: bytes=N-`
+# yuboradi. django.views.static.serve Range'ni qo'llab-quvvatlamaydi, shuning uchun
+# 1GB ma'ruzada seek butun faylni boshidan yuklaydi. Bu yerdagi yordamchilar
+# serve_media view'i uchun: kirish huquqi, ETag/Last-Modified, Range tahlili va
+# bo'lakli o'qish.
+
+import mimetypes
+import re
+
+from django.utils.http import http_date, parse_http_date_safe
+
+from .models import ChunkedUpload
+
+STREAM_BLOCK_SIZE = 256 * 1024
+
+# HLS fayllari (tizimdagi mime.types da .ts boshqa turga tegishli bo'lishi mumkin)
+mimetypes.add_type('application/vnd.apple.mpegurl', '.m3u8')
+mimetypes.add_type('video/mp2t', '.ts')
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Dars materiallari - tizimga kirgan har qanday foydalanuvchiga ochiq
+PUBLIC_MEDIA_PREFIXES = (
+    'lesson_videos/',
+    'lesson_hls/',
+    'lesson_posters/',
+    'listening_audios/',
+    'speaking_feedback/',
+    'reading_images/',
+    'writing_images/',
+)
+# Talabalar yozuvlari - faqat egasiga (va xodimlarga)
+RECORDING_RE = re.compile(r'^speaking_audio/user_(\d+)/')
+
+
+def can_serve(user, path):
+    """`path` (MEDIA_ROOT ga nisbatan, normallashtirilgan) faylini foydalanuvchiga berish mumkinmi"""
+    recording = RECORDING_RE.match(path)
+    if recording:
+        return user.is_staff or str(user.pk) == recording.group(1)
+    if not path.startswith(PUBLIC_MEDIA_PREFIXES):
+        return False
+    # Bo'laklab yuklanayotgan (yoki xato bilan tugagan) fayl hali dars materiali emas
+    return not ChunkedUpload.objects.filter(file_name=path).exclude(status='complete').exists()
+
+
+def file_etag(stat):
+    """Fayl o'lchami va o'zgarish vaqtidan olingan ETag"""
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def last_modified(stat):
+    return http_date(stat.st_mtime)
+
+
+def etag_matches(header, etag):
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    # Weak taqqoslash: W/ prefiksi e'tiborga olinmaydi
+    candidates = [tag.strip().removeprefix('W/') for tag in header.split(',')]
+    return etag in candidates
+
+
+def not_modified(request, stat, etag):
+    """If-None-Match / If-Modified-Since bo'yicha 304 qaytarish kerakmi"""
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return if_modified_since is not None and int(stat.st_mtime) <= if_modified_since
+
+
+def if_range_allows(request, stat, etag):
+    """If-Range sharti bajarilmasa Range e'tiborsiz qoldiriladi (butun fayl beriladi)"""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    if_range_date = parse_http_date_safe(if_range)
+    return if_range_date is not None and int(stat.st_mtime) <= if_range_date
+
+
+def parse_range(header, size):
+    """`Range` headerini (start, end) ga aylantirish (end - inklyuziv).
+
+    Natija: None - Range yo'q yoki bir nechta oraliq (butun fayl beriladi),
+    False - oraliq fayldan tashqarida (416).
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+
+    start, end = match.groups()
+    if not start and not end:
+        return None
+
+    if not start:
+        # bytes=-500 - oxirgi 500 bayt
+        length = int(end)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    end = int(end) if end else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+def stream_range(path, start, end, block_size=STREAM_BLOCK_SIZE):
+    """Faylning [start, end] qismini bo'laklab o'qish"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            block = f.read(min(block_size, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
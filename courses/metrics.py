@@ -0,0 +1,132 @@
+# courses/metrics.py - Prometheus metrikalari (/metrics)
+#
+# So'rovlar kechikishi (URL nomi bo'yicha), har bir so'rovdagi SQL so'rovlar
+# soni, tashqi xizmatlar (GigaChat, STT, gTTS/pyttsx3) chaqiruvlari, keshga
+# murojaatlar (hit/miss) va navbatlar chuqurligi. Har bir jarayon (gunicorn
+# workerlari, `manage.py run_workers`) o'z qiymatlarini PROMETHEUS_MULTIPROC_DIR
+# papkasidagi fayllarga yozadi (settings.py), /metrics esa ularni
+# MultiProcessCollector bilan jamlaydi.
+
+import os
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+from prometheus_client.core import GaugeMetricFamily
+
+from .query_budget import QueryCounter, collect_queries
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', "So'rovni qayta ishlash vaqti",
+    ['view', 'method', 'status'],
+)
+REQUEST_QUERIES = Histogram(
+    'http_request_db_queries', "Bitta so'rovdagi SQL so'rovlar soni",
+    ['view'], buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+REQUEST_DB_TIME = Histogram(
+    'http_request_db_seconds', "Bitta so'rovdagi SQL so'rovlar umumiy vaqti",
+    ['view'],
+)
+EXTERNAL_CALLS = Counter(
+    'external_calls_total', "Tashqi xizmat chaqiruvlari (outcome: ok/error)",
+    ['service', 'outcome'],
+)
+EXTERNAL_LATENCY = Histogram(
+    'external_call_duration_seconds', "Tashqi xizmat chaqiruvi vaqti",
+    ['service'], buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300),
+)
+CACHE_REQUESTS = Counter(
+    'cache_requests_total', "Keshga murojaatlar (result: hit/miss)",
+    ['cache', 'result'],
+)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def multiprocess_mode():
+    return bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
+
+
+@contextmanager
+def external_call(service):
+    """Tashqi xizmat chaqiruvi: soni, vaqti va xatolari"""
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        EXTERNAL_CALLS.labels(service, outcome).inc()
+        EXTERNAL_LATENCY.labels(service).observe(time.perf_counter() - started)
+
+
+def record_gigachat_call(event):
+    """gigachat_client listener'i (ai_client.GigaChatClientManager._record)"""
+    EXTERNAL_CALLS.labels('gigachat', 'ok' if event['ok'] else 'error').inc()
+    EXTERNAL_LATENCY.labels('gigachat').observe(event['duration'])
+
+
+def record_cache(cache, hits=0, misses=0):
+    """Keshga murojaatlar soni"""
+    if hits:
+        CACHE_REQUESTS.labels(cache, 'hit').inc(hits)
+    if misses:
+        CACHE_REQUESTS.labels(cache, 'miss').inc(misses)
+
+
+def record_cache_lookup(cache, value):
+    """Bitta murojaat: value None bo'lsa miss"""
+    if value is None:
+        record_cache(cache, misses=1)
+    else:
+        record_cache(cache, hits=1)
+
+
+class JobQueueCollector:
+    """Navbatlar chuqurligi - /metrics so'ralganda bazadan o'qiladi"""
+
+    def collect(self):
+        from .jobs import JOB_QUEUES, get_queue
+
+        depth = GaugeMetricFamily('job_queue_depth', "Navbatda kutayotgan vazifalar", labels=['queue'])
+        for name in JOB_QUEUES:
+            depth.add_metric([name], get_queue(name).depth())
+        yield depth
+
+
+def render():
+    """Prometheus text formatidagi barcha metrikalar"""
+    if multiprocess_mode():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    jobs = CollectorRegistry()
+    jobs.register(JobQueueCollector())
+    return generate_latest(registry) + generate_latest(jobs)
+
+
+class MetricsMiddleware:
+    """So'rov kechikishi va SQL so'rovlar soni (view - URL nomi)"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        # Faqat sanash: so'rov shakllari tahlili QUERY_STATS_ENABLED (QueryBudgetMiddleware) da
+        with collect_queries(QueryCounter) as stats:
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = match.view_name if match else '<unresolved>'
+        REQUEST_LATENCY.labels(view, request.method, str(response.status_code)).observe(elapsed)
+        REQUEST_QUERIES.labels(view).observe(stats.count)
+        REQUEST_DB_TIME.labels(view).observe(stats.seconds)
+        return response
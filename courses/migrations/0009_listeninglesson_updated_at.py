@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0008_writinglesson_writingattempt_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listeninglesson',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0009_listeninglesson_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='speakingattempt',
+            name='error_message',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='speakingattempt',
+            name='feedback_audio',
+            field=models.FileField(blank=True, upload_to='speaking_feedback', verbose_name='AI ovozli javobi'),
+        ),
+        migrations.AddField(
+            model_name='speakingattempt',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Navbatda'), ('stt', "Nutq matnga o'girilmoqda"), ('analysis', 'AI tahlil qilmoqda'), ('tts', 'Ovozli javob tayyorlanmoqda'), ('done', 'Tayyor'), ('failed', 'Xatolik')], db_index=True, default='done', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='speakingattempt',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
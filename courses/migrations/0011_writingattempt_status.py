@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0010_speakingattempt_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='writingattempt',
+            name='error_message',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='writingattempt',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Navbatda'), ('analysis', 'AI tahlil qilmoqda'), ('done', 'Tayyor'), ('failed', 'Xatolik')], db_index=True, default='done', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='writingattempt',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0011_writingattempt_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TTSCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='sha256(engine, til, matn)', max_length=64, unique=True)),
+                ('engine', models.CharField(max_length=20)),
+                ('lang', models.CharField(max_length=10)),
+                ('audio_file', models.FileField(upload_to='speaking_feedback')),
+                ('size', models.PositiveIntegerField(default=0, help_text='Fayl hajmi (bayt)')),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'TTS kesh',
+                'verbose_name_plural': 'TTS kesh',
+            },
+        ),
+        migrations.AddField(
+            model_name='speakingattempt',
+            name='feedback_tts',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='attempts', to='courses.ttscacheentry'),
+        ),
+    ]
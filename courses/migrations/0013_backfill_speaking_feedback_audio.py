@@ -0,0 +1,69 @@
+# Eski feedback_<uuid>.mp3 fayllarini SpeakingAttempt.feedback_audio ga bog'lash.
+#
+# Eski kod fayl nomida urinish ID sini saqlamagan. TTS tahlildan darhol keyin
+# yaratilgani uchun fayl mtime vaqti urinish created_at vaqtidan biroz keyin
+# bo'ladi. Faqat bir ma'noli holatlar bog'lanadi: fayl oralig'ida bitta urinish
+# bor va shu urinishga bitta fayl to'g'ri keladi. Bir vaqtda ishlagan bir nechta
+# talaba bo'lsa fayl boshqa talabaning urinishiga tushib qolmasligi uchun bunday
+# fayllar (va mos urinish topilmaganlar) o'zgarishsiz qoladi.
+
+import bisect
+import os
+
+from django.conf import settings
+from django.db import migrations
+
+FEEDBACK_DIR = 'speaking_feedback'
+MATCH_WINDOW = 10 * 60  # soniya
+
+
+def match_feedback_files(files, attempts, window=MATCH_WINDOW):
+    """files: [(mtime, name)], attempts: [(created_ts, id)] -> {attempt_id: name} (faqat bir ma'noli juftlar)"""
+    attempts = sorted(attempts)
+    created = [ts for ts, _ in attempts]
+    candidates = {}
+
+    for mtime, name in files:
+        # Fayldan oldingi `window` soniya ichida yaratilgan urinishlar
+        first = bisect.bisect_left(created, mtime - window)
+        last = bisect.bisect_right(created, mtime)
+        if last - first == 1:
+            candidates.setdefault(attempts[first][1], []).append(name)
+
+    return {attempt_id: names[0] for attempt_id, names in candidates.items() if len(names) == 1}
+
+
+def backfill_feedback_audio(apps, schema_editor):
+    SpeakingAttempt = apps.get_model('courses', 'SpeakingAttempt')
+
+    feedback_dir = os.path.join(settings.MEDIA_ROOT, FEEDBACK_DIR)
+    if not os.path.isdir(feedback_dir):
+        return
+
+    files = [
+        (entry.stat().st_mtime, f'{FEEDBACK_DIR}/{entry.name}')
+        for entry in os.scandir(feedback_dir)
+        if entry.is_file() and entry.name.startswith('feedback_') and entry.name.endswith('.mp3')
+    ]
+    if not files:
+        return
+
+    attempts = [
+        (created_at.timestamp(), attempt_id)
+        for attempt_id, created_at in SpeakingAttempt.objects.filter(feedback_audio='')
+        .exclude(ai_feedback='').values_list('id', 'created_at')
+    ]
+
+    for attempt_id, name in match_feedback_files(files, attempts).items():
+        SpeakingAttempt.objects.filter(id=attempt_id).update(feedback_audio=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0012_ttscacheentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_feedback_audio, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:15
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('courses', '0013_backfill_speaking_feedback_audio'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChunkedUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('target', models.CharField(choices=[('lesson', 'Video dars'), ('listening', 'Listening audio')], max_length=20)),
+                ('object_id', models.PositiveIntegerField()),
+                ('filename', models.CharField(help_text='Asl fayl nomi', max_length=255)),
+                ('file_name', models.CharField(help_text="MEDIA_ROOT ichidagi yakuniy yo'l", max_length=255)),
+                ('size', models.BigIntegerField()),
+                ('received', models.BigIntegerField(default=0)),
+                ('sha256', models.CharField(max_length=64)),
+                ('status', models.CharField(choices=[('uploading', 'Yuklanmoqda'), ('complete', 'Tugallangan'), ('failed', 'Xatolik')], default='uploading', max_length=20)),
+                ('error_message', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunked_uploads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0014_chunkedupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='hls_manifest',
+            field=models.CharField(blank=True, help_text='MEDIA_ROOT ichidagi master.m3u8', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='poster',
+            field=models.FileField(blank=True, upload_to='lesson_posters', verbose_name='Poster'),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='transcode_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='transcode_status',
+            field=models.CharField(blank=True, choices=[('pending', 'Navbatda'), ('transcoding', 'HLS tayyorlanmoqda'), ('done', 'Tayyor'), ('failed', 'Xatolik')], db_index=True, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='transcode_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
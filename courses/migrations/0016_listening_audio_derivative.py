@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0015_lesson_transcode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listeninglesson',
+            name='audio_compressed',
+            field=models.FileField(blank=True, upload_to='listening_audios/compressed', verbose_name='Siqilgan audio'),
+        ),
+        migrations.AddField(
+            model_name='listeninglesson',
+            name='audio_duration',
+            field=models.FloatField(blank=True, help_text='Davomiylik (soniya)', null=True),
+        ),
+        migrations.AddField(
+            model_name='listeninglesson',
+            name='audio_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='listeninglesson',
+            name='audio_status',
+            field=models.CharField(blank=True, choices=[('pending', 'Navbatda'), ('processing', 'Qayta ishlanmoqda'), ('done', 'Tayyor'), ('failed', 'Xatolik')], db_index=True, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='listeninglesson',
+            name='audio_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='listeninglesson',
+            name='audio_waveform',
+            field=models.FileField(blank=True, help_text="Pleer uchun to'lqin shakli (peaks JSON)", upload_to='listening_audios/waveforms'),
+        ),
+    ]
@@ -0,0 +1,81 @@
+# UserProgress qatorlarini LessonProgress ga ko'chirish.
+#
+# Eski jadvalda har bir qatorda beshta nullable FK dan bittasi to'ldirilgan;
+# u (content_type, object_id) juftligiga aylantiriladi. Orqaga qaytarishda
+# qatorlar eski jadvalga qaytariladi.
+
+from django.db import migrations
+
+BATCH_SIZE = 2000
+
+# UserProgress maydoni -> dars modeli
+PROGRESS_FIELDS = {
+    'lesson': 'lesson',
+    'listening_lesson': 'listeninglesson',
+    'speaking_lesson': 'speakinglesson',
+    'reading_lesson': 'readinglesson',
+    'writing_lesson': 'writinglesson',
+}
+
+
+def get_content_types(apps):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    return {
+        field: ContentType.objects.get_or_create(app_label='courses', model=model)[0]
+        for field, model in PROGRESS_FIELDS.items()
+    }
+
+
+def move_forward(apps, schema_editor):
+    UserProgress = apps.get_model('courses', 'UserProgress')
+    LessonProgress = apps.get_model('courses', 'LessonProgress')
+    LessonProgress._meta.get_field('created_at').auto_now_add = False  # asl vaqt saqlansin
+    content_types = get_content_types(apps)
+
+    rows = []
+    for progress in UserProgress.objects.order_by('id').iterator(chunk_size=BATCH_SIZE):
+        for field, content_type in content_types.items():
+            object_id = getattr(progress, f'{field}_id')
+            if object_id is not None:
+                rows.append(LessonProgress(
+                    user_id=progress.user_id, content_type=content_type, object_id=object_id,
+                    completed=progress.completed, score=progress.score, completed_at=progress.completed_at,
+                    created_at=progress.created_at,
+                ))
+                break
+        if len(rows) >= BATCH_SIZE:
+            LessonProgress.objects.bulk_create(rows, ignore_conflicts=True)
+            rows = []
+    LessonProgress.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+def move_backward(apps, schema_editor):
+    UserProgress = apps.get_model('courses', 'UserProgress')
+    LessonProgress = apps.get_model('courses', 'LessonProgress')
+    UserProgress._meta.get_field('created_at').auto_now_add = False
+    fields = {content_type.id: field for field, content_type in get_content_types(apps).items()}
+
+    rows = []
+    for progress in LessonProgress.objects.order_by('id').iterator(chunk_size=BATCH_SIZE):
+        if progress.content_type_id not in fields:
+            continue
+        rows.append(UserProgress(
+            user_id=progress.user_id, completed=progress.completed, score=progress.score,
+            completed_at=progress.completed_at, created_at=progress.created_at,
+            **{f'{fields[progress.content_type_id]}_id': progress.object_id},
+        ))
+        if len(rows) >= BATCH_SIZE:
+            UserProgress.objects.bulk_create(rows, ignore_conflicts=True)
+            rows = []
+    UserProgress.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0017_lessonprogress'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_forward, move_backward),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:31
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0018_move_userprogress_to_lessonprogress'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='UserProgress',
+        ),
+    ]
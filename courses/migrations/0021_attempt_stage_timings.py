@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0020_module_progress_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='speakingattempt',
+            name='stage_timings',
+            field=models.JSONField(blank=True, default=dict, help_text='Bosqichlar vaqti (ms)'),
+        ),
+        migrations.AddField(
+            model_name='writingattempt',
+            name='stage_timings',
+            field=models.JSONField(blank=True, default=dict, help_text='Bosqichlar vaqti (ms)'),
+        ),
+    ]
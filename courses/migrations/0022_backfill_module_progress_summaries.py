@@ -0,0 +1,67 @@
+# Mavjud LessonProgress qatorlaridan ModuleProgressSummary ni to'ldirish.
+#
+# 0020 jadvalni bo'sh yaratadi; bu migratsiyasiz modul sahifalari foydalanuvchi
+# keyingi natija yuborguncha (yoki `manage.py rebuild_progress_summaries`
+# ishga tushirilguncha) 0% ko'rsatardi. Hisoblash progress.rebuild_module_summaries
+# bilan bir xil, faqat tarixiy modellar bilan. Oxirgi faollik updated_at dan emas:
+# 0020 uni auto_now bilan qo'shgan, eski qatorlarning hammasida migratsiya vaqti turadi.
+
+from django.db import migrations
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 2000
+
+LESSON_MODELS = ('lesson', 'listeninglesson', 'speakinglesson', 'readinglesson', 'writinglesson')
+
+
+def backfill(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    LessonProgress = apps.get_model('courses', 'LessonProgress')
+    ModuleProgressSummary = apps.get_model('courses', 'ModuleProgressSummary')
+
+    # (content_type_id, dars id) -> modul id; modul id -> jami darslar
+    lesson_modules = {}
+    totals = {}
+    content_types = ContentType.objects.filter(app_label='courses', model__in=LESSON_MODELS)
+    for content_type in content_types:
+        model = apps.get_model('courses', content_type.model)
+        for lesson_id, module_id in model.objects.values_list('id', 'module_id').iterator():
+            lesson_modules[(content_type.id, lesson_id)] = module_id
+            totals[module_id] = totals.get(module_id, 0) + 1
+
+    # (user, modul) -> [tugatilgan, ballar yig'indisi, qatorlar, oxirgi faollik]
+    stats = {}
+    rows = LessonProgress.objects.filter(content_type__in=content_types).annotate(
+        activity=Coalesce('completed_at', 'created_at'),
+    ).values_list('user_id', 'content_type_id', 'object_id', 'completed', 'score', 'activity')
+    for user_id, content_type_id, object_id, completed, score, activity in rows.iterator(chunk_size=BATCH_SIZE):
+        module_id = lesson_modules.get((content_type_id, object_id))
+        if module_id is None:
+            continue
+        current = stats.setdefault((user_id, module_id), [0, 0, 0, None])
+        current[0] += 1 if completed else 0
+        current[1] += score or 0
+        current[2] += 1
+        if current[3] is None or (activity and activity > current[3]):
+            current[3] = activity
+
+    ModuleProgressSummary.objects.all().delete()
+    ModuleProgressSummary.objects.bulk_create([
+        ModuleProgressSummary(
+            user_id=user_id, module_id=module_id, completed_count=completed_count,
+            total_count=totals.get(module_id, 0), average_score=score_sum / count, last_activity=last_activity,
+        )
+        for (user_id, module_id), (completed_count, score_sum, count, last_activity) in stats.items()
+    ], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('courses', '0021_attempt_stage_timings'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
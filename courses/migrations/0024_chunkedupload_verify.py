@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0023_module_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chunkedupload',
+            name='verify_status',
+            field=models.CharField(blank=True, choices=[('pending', 'Navbatda'), ('verifying', 'sha256 tekshirilmoqda'), ('done', 'Tayyor'), ('failed', 'Xatolik')], db_index=True, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='chunkedupload',
+            name='verify_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='chunkedupload',
+            name='status',
+            field=models.CharField(choices=[('uploading', 'Yuklanmoqda'), ('verifying', 'Tekshirilmoqda'), ('complete', 'Tugallangan'), ('failed', 'Xatolik')], default='uploading', max_length=20),
+        ),
+    ]
@@ -1,6 +1,10 @@
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
+from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
+import mimetypes
 import os
 import uuid
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -47,6 +51,7 @@ class Module(models.Model):
     description = models.TextField(blank=True)
     order = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # tarkib keshi versiyasi (courses/outline.py)
 
     class Meta:
         ordering = ['order']
@@ -57,6 +62,13 @@ class Module(models.Model):
 
 # 3. KEYIN Lesson MODELI (Module dan keyin)
 class Lesson(models.Model):
+    TRANSCODE_STATUSES = [
+        ('pending', 'Navbatda'),
+        ('transcoding', 'HLS tayyorlanmoqda'),
+        ('done', 'Tayyor'),
+        ('failed', 'Xatolik'),
+    ]
+
     module = models.ForeignKey(Module, on_delete=models.CASCADE, related_name='lessons')
     title = models.CharField(max_length=200)
 
@@ -65,19 +77,34 @@ class Lesson(models.Model):
                                   verbose_name="Video fayl")
     video_url = models.URLField(blank=True, verbose_name="YouTube linki")
 
+    # HLS (ko'p bitreytli) versiya - courses/transcode.py tomonidan yaratiladi
+    transcode_status = models.CharField(max_length=20, choices=TRANSCODE_STATUSES, blank=True, db_index=True)
+    transcode_error = models.TextField(blank=True)
+    transcode_updated_at = models.DateTimeField(null=True, blank=True)
+    hls_manifest = models.CharField(max_length=255, blank=True, help_text="MEDIA_ROOT ichidagi master.m3u8")
+    poster = models.FileField(upload_to='lesson_posters', blank=True, verbose_name="Poster")
+
     content = models.TextField(blank=True)
     duration = models.CharField(max_length=50, blank=True)
     order = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Foydalanuvchilar progressi (dars o'chirilsa progress ham o'chadi)
+    progress_records = GenericRelation('LessonProgress')
+
     class Meta:
         ordering = ['order']
 
     def __str__(self):
         return f"{self.module.title} - {self.title}"
 
+    def hls_ready(self):
+        return self.transcode_status == 'done' and bool(self.hls_manifest)
+
     def get_video_source(self):
-        """Video manbasini qaytarish"""
+        """Video manbasini qaytarish (HLS tayyor bo'lsa - manifest)"""
+        if self.video_file and self.hls_ready():
+            return settings.MEDIA_URL + self.hls_manifest
         if self.video_file:
             return self.video_file.url
         elif self.video_url:
@@ -86,6 +113,8 @@ class Lesson(models.Model):
 
     def video_type(self):
         """Video turini aniqlash"""
+        if self.video_file and self.hls_ready():
+            return 'hls'
         if self.video_file:
             return 'file'
         elif self.video_url:
@@ -103,6 +132,12 @@ class ListeningLesson(models.Model):
         ('gap_filling', 'Gap Filling'),
         ('true_false_not_given', 'True/False/Not Given'),
     ]
+    AUDIO_STATUSES = [
+        ('pending', 'Navbatda'),
+        ('processing', 'Qayta ishlanmoqda'),
+        ('done', 'Tayyor'),
+        ('failed', 'Xatolik'),
+    ]
 
     module = models.ForeignKey(Module, on_delete=models.CASCADE, related_name='listening_lessons')
     title = models.CharField(max_length=200)
@@ -112,6 +147,20 @@ class ListeningLesson(models.Model):
     description = models.TextField(blank=True, help_text="Listening mazmuni, ko'rsatmalar")
     timer_minutes = models.IntegerField(default=0, help_text="0 yozilsa timer ishlamaydi")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Normallashtirilgan, past bitreytli versiya - courses/listening_audio.py tomonidan yaratiladi
+    audio_status = models.CharField(max_length=20, choices=AUDIO_STATUSES, blank=True, db_index=True)
+    audio_error = models.TextField(blank=True)
+    audio_updated_at = models.DateTimeField(null=True, blank=True)
+    audio_compressed = models.FileField(upload_to='listening_audios/compressed', blank=True,
+                                        verbose_name="Siqilgan audio")
+    audio_waveform = models.FileField(upload_to='listening_audios/waveforms', blank=True,
+                                      help_text="Pleer uchun to'lqin shakli (peaks JSON)")
+    audio_duration = models.FloatField(null=True, blank=True, help_text="Davomiylik (soniya)")
+
+    # Foydalanuvchilar progressi (dars o'chirilsa progress ham o'chadi)
+    progress_records = GenericRelation('LessonProgress')
 
     class Meta:
         ordering = ['order']
@@ -121,6 +170,25 @@ class ListeningLesson(models.Model):
     def __str__(self):
         return f"{self.module.title} - {self.title} ({self.get_listening_type_display()})"
 
+    def audio_ready(self):
+        return self.audio_status == 'done' and bool(self.audio_compressed)
+
+    def get_audio_url(self):
+        """Pleer uchun audio (tayyor bo'lsa - siqilgan versiya)"""
+        if self.audio_ready():
+            return self.audio_compressed.url
+        return self.audio_file.url if self.audio_file else None
+
+    def audio_mime_type(self):
+        name = self.audio_compressed.name if self.audio_ready() else self.audio_file.name
+        return mimetypes.guess_type(name)[0] or 'audio/mpeg'
+
+    def audio_duration_display(self):
+        if not self.audio_duration:
+            return ''
+        minutes, seconds = divmod(int(round(self.audio_duration)), 60)
+        return f"{minutes}:{seconds:02d}"
+
 
 # 5. Yangi model: ListeningQuestion (Listening uchun savollar)
 class ListeningQuestion(models.Model):
@@ -276,6 +344,9 @@ class SpeakingLesson(models.Model):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Foydalanuvchilar progressi (dars o'chirilsa progress ham o'chadi)
+    progress_records = GenericRelation('LessonProgress')
+
     class Meta:
         ordering = ['order']
         verbose_name = "Speaking darsi"
@@ -299,8 +370,37 @@ class SpeakingQuestion(models.Model):
         return f"{self.speaking_lesson.title} - Savol {self.order}"
 
 
+class TTSCacheEntry(models.Model):
+    """TTS audio keshi: bir xil (matn, til, engine) uchun bitta mp3 fayl"""
+    key = models.CharField(max_length=64, unique=True, help_text="sha256(engine, til, matn)")
+    engine = models.CharField(max_length=20)
+    lang = models.CharField(max_length=10)
+    audio_file = models.FileField(upload_to='speaking_feedback')
+    size = models.PositiveIntegerField(default=0, help_text="Fayl hajmi (bayt)")
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name = "TTS kesh"
+        verbose_name_plural = "TTS kesh"
+
+    def __str__(self):
+        return f"{self.engine}/{self.lang} - {self.key[:12]}"
+
+
 class SpeakingAttempt(models.Model):
     """Speaking urinishlari"""
+    STATUSES = [
+        ('pending', 'Navbatda'),
+        ('stt', 'Nutq matnga o\'girilmoqda'),
+        ('analysis', 'AI tahlil qilmoqda'),
+        ('tts', 'Ovozli javob tayyorlanmoqda'),
+        ('done', 'Tayyor'),
+        ('failed', 'Xatolik'),
+    ]
+    STAGES = ['stt', 'analysis', 'tts']
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='speaking_attempts')
     speaking_lesson = models.ForeignKey(SpeakingLesson, on_delete=models.CASCADE, related_name='attempts')
     audio_file = models.FileField(upload_to=speaking_audio_upload_path, verbose_name="Audio fayl")
@@ -314,7 +414,14 @@ class SpeakingAttempt(models.Model):
     suggestions = models.TextField(blank=True, help_text="Takliflar")
     duration = models.IntegerField(default=0, help_text="Davomiylik (soniya)")
     word_count = models.IntegerField(default=0)
+    feedback_audio = models.FileField(upload_to='speaking_feedback', blank=True, verbose_name="AI ovozli javobi")
+    feedback_tts = models.ForeignKey(TTSCacheEntry, on_delete=models.SET_NULL, null=True, blank=True,
+                                     related_name='attempts')
+    status = models.CharField(max_length=20, choices=STATUSES, default='done', db_index=True)
+    error_message = models.TextField(blank=True)
+    stage_timings = models.JSONField(default=dict, blank=True, help_text="Bosqichlar vaqti (ms)")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
@@ -323,34 +430,57 @@ class SpeakingAttempt(models.Model):
         return f"{self.user.username} - {self.speaking_lesson.title} - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
 
 
-# 13. UserProgress MODELI (TO'G'RILANGAN VERSIYA)
-class UserProgress(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='progress')
-    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='user_progress', null=True, blank=True)
-    listening_lesson = models.ForeignKey(ListeningLesson, on_delete=models.CASCADE,
-                                         related_name='user_progress', null=True, blank=True)
-    speaking_lesson = models.ForeignKey(SpeakingLesson, on_delete=models.CASCADE,  # ← YANGI QATOR
-                                        related_name='user_progress', null=True, blank=True)
+# 13. LessonProgress MODELI
+class LessonProgress(models.Model):
+    """Foydalanuvchining istalgan turdagi dars bo'yicha umumiy progressi.
+
+    Kalit - (user, content_type, object_id); courses.progress orqali o'qiladi va yoziladi.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='lesson_progress')
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()  # darslar kaliti - BigAutoField
+    content_object = GenericForeignKey('content_type', 'object_id')
     completed = models.BooleanField(default=False)
     score = models.FloatField(default=0)
     completed_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        unique_together = [
-            ['user', 'lesson'],
-            ['user', 'listening_lesson'],
-            ['user', 'speaking_lesson']  # ← speaking_lesson maydoni e'lon qilinganidan keyin
+        constraints = [
+            # Indeksi (user, content_type, object_id) bo'yicha barcha o'qishlar uchun yetarli
+            models.UniqueConstraint(fields=['user', 'content_type', 'object_id'], name='unique_lesson_progress'),
         ]
+        verbose_name = "Progress"
+        verbose_name_plural = "Progresslar"
 
     def __str__(self):
-        if self.lesson:
-            return f"{self.user.username} - {self.lesson.title}"
-        elif self.listening_lesson:
-            return f"{self.user.username} - {self.listening_lesson.title} (Listening)"
-        elif self.speaking_lesson:
-            return f"{self.user.username} - {self.speaking_lesson.title} (Speaking)"
-        return f"{self.user.username} - Progress"
+        return f"{self.user.username} - {self.content_object} ({self.content_type.model})"
+
+
+class ModuleProgressSummary(models.Model):
+    """Foydalanuvchining modul bo'yicha yig'ma progressi (courses.progress yangilab boradi)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='module_summaries')
+    module = models.ForeignKey(Module, on_delete=models.CASCADE, related_name='progress_summaries')
+    completed_count = models.PositiveIntegerField(default=0)
+    total_count = models.PositiveIntegerField(default=0)
+    average_score = models.FloatField(default=0)
+    last_activity = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ['user', 'module']
+        verbose_name = "Modul progressi"
+        verbose_name_plural = "Modul progresslari"
+
+    def __str__(self):
+        return f"{self.user.username} - {self.module.title} - {self.completed_count}/{self.total_count}"
+
+    @property
+    def percent(self):
+        """Yakunlangan darslar foizi (0-100)"""
+        if not self.total_count:
+            return 0
+        return min(100, round(self.completed_count * 100 / self.total_count))
 
 
 # 14. UserQuestion MODELI
@@ -422,6 +552,9 @@ class ReadingLesson(models.Model):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Foydalanuvchilar progressi (dars o'chirilsa progress ham o'chadi)
+    progress_records = GenericRelation('LessonProgress')
+
     class Meta:
         ordering = ['order']
         verbose_name = "Reading darsi"
@@ -483,43 +616,6 @@ class UserReadingProgress(models.Model):
         return f"{self.user.username} - {self.reading_lesson.title} - {self.score}%"
 
 
-# UserProgress modelini yangilash
-class UserProgress(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='progress')
-    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE,
-                               related_name='user_progress', null=True, blank=True)
-    listening_lesson = models.ForeignKey(ListeningLesson, on_delete=models.CASCADE,
-                                         related_name='user_progress', null=True, blank=True)
-    speaking_lesson = models.ForeignKey(SpeakingLesson, on_delete=models.CASCADE,
-                                        related_name='user_progress', null=True, blank=True)
-    reading_lesson = models.ForeignKey(ReadingLesson, on_delete=models.CASCADE,
-                                       related_name='general_user_progress', null=True,
-                                       blank=True)  # O'ZGARDI: related_name
-    completed = models.BooleanField(default=False)
-    score = models.FloatField(default=0)
-    completed_at = models.DateTimeField(null=True, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
-
-    class Meta:
-        unique_together = [
-            ['user', 'lesson'],
-            ['user', 'listening_lesson'],
-            ['user', 'speaking_lesson'],
-            ['user', 'reading_lesson']
-        ]
-
-    def __str__(self):
-        if self.lesson:
-            return f"{self.user.username} - {self.lesson.title}"
-        elif self.listening_lesson:
-            return f"{self.user.username} - {self.listening_lesson.title} (Listening)"
-        elif self.speaking_lesson:
-            return f"{self.user.username} - {self.speaking_lesson.title} (Speaking)"
-        elif self.reading_lesson:
-            return f"{self.user.username} - {self.reading_lesson.title} (Reading)"
-        return f"{self.user.username} - Progress"
-
-
 # courses/models.py - WRITING MODELI QO'SHISH
 
 def writing_image_upload_path(instance, filename):
@@ -575,6 +671,9 @@ class WritingLesson(models.Model):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Foydalanuvchilar progressi (dars o'chirilsa progress ham o'chadi)
+    progress_records = GenericRelation('LessonProgress')
+
     class Meta:
         ordering = ['order']
         verbose_name = "Writing darsi"
@@ -586,6 +685,13 @@ class WritingLesson(models.Model):
 
 class WritingAttempt(models.Model):
     """Foydalanuvchi writing urinishlari"""
+    STATUSES = [
+        ('pending', 'Navbatda'),
+        ('analysis', 'AI tahlil qilmoqda'),
+        ('done', 'Tayyor'),
+        ('failed', 'Xatolik'),
+    ]
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='writing_attempts')
     writing_lesson = models.ForeignKey(WritingLesson, on_delete=models.CASCADE, related_name='attempts')
     answer_text = models.TextField(help_text="Foydalanuvchi javobi")
@@ -598,7 +704,11 @@ class WritingAttempt(models.Model):
     ai_feedback = models.TextField(blank=True, help_text="AI tahlili")
     suggestions = models.TextField(blank=True, help_text="Takliflar")
     time_spent = models.IntegerField(default=0, help_text="Sarflangan vaqt (soniya)")
+    status = models.CharField(max_length=20, choices=STATUSES, default='done', db_index=True)
+    error_message = models.TextField(blank=True)
+    stage_timings = models.JSONField(default=dict, blank=True, help_text="Bosqichlar vaqti (ms)")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
@@ -629,42 +739,45 @@ class UserWritingProgress(models.Model):
         return f"{self.user.username} - {self.writing_lesson.title} - {self.score}%"
 
 
-# UserProgress modeliga writing_lesson qo'shish
-class UserProgress(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='progress')
-    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE,
-                               related_name='user_progress', null=True, blank=True)
-    listening_lesson = models.ForeignKey(ListeningLesson, on_delete=models.CASCADE,
-                                         related_name='user_progress', null=True, blank=True)
-    speaking_lesson = models.ForeignKey(SpeakingLesson, on_delete=models.CASCADE,
-                                        related_name='user_progress', null=True, blank=True)
-    reading_lesson = models.ForeignKey(ReadingLesson, on_delete=models.CASCADE,
-                                       related_name='general_user_progress', null=True, blank=True)
-    writing_lesson = models.ForeignKey(WritingLesson, on_delete=models.CASCADE,  # YANGI QATOR
-                                       related_name='general_user_progress', null=True, blank=True)
-    completed = models.BooleanField(default=False)
-    score = models.FloatField(default=0)
-    completed_at = models.DateTimeField(null=True, blank=True)
+# Katta video/audio fayllarni bo'laklab (davom ettirish mumkin bo'lgan) yuklash
+class ChunkedUpload(models.Model):
+    """Admin tomonidan bo'laklab yuklanayotgan fayl"""
+    TARGETS = [
+        ('lesson', 'Video dars'),
+        ('listening', 'Listening audio'),
+    ]
+    STATUSES = [
+        ('uploading', 'Yuklanmoqda'),
+        ('verifying', 'Tekshirilmoqda'),
+        ('complete', 'Tugallangan'),
+        ('failed', 'Xatolik'),
+    ]
+    VERIFY_STATUSES = [
+        ('pending', 'Navbatda'),
+        ('verifying', 'sha256 tekshirilmoqda'),
+        ('done', 'Tayyor'),
+        ('failed', 'Xatolik'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chunked_uploads')
+    target = models.CharField(max_length=20, choices=TARGETS)
+    object_id = models.PositiveIntegerField()
+    filename = models.CharField(max_length=255, help_text="Asl fayl nomi")
+    file_name = models.CharField(max_length=255, help_text="MEDIA_ROOT ichidagi yakuniy yo'l")
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64)
+    status = models.CharField(max_length=20, choices=STATUSES, default='uploading')
+    error_message = models.TextField(blank=True)
+    # 'upload_verify' navbati (courses/jobs.py)
+    verify_status = models.CharField(max_length=20, choices=VERIFY_STATUSES, blank=True, db_index=True)
+    verify_updated_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        unique_together = [
-            ['user', 'lesson'],
-            ['user', 'listening_lesson'],
-            ['user', 'speaking_lesson'],
-            ['user', 'reading_lesson'],
-            ['user', 'writing_lesson']  # YANGI QATOR
-        ]
+        ordering = ['-created_at']
 
     def __str__(self):
-        if self.lesson:
-            return f"{self.user.username} - {self.lesson.title}"
-        elif self.listening_lesson:
-            return f"{self.user.username} - {self.listening_lesson.title} (Listening)"
-        elif self.speaking_lesson:
-            return f"{self.user.username} - {self.speaking_lesson.title} (Speaking)"
-        elif self.reading_lesson:
-            return f"{self.user.username} - {self.reading_lesson.title} (Reading)"
-        elif self.writing_lesson:
-            return f"{self.user.username} - {self.writing_lesson.title} (Writing)"
-        return f"{self.user.username} - Progress"
\ No newline at end of file
+        return f"{self.filename} ({self.received}/{self.size})"
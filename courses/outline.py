@@ -0,0 +1,137 @@
+# courses/outline.py - Modul tarkibi (barcha dars turlari bitta tartiblangan ro'yxatda) va kurs tarkibi
+#
+# Kesh kaliti versiyasi - modul (kurs) ning updated_at vaqti, javoblar kalitlaridagi kabi.
+# Tarkib o'zgarganda signals.py bazadagi updated_at ni yangilaydi, shuning uchun eski
+# kesh barcha jarayonlarda (gunicorn workerlari, `manage.py run_workers`) birdaniga eskiradi.
+
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .metrics import record_cache_lookup
+from .models import Course, Module, Lesson, ListeningLesson, SpeakingLesson, ReadingLesson, WritingLesson
+
+
+OutlineItem = namedtuple('OutlineItem', ['type', 'id', 'title', 'order'])
+
+# Dars turi -> model. Tartib bir xil `order` li darslar uchun ham saqlanadi.
+OUTLINE_MODELS = (
+    ('video', Lesson),
+    ('listening', ListeningLesson),
+    ('speaking', SpeakingLesson),
+    ('reading', ReadingLesson),
+    ('writing', WritingLesson),
+)
+
+OUTLINE_CACHE_KEY = 'module_outline:{module_id}:{version}'
+
+
+class ModuleOutline:
+    """Modulning tartiblangan tarkibi va har bir dars indeksi"""
+
+    def __init__(self, module_id, items):
+        self.module_id = module_id
+        self.items = tuple(items)
+        self._positions = {(item.type, item.id): index for index, item in enumerate(self.items)}
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def neighbours(self, lesson_type, lesson_id):
+        """Oldingi va keyingi darsni (tur, dars) ko'rinishida qaytarish"""
+        index = self._positions.get((lesson_type, lesson_id))
+        if index is None:
+            return None, None
+
+        prev_item = self.items[index - 1] if index > 0 else None
+        next_item = self.items[index + 1] if index < len(self.items) - 1 else None
+        return (
+            (prev_item.type, prev_item) if prev_item else None,
+            (next_item.type, next_item) if next_item else None,
+        )
+
+
+def build_module_outline(module_id):
+    """Modul tarkibini bazadan yig'ish (har bir dars turi uchun bitta so'rov)"""
+    items = []
+    for lesson_type, model in OUTLINE_MODELS:
+        rows = model.objects.filter(module_id=module_id).order_by('order', 'id').values_list('id', 'title', 'order')
+        items.extend(OutlineItem(lesson_type, lesson_id, title, order) for lesson_id, title, order in rows)
+
+    # sort() barqaror - bir xil order da dars turlari tartibi saqlanadi
+    items.sort(key=lambda item: item.order)
+    return ModuleOutline(module_id, items)
+
+
+def cache_version(instance):
+    """Kesh kaliti versiyasi - updated_at (mikrosoniyalarda)"""
+    return int(instance.updated_at.timestamp() * 1000000)
+
+
+def get_module_outline(module):
+    """Modul tarkibini keshdan olish (yo'q bo'lsa yig'ib, keshga yozish)."""
+    key = OUTLINE_CACHE_KEY.format(module_id=module.id, version=cache_version(module))
+    outline = cache.get(key)
+    record_cache_lookup('module_outline', outline)
+    if outline is None:
+        outline = build_module_outline(module.id)
+        cache.set(key, outline, settings.MODULE_OUTLINE_CACHE_TIMEOUT)
+    return outline
+
+
+def invalidate_module_outlines(module_ids):
+    """Modullar updated_at vaqtini yangilash (tarkib keshi versiyasi o'zgaradi)"""
+    Module.objects.filter(pk__in=module_ids).update(updated_at=timezone.now())
+
+
+# Kurs tarkibi: modullar va har bir moduldagi dars turlari soni (bitta so'rov)
+
+COURSE_OUTLINE_CACHE_KEY = 'course_outline:{course_id}:{version}'
+
+
+def lesson_count(model):
+    """Moduldagi `model` darslari soni (korrelyatsiyalangan subquery)"""
+    counts = model.objects.filter(module=OuterRef('pk')).order_by().values('module').annotate(
+        count=Count('pk')).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def build_course_outline(course_id):
+    """Kurs modullari, har biriga `<tur>_count` va `lesson_count` qo'shilgan"""
+    modules = list(Module.objects.filter(course_id=course_id).order_by('order').annotate(
+        **{f'{lesson_type}_count': lesson_count(model) for lesson_type, model in OUTLINE_MODELS}
+    ))
+    for module in modules:
+        module.lesson_count = sum(getattr(module, f'{lesson_type}_count') for lesson_type, _ in OUTLINE_MODELS)
+    return modules
+
+
+def get_course_outline(course):
+    """Kurs tarkibini keshdan olish (yo'q bo'lsa yig'ib, keshga yozish)."""
+    key = COURSE_OUTLINE_CACHE_KEY.format(course_id=course.id, version=cache_version(course))
+    modules = cache.get(key)
+    record_cache_lookup('course_outline', modules)
+    if modules is None:
+        modules = build_course_outline(course.id)
+        cache.set(key, modules, settings.MODULE_OUTLINE_CACHE_TIMEOUT)
+    return modules
+
+
+def course_totals(modules):
+    """{dars turi: kursdagi jami soni}"""
+    return {lesson_type: sum(getattr(module, f'{lesson_type}_count') for module in modules)
+            for lesson_type, _ in OUTLINE_MODELS}
+
+
+def invalidate_course_outlines(course_ids=None, module_ids=None):
+    """Kurslar (yoki shu modullar kurslari) updated_at vaqtini yangilash (tarkib keshi versiyasi o'zgaradi)"""
+    courses = Course.objects.filter(pk__in=course_ids) if course_ids is not None else \
+        Course.objects.filter(modules__in=module_ids)
+    courses.update(updated_at=timezone.now())
@@ -0,0 +1,301 @@
+# courses/progress.py - Foydalanuvchi progressi bilan ishlash
+#
+# Progress yozish: get_or_create + save o'rniga har bir qator uchun bitta
+# INSERT ... ON CONFLICT DO UPDATE (PostgreSQL va SQLite). Bir vaqtdagi ikki
+# marta yuborishda qator yo'qolmaydi, best_score/attempts_count/time_spent
+# mavjud qiymat ustida bazaning o'zida hisoblanadi.
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models import Avg, Count, Max, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+from .models import Lesson, LessonProgress, ListeningLesson, ModuleProgressSummary, ReadingLesson, SpeakingLesson, \
+    UserReadingProgress, UserWritingProgress, WritingLesson
+from .outline import get_module_outline
+
+
+# Dars turi -> dars modeli (LessonProgress.content_type)
+PROGRESS_MODELS = {
+    'video': Lesson,
+    'listening': ListeningLesson,
+    'speaking': SpeakingLesson,
+    'reading': ReadingLesson,
+    'writing': WritingLesson,
+}
+
+
+def content_types():
+    """{dars turi: ContentType} - ContentType keshidan (jarayonda bir marta so'rov)"""
+    by_model = ContentType.objects.get_for_models(*PROGRESS_MODELS.values())
+    return {lesson_type: by_model[model] for lesson_type, model in PROGRESS_MODELS.items()}
+
+
+def lesson_type_of(lesson):
+    for lesson_type, model in PROGRESS_MODELS.items():
+        if isinstance(lesson, model):
+            return lesson_type
+    raise ValueError(f"Progress yuritilmaydigan model: {type(lesson).__name__}")
+
+
+def get_progress(user, lesson):
+    """Bitta dars bo'yicha progress (LessonProgress yoki None)"""
+    return LessonProgress.objects.filter(
+        user=user, content_type=content_types()[lesson_type_of(lesson)], object_id=lesson.pk,
+    ).first()
+
+
+def progress_map(rows, types):
+    lesson_types = {content_type.id: lesson_type for lesson_type, content_type in types.items()}
+    return {
+        (lesson_types[row['content_type_id']], row['object_id']): {
+            'completed': row['completed'],
+            'score': row['score'],
+        }
+        for row in rows
+    }
+
+
+def get_user_progress(user):
+    """Foydalanuvchining barcha progresslari (bitta indeks oralig'i).
+
+    Natija: {(dars_turi, dars_id): {'completed': ..., 'score': ...}}
+    """
+    types = content_types()
+    rows = LessonProgress.objects.filter(user=user, content_type__in=types.values()).values(
+        'content_type_id', 'object_id', 'completed', 'score'
+    )
+    return progress_map(rows, types)
+
+
+def module_lessons(module_id):
+    """LessonProgress uchun filtr: moduldagi barcha turdagi darslar"""
+    types = content_types()
+    module_filter = Q()
+    for lesson_type, model in PROGRESS_MODELS.items():
+        module_filter |= Q(content_type=types[lesson_type],
+                           object_id__in=model.objects.filter(module_id=module_id).values('pk'))
+    return module_filter
+
+
+def get_module_progress(user, module):
+    """Modul bo'yicha foydalanuvchining barcha progresslarini bitta so'rovda olish.
+
+    Natija: {(dars_turi, dars_id): {'completed': ..., 'score': ...}}
+    """
+    types = content_types()
+    rows = LessonProgress.objects.filter(module_lessons(module.id), user=user).values(
+        'content_type_id', 'object_id', 'completed', 'score'
+    )
+    return progress_map(rows, types)
+
+
+def apply_progress(lessons, progress_map):
+    """Progress ma'lumotlarini darslar ro'yxatiga qo'shish"""
+    for item in lessons:
+        progress = progress_map.get((item['type'], item['id']))
+        item['completed'] = progress['completed'] if progress else False
+        item['score'] = progress['score'] if progress else 0
+    return lessons
+
+
+# ON CONFLICT DO UPDATE ifodalari: {old} - mavjud qator, {new} - kiritilayotgan qator (EXCLUDED)
+SET_NEW = '{new}.{column}'
+KEEP_FIRST = 'COALESCE({old}.{column}, {new}.{column})'
+GREATEST = '{greatest}({old}.{column}, {new}.{column})'
+ADD = '{old}.{column} + {new}.{column}'
+INCREMENT = '{old}.{column} + 1'
+
+# Birinchi tugatilgan vaqt saqlanadi (qayta topshirishda o'zgarmaydi)
+PROGRESS_UPDATES = {'score': SET_NEW, 'completed': SET_NEW, 'completed_at': KEEP_FIRST}
+
+
+def upsert(model, rows, conflict_fields, updates):
+    """Qatorlarni bitta INSERT ... ON CONFLICT (conflict_fields) DO UPDATE bilan yozish.
+
+    rows - [{maydon: qiymat}] (hammasida bir xil maydonlar); updates - {maydon: ifoda}.
+    """
+    if not rows:
+        return
+    opts = model._meta
+    qn = connection.ops.quote_name
+    fields = [opts.get_field(name) for name in rows[0]]
+    greatest = 'GREATEST' if connection.vendor == 'postgresql' else 'MAX'
+
+    columns = ', '.join(qn(field.column) for field in fields)
+    placeholders = ', '.join(['(%s)' % ', '.join(['%s'] * len(fields))] * len(rows))
+    conflict = ', '.join(qn(opts.get_field(name).column) for name in conflict_fields)
+    assignments = ', '.join(
+        f'{qn(opts.get_field(name).column)} = ' + expression.format(
+            old=qn(opts.db_table), new='EXCLUDED', column=qn(opts.get_field(name).column), greatest=greatest)
+        for name, expression in updates.items()
+    )
+    params = [field.get_db_prep_save(row[field.name], connection) for row in rows for field in fields]
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {qn(opts.db_table)} ({columns}) VALUES {placeholders} '
+            f'ON CONFLICT ({conflict}) DO UPDATE SET {assignments}',
+            params,
+        )
+
+
+def record_progresses(user, results):
+    """Darslar progressi (har bir dars turi uchun bitta upsert) va modullar yig'ma progressi.
+
+    results - [(dars obyekti, ball, tugatildimi)]
+    """
+    now = timezone.now()
+    types = content_types()
+    rows = {}
+    for lesson, score, completed in results:
+        lesson_type = lesson_type_of(lesson)
+        rows.setdefault(lesson_type, []).append({
+            'user': user.pk, 'content_type': types[lesson_type].pk, 'object_id': lesson.pk, 'score': score,
+            'completed': completed, 'completed_at': now if completed else None, 'created_at': now,
+            'updated_at': now,
+        })
+    for lesson_type_rows in rows.values():
+        upsert(LessonProgress, lesson_type_rows, ['user', 'content_type', 'object_id'],
+               {**PROGRESS_UPDATES, 'updated_at': SET_NEW})
+    refresh_module_summaries(user, {lesson.module for lesson, _, _ in results})
+
+
+def record_progress(user, lesson, score, completed):
+    record_progresses(user, [(lesson, score, completed)])
+
+
+def record_reading_progresses(user, results):
+    """results - [(reading id, ball, tugatildimi, time_spent, to'g'ri javoblar, jami savollar)]"""
+    now = timezone.now()
+    upsert(UserReadingProgress, [{
+        'user': user.pk, 'reading_lesson': reading_id, 'score': score, 'completed': completed,
+        'completed_at': now if completed else None, 'created_at': now, 'time_spent': time_spent,
+        'correct_answers': correct_answers, 'total_questions': total_questions,
+    } for reading_id, score, completed, time_spent, correct_answers, total_questions in results],
+        ['user', 'reading_lesson'],
+        {**PROGRESS_UPDATES, 'time_spent': SET_NEW, 'correct_answers': SET_NEW, 'total_questions': SET_NEW})
+
+
+def record_writing_attempt(user, writing, score, time_spent):
+    """Writing urinishi: umumiy progress va best_score (faqat oshadi), attempts_count va
+    time_spent (qo'shiladi) bazada atomik yangilanadi."""
+    now = timezone.now()
+    record_progress(user, writing, score, True)
+    upsert(UserWritingProgress, [{
+        'user': user.pk, 'writing_lesson': writing.pk, 'score': score, 'best_score': score, 'completed': True,
+        'attempts_count': 1, 'time_spent': time_spent, 'completed_at': now, 'created_at': now,
+    }], ['user', 'writing_lesson'], {
+        **PROGRESS_UPDATES, 'best_score': GREATEST, 'attempts_count': INCREMENT, 'time_spent': ADD,
+    })
+
+
+# Modullar bo'yicha yig'ma progress (ModuleProgressSummary)
+#
+# Har bir progress yozilgandan keyin faqat o'zgargan (user, modul) qatori qayta
+# hisoblanadi: bitta agregat so'rov va bitta upsert. Jami darslar soni keshdagi
+# modul tarkibidan olinadi (darslar select_related('module') bilan yuklanadi); darslar qo'shilsa, ko'chirilsa yoki o'chirilsa
+# signals.py faqat shu modullarni yangilaydi.
+
+SUMMARY_UPDATES = {'completed_count': SET_NEW, 'total_count': SET_NEW, 'average_score': SET_NEW,
+                   'last_activity': SET_NEW}
+
+
+def refresh_summaries(user_ids, modules):
+    """Foydalanuvchilar (id) va modullar bo'yicha yig'ma progressni qayta hisoblash"""
+    rows = []
+    for module in sorted(modules, key=lambda module: module.pk):
+        module_id = module.pk
+        total_count = len(get_module_outline(module))
+        for user_id in sorted(user_ids):
+            stats = LessonProgress.objects.filter(module_lessons(module_id), user_id=user_id).aggregate(
+                completed_count=Count('id', filter=Q(completed=True)),
+                average_score=Avg('score'),
+                last_activity=Max('updated_at'),
+            )
+            rows.append({
+                'user': user_id, 'module': module_id, 'completed_count': stats['completed_count'],
+                'total_count': total_count, 'average_score': stats['average_score'] or 0,
+                'last_activity': stats['last_activity'],
+            })
+    upsert(ModuleProgressSummary, rows, ['user', 'module'], SUMMARY_UPDATES)
+
+
+def refresh_module_summaries(user, modules):
+    """Foydalanuvchining ko'rsatilgan modullar bo'yicha yig'ma progressini yangilash"""
+    refresh_summaries([user.pk], modules)
+
+
+def update_module_totals(modules):
+    """Modullar tarkibi o'zgarganda barcha yig'ma progresslardagi jami darslar soni"""
+    for module in modules:
+        ModuleProgressSummary.objects.filter(module=module).update(total_count=len(get_module_outline(module)))
+
+
+def lesson_progress_users(lesson):
+    """Dars bo'yicha progressi bor foydalanuvchilar (id)"""
+    return list(LessonProgress.objects.filter(
+        content_type=content_types()[lesson_type_of(lesson)], object_id=lesson.pk,
+    ).values_list('user_id', flat=True))
+
+
+def rebuild_module_summaries(module_ids=None, batch_size=1000):
+    """Yig'ma progressni LessonProgress dan to'liq qayta qurish (module_ids=None - hamma modullar).
+
+    Har bir dars turi uchun bitta guruhlangan so'rov. Natija: yozilgan qatorlar soni.
+    """
+    types = content_types()
+    totals = {}
+    stats = {}
+
+    for lesson_type, model in PROGRESS_MODELS.items():
+        lessons = model.objects.all()
+        if module_ids is not None:
+            lessons = lessons.filter(module_id__in=module_ids)
+        for row in lessons.values('module_id').annotate(count=Count('id')).order_by():
+            totals[row['module_id']] = totals.get(row['module_id'], 0) + row['count']
+
+        rows = LessonProgress.objects.filter(content_type=types[lesson_type]).annotate(
+            module_id=Subquery(model.objects.filter(pk=OuterRef('object_id')).values('module_id')[:1]),
+        )
+        if module_ids is not None:
+            rows = rows.filter(module_id__in=module_ids)
+        for row in rows.values('user_id', 'module_id').annotate(
+            completed_count=Count('id', filter=Q(completed=True)),
+            score_sum=Sum('score'),
+            rows=Count('id'),
+            last_activity=Max('updated_at'),
+        ).order_by():
+            if row['module_id'] is None:
+                continue
+            current = stats.setdefault((row['user_id'], row['module_id']), [0, 0.0, 0, None])
+            current[0] += row['completed_count']
+            current[1] += row['score_sum'] or 0
+            current[2] += row['rows']
+            if current[3] is None or (row['last_activity'] and row['last_activity'] > current[3]):
+                current[3] = row['last_activity']
+
+    summaries = [
+        ModuleProgressSummary(
+            user_id=user_id, module_id=module_id, completed_count=completed_count,
+            total_count=totals.get(module_id, 0), average_score=score_sum / rows if rows else 0,
+            last_activity=last_activity,
+        )
+        for (user_id, module_id), (completed_count, score_sum, rows, last_activity) in stats.items()
+    ]
+
+    with transaction.atomic():
+        existing = ModuleProgressSummary.objects.all()
+        if module_ids is not None:
+            existing = existing.filter(module_id__in=module_ids)
+        existing.delete()
+        ModuleProgressSummary.objects.bulk_create(summaries, batch_size=batch_size)
+    return len(summaries)
+
+
+def get_module_summaries(user, module_ids):
+    """{modul id: ModuleProgressSummary} - bitta indeks bo'yicha o'qish"""
+    if not user.is_authenticated:
+        return {}
+    return {summary.module_id: summary
+            for summary in ModuleProgressSummary.objects.filter(user=user, module_id__in=module_ids)}
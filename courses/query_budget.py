@@ -0,0 +1,163 @@
+# courses/query_budget.py - So'rov (request) davomidagi SQL so'rovlar soni, vaqti va N+1 naqshlari
+#
+# Barcha baza ulanishlariga execute_wrapper o'rnatiladi: har bir SQL so'rov
+# sanaladi, vaqti o'lchanadi va "shakli" (parametrlar va IN (...) ro'yxati
+# uzunligidan tozalangan matni) bo'yicha guruhlanadi. Bir xil shakl ko'p marta
+# takrorlansa - bu odatda sikl ichidagi so'rov (N+1). Har bir detail va submit
+# view uchun QUERY_BUDGETS da so'rovlar chegarasi bor; QUERY_BUDGET_STRICT
+# yoqilganda (testlarda) chegaradan oshish xato hisoblanadi.
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# URL nomi -> bitta so'rovda ruxsat etilgan eng ko'p SQL so'rovlar (session va user ham kiradi).
+# Chegara darsdagi savollar/modullar soniga bog'liq bo'lmasligi kerak.
+QUERY_BUDGETS = {
+    # Sahifalar
+    'course_detail': 5,
+    'module_detail': 10,
+    'lesson_detail': 7,
+    'listening_detail': 6,
+    'speaking_detail': 5,
+    'reading_detail': 7,
+    'writing_detail': 6,
+    # Natija yuborish
+    'submit_test': 8,
+    'submit_question': 4,
+    'check_listening_answers': 8,
+    'save_listening_progress': 6,
+    'submit_listening_test': 8,
+    'submit_reading_test': 9,
+    'submit_writing': 11,  # WRITING_QUEUE_ENABLED=False: AI tahlili va progress ham shu so'rovda
+    'submit_batch': 17,
+    'process_speaking': 6,
+}
+
+PLACEHOLDER_LIST = re.compile(r'\((?:%s|\?)(?:\s*,\s*(?:%s|\?))*\)')
+NUMBER = re.compile(r'\b\d+\b')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """View so'rovlar chegarasidan oshdi"""
+
+
+def query_shape(sql):
+    """SQL ning parametrlarsiz shakli: IN (%s, %s, ...) -> IN (...), sonlar -> N"""
+    return NUMBER.sub('N', PLACEHOLDER_LIST.sub('(...)', sql))
+
+
+class QueryCounter:
+    """connection.execute_wrapper: faqat so'rovlar soni va umumiy vaqti (production metrikalari uchun)"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+            self.record(sql)
+
+    def record(self, sql):
+        pass
+
+
+class QueryStats(QueryCounter):
+    """QueryCounter + so'rov shakllari (N+1 tahlili uchun)"""
+
+    def __init__(self):
+        super().__init__()
+        self.shapes = Counter()
+
+    def record(self, sql):
+        self.shapes[query_shape(sql)] += 1
+
+    def repeated(self, threshold=None):
+        """[(shakl, necha marta)] - kamida `threshold` marta bajarilgan shakllar (N+1 gumoni)"""
+        threshold = threshold or settings.QUERY_NPLUSONE_THRESHOLD
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    def report(self):
+        lines = [f"{self.count} queries, {self.seconds * 1000:.1f}ms"]
+        lines.extend(f"  {count}x {shape}" for shape, count in self.repeated())
+        return '\n'.join(lines)
+
+
+@contextmanager
+def collect_queries(stats_class=QueryStats):
+    """Blok ichidagi barcha ulanishlar so'rovlarini QueryStats (yoki QueryCounter) ga yig'ish"""
+    stats = stats_class()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(stats))
+        yield stats
+
+
+def check_budget(name, stats):
+    """Chegaradan oshgan bo'lsa xabar matni, aks holda None"""
+    budget = QUERY_BUDGETS.get(name)
+    if budget is None or stats.count <= budget:
+        return None
+    return f"{name}: {stats.count} SQL queries, budget {budget}\n{stats.report()}"
+
+
+@contextmanager
+def query_budget(name):
+    """Test yordamchisi: blok ichidagi so'rovlar `name` view chegarasidan oshsa QueryBudgetExceeded"""
+    with collect_queries() as stats:
+        yield stats
+    message = check_budget(name, stats)
+    if message:
+        raise QueryBudgetExceeded(message)
+
+
+class QueryBudgetMiddleware:
+    """Har bir so'rovning SQL statistikasi.
+
+    QUERY_STATS_ENABLED (default False) - javobga X-DB-* sarlavhalari qo'shiladi;
+    takrorlanuvchi so'rovlar va chegaradan oshish logga yoziladi,
+    QUERY_BUDGET_STRICT bo'lsa chegaradan oshish QueryBudgetExceeded xatosi.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not (settings.QUERY_STATS_ENABLED or settings.QUERY_BUDGET_STRICT):
+            return self.get_response(request)
+
+        with collect_queries() as stats:
+            response = self.get_response(request)
+
+        name = request.resolver_match.url_name if request.resolver_match else None
+        repeated = stats.repeated()
+
+        if settings.QUERY_STATS_ENABLED:
+            response['X-DB-Query-Count'] = str(stats.count)
+            response['X-DB-Time-Ms'] = f"{stats.seconds * 1000:.1f}"
+            response['X-DB-Repeated-Queries'] = str(sum(count for _, count in repeated))
+            if name in QUERY_BUDGETS:
+                response['X-DB-Query-Budget'] = str(QUERY_BUDGETS[name])
+
+        if repeated:
+            logger.warning("Possible N+1 queries in %s (%s):\n%s", request.path, name, stats.report())
+
+        message = check_budget(name, stats)
+        if message:
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning("Query budget exceeded: %s", message)
+
+        return response
@@ -0,0 +1,162 @@
+# courses/signals.py - Kesh ma'lumotlarini yangilash uchun signallar
+
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Module, Lesson, ListeningLesson, SpeakingLesson, ReadingLesson, WritingLesson, ListeningQuestion, \
+    ListeningOption, GapFillingQuestion, GapOption, TrueFalseNotGiven, MatchingQuestion
+from .jobs import enqueue
+from .outline import invalidate_course_outlines, invalidate_module_outlines
+from .progress import lesson_progress_users, refresh_summaries, update_module_totals
+
+
+@receiver(pre_save, sender=Lesson)
+@receiver(pre_save, sender=ListeningLesson)
+@receiver(pre_save, sender=SpeakingLesson)
+@receiver(pre_save, sender=ReadingLesson)
+@receiver(pre_save, sender=WritingLesson)
+def lesson_moving(sender, instance, **kwargs):
+    """Dars boshqa modulga ko'chirilsa eski modul tarkibi ham yangilanishi uchun avvalgi modulni eslab qolish"""
+    previous = None
+    if instance.pk is not None:
+        previous = sender.objects.filter(pk=instance.pk).values_list('module_id', flat=True).first()
+    instance._previous_module_id = previous
+
+
+def affected_modules(instance):
+    """Dars o'zgarishi ta'sir qiladigan modullar: hozirgi va (ko'chirilgan bo'lsa) avvalgi"""
+    previous = getattr(instance, '_previous_module_id', None)
+    return {instance.module_id} | ({previous} if previous is not None else set())
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_save, sender=ListeningLesson)
+@receiver(post_save, sender=SpeakingLesson)
+@receiver(post_save, sender=ReadingLesson)
+@receiver(post_save, sender=WritingLesson)
+@receiver(post_delete, sender=Lesson)
+@receiver(post_delete, sender=ListeningLesson)
+@receiver(post_delete, sender=SpeakingLesson)
+@receiver(post_delete, sender=ReadingLesson)
+@receiver(post_delete, sender=WritingLesson)
+def lesson_changed(sender, instance, **kwargs):
+    """Dars o'zgarganda modul va kurs tarkibi keshlarini eskirtirish"""
+    module_ids = affected_modules(instance)
+    invalidate_module_outlines(module_ids)
+    # Ko'chirilgan dars ikki kursga tegishli bo'lishi mumkin - ikkalasi bitta UPDATE da
+    invalidate_course_outlines(module_ids=module_ids)
+
+
+@receiver(post_save, sender=Module)
+@receiver(post_delete, sender=Module)
+def module_changed(sender, instance, **kwargs):
+    """Modul qo'shilganda, o'zgarganda yoki o'chirilganda kurs tarkibi keshini eskirtirish"""
+    invalidate_course_outlines([instance.course_id])
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_save, sender=ListeningLesson)
+@receiver(post_save, sender=SpeakingLesson)
+@receiver(post_save, sender=ReadingLesson)
+@receiver(post_save, sender=WritingLesson)
+def lesson_added(sender, instance, created, **kwargs):
+    """Yangi yoki boshqa modulga ko'chirilgan dars - modullar yig'ma progressini yangilash"""
+    module_ids = affected_modules(instance)
+    if not created and len(module_ids) == 1:
+        return
+    # lesson_changed dan keyin - tarkib keshining yangi versiyasi bilan
+    modules = list(Module.objects.filter(pk__in=module_ids))
+    update_module_totals(modules)
+    if len(modules) > 1:
+        # Ko'chirilgan dars progressi eski moduldan yangisiga o'tadi
+        refresh_summaries(lesson_progress_users(instance), modules)
+
+
+def deleted_with_module(sender, origin):
+    """Dars modul (yoki kurs) bilan birga o'chirilmoqda - yig'ma progresslar ham CASCADE bilan o'chadi"""
+    return origin is not None and not isinstance(origin, sender) and getattr(origin, 'model', None) is not sender
+
+
+@receiver(pre_delete, sender=Lesson)
+@receiver(pre_delete, sender=ListeningLesson)
+@receiver(pre_delete, sender=SpeakingLesson)
+@receiver(pre_delete, sender=ReadingLesson)
+@receiver(pre_delete, sender=WritingLesson)
+def lesson_removing(sender, instance, origin=None, **kwargs):
+    """Progresslar dars bilan birga o'chadi - kimning yig'ma progressi o'zgarishini oldindan eslab qolish"""
+    instance._progress_user_ids = [] if deleted_with_module(sender, origin) else lesson_progress_users(instance)
+
+
+@receiver(post_delete, sender=Lesson)
+@receiver(post_delete, sender=ListeningLesson)
+@receiver(post_delete, sender=SpeakingLesson)
+@receiver(post_delete, sender=ReadingLesson)
+@receiver(post_delete, sender=WritingLesson)
+def lesson_removed(sender, instance, origin=None, **kwargs):
+    """Dars o'chirilganda: modul jami darslar soni va shu dars progressi bo'lgan foydalanuvchilar yig'masi"""
+    if deleted_with_module(sender, origin):
+        return
+    modules = list(Module.objects.filter(pk=instance.module_id))
+    update_module_totals(modules)
+    refresh_summaries(getattr(instance, '_progress_user_ids', []), modules)
+
+
+# Yangi media fayl yuklanganda qayta ishlash navbati: model -> (fayl maydoni, navbat)
+MEDIA_PROCESSING = {
+    Lesson: ('video_file', 'transcode'),
+    ListeningLesson: ('audio_file', 'listening_audio'),
+}
+
+
+@receiver(pre_save, sender=Lesson)
+@receiver(pre_save, sender=ListeningLesson)
+def media_file_changing(sender, instance, **kwargs):
+    """Yangi fayl yuklanganini belgilash"""
+    field_name, _ = MEDIA_PROCESSING[sender]
+    media_file = getattr(instance, field_name)
+    if not media_file:
+        instance._media_changed = False
+        return
+    previous = sender.objects.filter(pk=instance.pk).values_list(field_name, flat=True).first()
+    instance._media_changed = previous != media_file.name
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_save, sender=ListeningLesson)
+def media_file_changed(sender, instance, **kwargs):
+    """Yangi video HLS ga, yangi listening audio siqilgan versiyaga o'giriladi"""
+    if getattr(instance, '_media_changed', False):
+        instance._media_changed = False
+        _, queue_name = MEDIA_PROCESSING[sender]
+        transaction.on_commit(lambda: enqueue(queue_name, instance))
+
+
+def touch_listening_lesson(listening_lesson_id):
+    """Listening darsining updated_at vaqtini yangilash (javoblar kaliti versiyasi o'zgaradi)"""
+    ListeningLesson.objects.filter(id=listening_lesson_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=ListeningQuestion)
+@receiver(post_save, sender=GapFillingQuestion)
+@receiver(post_save, sender=TrueFalseNotGiven)
+@receiver(post_save, sender=MatchingQuestion)
+@receiver(post_delete, sender=ListeningQuestion)
+@receiver(post_delete, sender=GapFillingQuestion)
+@receiver(post_delete, sender=TrueFalseNotGiven)
+@receiver(post_delete, sender=MatchingQuestion)
+def listening_question_changed(sender, instance, **kwargs):
+    touch_listening_lesson(instance.listening_lesson_id)
+
+
+@receiver(post_save, sender=ListeningOption)
+@receiver(post_delete, sender=ListeningOption)
+def listening_option_changed(sender, instance, **kwargs):
+    ListeningLesson.objects.filter(questions__id=instance.question_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=GapOption)
+@receiver(post_delete, sender=GapOption)
+def gap_option_changed(sender, instance, **kwargs):
+    ListeningLesson.objects.filter(gap_fillings__id=instance.gap_filling_id).update(updated_at=timezone.now())
@@ -0,0 +1,352 @@
+# courses/stt.py - Nutqni bo'laklab (parallel) matnga o'girish
+#
+# Butun 5 daqiqalik javobni bitta recognize_google so'rovi bilan yuborish sekin va
+# xato bo'lsa hammasi qaytadan yuboriladi. Bu yerda audio ovoz faolligi (energiya
+# bo'yicha VAD) asosida jimlik joylaridan segmentlarga bo'linadi, segmentlar
+# cheklangan ThreadPoolExecutor'da parallel (yoki lokal modelda guruhlab) taniladi va
+# tartib bo'yicha qo'shiladi. Backend STT_ENGINE sozlamasi bilan tanlanadi.
+
+import json
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import repeat
+
+import speech_recognition as sr
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+from . import audio_ingest
+from .audio_ingest import FRAME_SECONDS, SAMPLE_WIDTH, frame_energies, vad_threshold
+
+logger = logging.getLogger(__name__)
+
+
+class TranscriptionFailed(sr.RequestError):
+    """Segmentlarning hammasi yoki ko'pchiligi tanilmadi - qisqargan matn baholanmasligi kerak"""
+
+
+class Segment:
+    """Nutq segmenti: [start, end) soniyalar oralig'i va tanish natijasi"""
+
+    def __init__(self, index, start, end):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.text = ''
+        self.error = None
+        self.seconds = 0.0
+
+    def as_dict(self):
+        return {
+            'index': self.index,
+            'start': round(self.start, 2),
+            'end': round(self.end, 2),
+            'text': self.text,
+            'error': self.error,
+            'seconds': round(self.seconds, 3),
+        }
+
+
+def detect_segments(energies, frame_seconds=FRAME_SECONDS):
+    """Ovozli freymlarni segmentlarga birlashtirish. Natija: [(start_freym, end_freym)]"""
+    if not energies:
+        return []
+
+    threshold = vad_threshold(energies)
+
+    max_gap = int(settings.STT_VAD_MIN_SILENCE / frame_seconds)
+    padding = int(settings.STT_VAD_PADDING / frame_seconds)
+    min_frames = int(settings.STT_SEGMENT_MIN_SECONDS / frame_seconds)
+    max_frames = int(settings.STT_SEGMENT_MAX_SECONDS / frame_seconds)
+
+    voiced = []
+    start = last = None
+    for index, energy in enumerate(energies):
+        if energy < threshold:
+            continue
+        if start is None:
+            start = index
+        elif index - last > max_gap:
+            voiced.append((start, last + 1))
+            start = index
+        last = index
+    if start is not None:
+        voiced.append((start, last + 1))
+
+    segments = []
+    for start, end in voiced:
+        start = max(0, start - padding)
+        end = min(len(energies), end + padding)
+        # Uzun segmentni eng jim freymdan bo'lish
+        while end - start > max_frames:
+            search_from = start + max_frames // 2
+            cut = min(range(search_from, start + max_frames), key=lambda i: energies[i])
+            segments.append((start, cut))
+            start = cut
+        segments.append((start, end))
+
+    return [(start, end) for start, end in segments if end - start >= min_frames]
+
+
+# STT engine'lar
+#
+# Engine 16-bit mono PCM bo'lagini matnga o'giradi. Tarmoq engine'lari (Google)
+# segmentlarni parallel oqimlarda yuboradi; lokal model engine'lari (Vosk) esa
+# jarayonda bir marta yuklanadi. MicroBatcher bir nechta urinishlarning
+# segmentlarini guruhlaydi, engine guruhni o'z recognizer'lari to'plamida
+# parallel dekodlaydi (model xotirada bitta, oqimlar soni STT_VOSK_THREADS).
+
+class STTEngine:
+    """STT backend interfeysi"""
+    name = ''
+    batched = False  # True - segmentlar MicroBatcher orqali yuboriladi
+
+    def recognize(self, raw, sample_rate, language):
+        """Bitta bo'lak. Nutq topilmasa '' qaytaradi, xizmat xatosida sr.RequestError."""
+        raise NotImplementedError
+
+    def recognize_item(self, item):
+        """(raw, sample_rate, language) -> matn yoki Exception"""
+        try:
+            return self.recognize(*item)
+        except Exception as e:
+            return e
+
+    def recognize_batch(self, items):
+        """[(raw, sample_rate, language)] -> [matn yoki Exception]"""
+        return [self.recognize_item(item) for item in items]
+
+
+class GoogleEngine(STTEngine):
+    """Google Web Speech API (speech_recognition.recognize_google)"""
+    name = 'google'
+
+    def recognize(self, raw, sample_rate, language):
+        audio = sr.AudioData(raw, sample_rate, SAMPLE_WIDTH)
+        try:
+            return sr.Recognizer().recognize_google(audio, language=language)
+        except sr.UnknownValueError:
+            return ''
+
+
+class VoskEngine(STTEngine):
+    """Lokal CPU modeli (Vosk/Kaldi). Model jarayonda bir marta yuklanadi.
+
+    Guruhdagi segmentlar STT_VOSK_THREADS ta oqimda parallel dekodlanadi: Kaldi
+    dekodlash vaqtida GIL ni bo'shatadi, har bir oqim o'z KaldiRecognizer'ini oladi.
+
+    O'rnatish: pip install vosk, model: https://alphacephei.com/vosk/models
+    (STT_VOSK_MODEL_PATH - ochilgan model papkasi).
+    """
+    name = 'vosk'
+    batched = True
+
+    def __init__(self):
+        try:
+            import vosk
+        except ImportError:
+            raise ImproperlyConfigured("STT_ENGINE='vosk' uchun 'vosk' paketi o'rnatilmagan (pip install vosk)")
+        if not settings.STT_VOSK_MODEL_PATH:
+            raise ImproperlyConfigured("STT_VOSK_MODEL_PATH sozlanmagan")
+
+        vosk.SetLogLevel(-1)
+        started = time.perf_counter()
+        self.vosk = vosk
+        self.model = vosk.Model(settings.STT_VOSK_MODEL_PATH)
+        # Bo'sh recognizer'lar (sample rate bo'yicha) - oqimlar ularni olib, ishlatib, qaytaradi
+        self.recognizers = {}
+        self.recognizers_lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=settings.STT_VOSK_THREADS, thread_name_prefix='stt-vosk')
+        logger.info("Vosk model loaded in %.1fs: %s", time.perf_counter() - started, settings.STT_VOSK_MODEL_PATH)
+
+    def acquire_recognizer(self, sample_rate):
+        with self.recognizers_lock:
+            idle = self.recognizers.setdefault(sample_rate, [])
+            if idle:
+                return idle.pop()
+        return self.vosk.KaldiRecognizer(self.model, sample_rate)
+
+    def release_recognizer(self, sample_rate, recognizer):
+        recognizer.Reset()
+        with self.recognizers_lock:
+            self.recognizers[sample_rate].append(recognizer)
+
+    def recognize(self, raw, sample_rate, language):
+        recognizer = self.acquire_recognizer(sample_rate)
+        try:
+            recognizer.AcceptWaveform(raw)
+            return json.loads(recognizer.FinalResult()).get('text', '')
+        finally:
+            self.release_recognizer(sample_rate, recognizer)
+
+    def recognize_batch(self, items):
+        return list(self.executor.map(self.recognize_item, items))
+
+
+STT_ENGINES = {
+    'google': 'courses.stt.GoogleEngine',
+    'vosk': 'courses.stt.VoskEngine',
+}
+
+
+class MicroBatcher:
+    """Bir nechta oqimdan kelgan segmentlarni bitta engine oqimida guruhlab tanish.
+
+    Birinchi segment kelgach STT_BATCH_WAIT soniya (yoki STT_BATCH_SIZE ta
+    segment yig'ilguncha) kutiladi va guruh engine.recognize_batch() ga beriladi.
+    """
+
+    def __init__(self, engine, max_batch=None, max_wait=None):
+        self.engine = engine
+        self.max_batch = max_batch or settings.STT_BATCH_SIZE
+        self.max_wait = max_wait if max_wait is not None else settings.STT_BATCH_WAIT
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name=f'stt-batcher-{engine.name}', daemon=True)
+        self._thread.start()
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, raw, sample_rate, language):
+        future = Future()
+        self._queue.put((future, (raw, sample_rate, language)))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            futures = [future for future, _ in batch if future.set_running_or_notify_cancel()]
+            items = [item for future, item in batch if future in futures]
+            try:
+                results = self.engine.recognize_batch(items)
+            except Exception as e:
+                results = [e] * len(items)
+
+            self.batches += 1
+            self.items += len(items)
+            for future, result in zip(futures, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+
+_engines = {}
+_batchers = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(name=None):
+    """Engine'ni jarayon bo'yicha bir marta yaratish (model qayta yuklanmaydi)"""
+    name = name or settings.STT_ENGINE
+    if name not in STT_ENGINES:
+        raise ImproperlyConfigured(f"Noma'lum STT engine: {name}")
+    if name not in _engines:
+        with _engines_lock:
+            if name not in _engines:
+                engine = import_string(STT_ENGINES[name])()
+                if engine.batched:
+                    _batchers[name] = MicroBatcher(engine)
+                _engines[name] = engine
+    return _engines[name]
+
+
+def get_batcher(engine):
+    return _batchers[engine.name]
+
+
+def recognize_segment(segment, raw, sample_rate, language, engine):
+    """Bitta segmentni tanish (xato bo'lsa bir marta qayta urinadi).
+
+    Har qanday xato segment.error ga yoziladi - bitta segment butun transcriptni to'xtatmaydi.
+    """
+    started = time.perf_counter()
+
+    for _ in range(2):
+        try:
+            segment.text = engine.recognize(raw, sample_rate, language)
+            segment.error = None
+            break
+        except Exception as e:
+            segment.error = str(e) or type(e).__name__
+
+    segment.seconds = time.perf_counter() - started
+    return segment
+
+
+def recognize_batched(segments, chunks, sample_rate, language, engine):
+    """Segmentlarni MicroBatcher orqali tanish"""
+    started = time.perf_counter()
+    batcher = get_batcher(engine)
+    futures = [batcher.submit(chunk, sample_rate, language) for chunk in chunks]
+    for segment, future in zip(segments, futures):
+        try:
+            segment.text = future.result()
+        except Exception as e:
+            segment.error = str(e)
+        segment.seconds = time.perf_counter() - started
+
+
+def transcribe(audio_path, language='en-US', engine=None):
+    """Audio faylni PCM ga keltirib (audio_ingest), segmentlab tanish.
+
+    engine - STT_ENGINE yoki engine nomi.
+    Natija: {'text', 'segments': [...], 'seconds', 'engine', 'ingest'}; STT_MAX_FAILED_RATIO
+    ulushidan ko'p segment xizmat xatosi bilan tugasa TranscriptionFailed ko'tariladi.
+    """
+    engine = get_engine(engine)
+    started = time.perf_counter()
+    raw, sample_rate, ingest_stats = audio_ingest.ingest(audio_path)
+    energies, frame_size = frame_energies(raw, sample_rate)
+    total_samples = len(raw) // SAMPLE_WIDTH
+
+    segments, chunks = [], []
+    for index, (start, end) in enumerate(detect_segments(energies, frame_size / sample_rate)):
+        first, last = start * frame_size, min(end * frame_size, total_samples)
+        # Vaqtlar asl fayl bo'yicha (boshidagi kesilgan jimlik qo'shiladi)
+        segments.append(Segment(index, ingest_stats['offset'] + first / sample_rate,
+                                ingest_stats['offset'] + last / sample_rate))
+        chunks.append(raw[first * SAMPLE_WIDTH:last * SAMPLE_WIDTH])
+
+    if segments and engine.batched:
+        recognize_batched(segments, chunks, sample_rate, language, engine)
+    elif segments:
+        workers = min(settings.STT_MAX_WORKERS, len(segments))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='stt') as pool:
+            list(pool.map(recognize_segment, segments, chunks, repeat(sample_rate), repeat(language),
+                          repeat(engine)))
+
+    failed = [segment for segment in segments if segment.error]
+    for segment in failed:
+        logger.warning("STT [%s] %s: segment #%d %.1f-%.1fs failed: %s", engine.name, audio_path,
+                       segment.index, segment.start, segment.end, segment.error)
+    if segments and len(failed) > len(segments) * settings.STT_MAX_FAILED_RATIO:
+        raise TranscriptionFailed(f"{len(failed)}/{len(segments)} segments failed: {failed[0].error}")
+
+    result = {
+        'text': ' '.join(segment.text for segment in segments if segment.text),
+        'segments': [segment.as_dict() for segment in segments],
+        'seconds': round(time.perf_counter() - started, 3),
+        'engine': engine.name,
+        'ingest': ingest_stats,
+    }
+    logger.info("STT [%s] %s: %d segments in %.2fs (%s)", engine.name, audio_path, len(segments),
+                result['seconds'],
+                ', '.join(f"#{s.index} {s.start:.1f}-{s.end:.1f}s {s.seconds:.2f}s" for s in segments))
+    return result
@@ -0,0 +1,110 @@
+# courses/submissions.py - Bir nechta dars natijalarini bitta so'rovda topshirish
+#
+# Mock imtihonda talaba video-test, listening va reading natijalarini alohida
+# api/submit-* so'rovlari bilan yuboradi, har biri progress jadvalida o'z
+# get_or_create'ini bajaradi. Bu yerda natijalar ro'yxati dars turlari bo'yicha
+# guruhlanadi: darslar va javoblar kalitlari har bir tur uchun bitta marta olinadi,
+# progresslar bitta tranzaksiyada har bir tur uchun bitta upsert bilan yoziladi.
+
+from django.conf import settings
+from django.db import transaction
+
+from .answer_keys import compile_lesson_answer_keys, compile_reading_answer_keys, get_listening_answer_keys
+from .grading import grade
+from .models import Lesson, ListeningLesson, ReadingLesson
+from .progress import record_progresses, record_reading_progresses
+
+# dars turi -> (model, javoblar kalitlari: darslar ro'yxati -> {dars id: kalit})
+SUBMISSION_TYPES = {
+    'video': (Lesson, lambda lessons: compile_lesson_answer_keys([lesson.id for lesson in lessons])),
+    'listening': (ListeningLesson, get_listening_answer_keys),
+    'reading': (ReadingLesson, lambda lessons: compile_reading_answer_keys([lesson.id for lesson in lessons])),
+}
+
+
+class SubmissionError(Exception):
+    """Topshirish xatoligi (status - HTTP javob kodi)"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_items(items):
+    """So'rovdagi natijalarni tekshirish. Bitta dars takrorlansa oxirgisi olinadi.
+
+    Element: {"type": "video"|"listening"|"reading", "id": dars id, "answers": {maydon: javob},
+    "time_spent": soniya (ixtiyoriy)}
+    """
+    if not isinstance(items, list) or not items:
+        raise SubmissionError("'results' bo'sh bo'lmagan ro'yxat bo'lishi kerak")
+    if len(items) > settings.BATCH_SUBMIT_MAX_ITEMS:
+        raise SubmissionError(f"Bitta so'rovda ko'pi bilan {settings.BATCH_SUBMIT_MAX_ITEMS} ta natija")
+
+    parsed = {}
+    for item in items:
+        # type ro'yxat kabi hash qilinmaydigan qiymat bo'lishi mumkin - avval satrligi tekshiriladi
+        lesson_type = item.get('type') if isinstance(item, dict) else None
+        if not isinstance(lesson_type, str) or lesson_type not in SUBMISSION_TYPES:
+            raise SubmissionError(f"Noma'lum dars turi: {lesson_type if isinstance(item, dict) else item}")
+        try:
+            lesson_id = int(item.get('id'))
+            time_spent = int(item.get('time_spent') or 0)
+        except (TypeError, ValueError):
+            raise SubmissionError("Noto'g'ri dars id yoki time_spent")
+        answers = item.get('answers') or {}
+        if not isinstance(answers, dict):
+            raise SubmissionError("'answers' {maydon: javob} ko'rinishida bo'lishi kerak")
+        parsed[(lesson_type, lesson_id)] = (answers, time_spent)
+    return parsed
+
+
+def submit_batch(user, items):
+    """Natijalarni baholash va progresslarni saqlash.
+
+    Natija: [{'type', 'id', 'score', 'passed', 'correct_answers', 'total_questions', 'results'}]
+    """
+    parsed = parse_items(items)
+
+    lessons = {}
+    answer_keys = {}
+    for lesson_type, (model, load_keys) in SUBMISSION_TYPES.items():
+        ids = [lesson_id for kind, lesson_id in parsed if kind == lesson_type]
+        if not ids:
+            continue
+        found = model.objects.select_related('module').in_bulk(ids)
+        missing = set(ids) - set(found)
+        if missing:
+            raise SubmissionError(f"{lesson_type} darsi topilmadi: {sorted(missing)}", status=404)
+        lessons[lesson_type] = found
+        answer_keys[lesson_type] = load_keys(list(found.values()))
+
+    response = []
+    progress_rows = []
+    reading_rows = []
+
+    for (lesson_type, lesson_id), (answers, time_spent) in parsed.items():
+        answer_key = answer_keys[lesson_type].get(lesson_id, {})
+        # Video test - submit_test kabi faqat yuborilgan javoblar baholanadi
+        result = grade(answer_key, answers, list(answers) if lesson_type == 'video' else None)
+        passed = result.passed(lesson_type)
+
+        progress_rows.append((lessons[lesson_type][lesson_id], result.score, passed))
+        if lesson_type == 'reading':
+            reading_rows.append((lesson_id, result.score, passed, time_spent, result.correct, result.total))
+
+        response.append({
+            'type': lesson_type,
+            'id': lesson_id,
+            'score': result.score,
+            'passed': passed,
+            'correct_answers': result.correct,
+            'total_questions': result.total,
+            'results': result.results,
+        })
+
+    with transaction.atomic():
+        record_progresses(user, progress_rows)
+        record_reading_progresses(user, reading_rows)
+
+    return response
@@ -1,3 +1,1540 @@
-from django.test import TestCase
+import array
+import hashlib
+import importlib
+import io
+import json
+import logging
+import math
+import os
+import shutil
+import tempfile
+import threading
+import wave
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import speech_recognition as sr
+from prometheus_client import REGISTRY
+
+from django.apps import apps as django_apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+from django.utils import timezone
+
+from .models import Course, Module, Lesson, ListeningLesson, SpeakingLesson, ReadingLesson, \
+    WritingLesson, LessonProgress, ListeningQuestion, ListeningOption, GapFillingQuestion, GapOption, \
+    TrueFalseNotGiven, MatchingQuestion, Question, Answer, ReadingQuestion, ReadingAnswer, SpeakingQuestion, \
+    SpeakingAttempt, \
+    WritingAttempt, UserWritingProgress, UserReadingProgress, ModuleProgressSummary, TTSCacheEntry, \
+    ChunkedUpload
+from .ai_client import GigaChatClientManager
+from .answer_keys import get_listening_answer_key
+from .checks import check_metrics_multiproc_dir
+from .grading import grade
+from .management.commands.bench_flows import compare
+from . import audio_ingest, listening_audio, stt
+from .jobs import WorkerPool, get_queue
+from .outline import get_course_outline, get_module_outline
+from .query_budget import QUERY_BUDGETS, QueryBudgetExceeded, query_budget
+from .progress import content_types, get_progress, get_user_progress, record_progress, record_reading_progresses, \
+    record_writing_attempt, refresh_summaries
+from .views import speech_to_text, text_to_speech
+
+
+def create_module_content(module, count):
+    """Modulga har bir turdan `count` tadan dars qo'shish"""
+    lessons = []
+    for i in range(count):
+        lessons.append(Lesson.objects.create(module=module, title=f"Video {i}", order=i))
+        lessons.append(ListeningLesson.objects.create(
+            module=module, title=f"Listening {i}", order=i, audio_file='listening_audios/test.mp3',
+            listening_type='multiple_choice'))
+        lessons.append(SpeakingLesson.objects.create(
+            module=module, title=f"Speaking {i}", order=i, description='-', speaking_type='question_answer',
+            instruction_text='-'))
+        lessons.append(ReadingLesson.objects.create(
+            module=module, title=f"Reading {i}", order=i, reading_type='multiple_choice', description='-',
+            reading_text='-', instruction='-'))
+        lessons.append(WritingLesson.objects.create(
+            module=module, title=f"Writing {i}", order=i, writing_type='task2', description='-',
+            task_text='-', instruction='-'))
+    return lessons
+
+
+class ModuleDetailProgressTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('student', password='secret')
+        self.course = Course.objects.create(name='IELTS', description='-', course_type='english')
+        self.client.force_login(self.user)
+
+    def create_module_with_progress(self, count):
+        module = Module.objects.create(course=self.course, title=f"Modul {count}")
+        for lesson in create_module_content(module, count):
+            LessonProgress.objects.create(user=self.user, completed=True, score=80, content_object=lesson)
+        return module
+
+    def test_query_count_does_not_depend_on_module_size(self):
+        small = self.create_module_with_progress(1)
+        large = self.create_module_with_progress(12)
+
+        # session + user + module + 5 ta dars turi + progress + yig'ma progress
+        with self.assertNumQueries(10):
+            response = self.client.get(reverse('module_detail', args=[small.id]))
+        self.assertEqual(len(response.context['lessons']), 5)
+
+        with self.assertNumQueries(10):
+            response = self.client.get(reverse('module_detail', args=[large.id]))
+        self.assertEqual(len(response.context['lessons']), 60)
+
+    def test_progress_is_merged_into_lessons(self):
+        module = Module.objects.create(course=self.course, title='Modul')
+        video, listening, speaking, reading, writing = create_module_content(module, 1)
+        LessonProgress.objects.create(user=self.user, content_object=listening, completed=True, score=75)
+
+        response = self.client.get(reverse('module_detail', args=[module.id]))
+        lessons = {(item['type'], item['id']): item for item in response.context['lessons']}
+
+        self.assertTrue(lessons[('listening', listening.id)]['completed'])
+        self.assertEqual(lessons[('listening', listening.id)]['score'], 75)
+        self.assertFalse(lessons[('video', video.id)]['completed'])
+        self.assertEqual(lessons[('writing', writing.id)]['score'], 0)
+
+
+class ModuleOutlineTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        course = Course.objects.create(name='IELTS', description='-', course_type='english')
+        self.module = Module.objects.create(course=course, title='Modul')
+        self.video, self.listening, self.speaking, self.reading, self.writing = \
+            create_module_content(self.module, 1)
+
+    def outline(self, module):
+        """Modulni bazadan qayta o'qib (view'lar kabi) tarkibini olish"""
+        return get_module_outline(Module.objects.get(pk=module.pk))
+
+    def test_neighbours(self):
+        outline = self.outline(self.module)
+
+        self.assertEqual([item.type for item in outline], ['video', 'listening', 'speaking', 'reading', 'writing'])
+        prev_content, next_content = outline.neighbours('speaking', self.speaking.id)
+        self.assertEqual(prev_content[0], 'listening')
+        self.assertEqual(prev_content[1].id, self.listening.id)
+        self.assertEqual(next_content[0], 'reading')
+        self.assertEqual(next_content[1].id, self.reading.id)
+
+        first_prev, first_next = outline.neighbours('video', self.video.id)
+        self.assertIsNone(first_prev)
+        self.assertEqual(first_next[1].id, self.listening.id)
+
+    def test_cached_outline_needs_no_queries(self):
+        module = Module.objects.get(pk=self.module.pk)
+        get_module_outline(module)
+        with self.assertNumQueries(0):
+            get_module_outline(module).neighbours('reading', self.reading.id)
+
+    def test_outline_is_invalidated_on_lesson_changes(self):
+        self.outline(self.module)
+
+        self.writing.order = -1
+        self.writing.save()
+        self.assertEqual(self.outline(self.module).items[0].type, 'writing')
+
+        self.writing.delete()
+        self.assertEqual(len(self.outline(self.module)), 4)
+
+    def test_lesson_change_bumps_outline_versions_in_database(self):
+        # Kesh o'chirilmaydi: yangi versiya bazada, boshqa jarayonlar ham yangi tarkibni oladi
+        module = Module.objects.select_related('course').get(pk=self.module.pk)
+        with mock.patch('courses.outline.cache.delete') as delete:
+            self.reading.save()
+        delete.assert_not_called()
+
+        fresh = Module.objects.select_related('course').get(pk=self.module.pk)
+        self.assertGreater(fresh.updated_at, module.updated_at)
+        self.assertGreater(fresh.course.updated_at, module.course.updated_at)
+
+    def test_moved_lesson_leaves_previous_module_outline(self):
+        other = Module.objects.create(course=self.module.course, title='Boshqa modul', order=1)
+        self.outline(self.module)
+        self.outline(other)
+
+        self.reading.module = other
+        self.reading.save()
+
+        outline = self.outline(self.module)
+        self.assertEqual([item.type for item in outline], ['video', 'listening', 'speaking', 'writing'])
+        self.assertEqual(outline.neighbours('speaking', self.speaking.id)[1][0], 'writing')
+        self.assertEqual([item.type for item in self.outline(other)], ['reading'])
+
+
+class CourseOutlineTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('student', password='secret')
+        self.course = Course.objects.create(name='IELTS', description='-', course_type='english')
+        self.client.force_login(self.user)
+
+    def outline(self, course):
+        return get_course_outline(Course.objects.get(pk=course.pk))
+
+    def test_query_count_does_not_depend_on_module_count(self):
+        create_module_content(Module.objects.create(course=self.course, title='Modul 1', order=1), 2)
+        url = reverse('course_detail', args=[self.course.id])
+
+        # session + user + kurs + kurs tarkibi + yig'ma progress
+        with self.assertNumQueries(5):
+            response = self.client.get(url)
+        self.assertEqual(response.context['total_video_lessons'], 2)
+
+        for order in range(2, 8):
+            create_module_content(Module.objects.create(course=self.course, title=f"Modul {order}", order=order), 3)
+        with self.assertNumQueries(5):
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['modules']), 7)
+        self.assertEqual(response.context['total_writing_lessons'], 20)
+
+        # Keshdan: kurs tarkibi so'rovi yo'q
+        with self.assertNumQueries(4):
+            self.client.get(url)
+
+    def test_counts_and_invalidation(self):
+        module = Module.objects.create(course=self.course, title='Modul')
+        video, listening, speaking, reading, writing = create_module_content(module, 1)
+        Module.objects.create(course=self.course, title="Bo'sh modul", order=1)
+
+        outline = self.outline(self.course)
+        self.assertEqual([(m.video_count, m.reading_count, m.lesson_count) for m in outline], [(1, 1, 5), (0, 0, 0)])
+
+        reading.delete()
+        self.assertEqual(self.outline(self.course)[0].lesson_count, 4)
+        Module.objects.create(course=self.course, title='Yangi modul', order=2)
+        self.assertEqual(len(self.outline(self.course)), 3)
+
+    def test_moving_lesson_to_another_course_updates_both_outlines(self):
+        module = Module.objects.create(course=self.course, title='Modul')
+        video = create_module_content(module, 1)[0]
+        other_course = Course.objects.create(name='CEFR', description='-', course_type='english')
+        other_module = Module.objects.create(course=other_course, title='Modul')
+        self.outline(self.course)
+        self.outline(other_course)
+
+        # Boshqa jarayon kursni ko'chirishdan oldin o'qigan: uning keshi o'chirilmaydi, lekin
+        # keyingi so'rovda bazadan yangi versiya keladi
+        stale = list(Course.objects.filter(pk__in=[self.course.pk, other_course.pk]))
+        with mock.patch('courses.outline.cache.delete') as delete:
+            video.module = other_module
+            video.save()
+        delete.assert_not_called()
+        for course in stale:
+            self.assertGreater(Course.objects.get(pk=course.pk).updated_at, course.updated_at)
+
+        self.assertEqual(self.outline(self.course)[0].video_count, 0)
+        self.assertEqual(self.outline(other_course)[0].video_count, 1)
+
+        updated_at = Course.objects.get(pk=other_course.pk).updated_at
+        video.delete()
+        self.assertGreater(Course.objects.get(pk=other_course.pk).updated_at, updated_at)
+        self.assertEqual(self.outline(other_course)[0].video_count, 0)
+
+
+class ListeningAnswerKeyTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        course = Course.objects.create(name='IELTS', description='-', course_type='english')
+        self.module = Module.objects.create(course=course, title='Modul')
+
+    def create_listening(self, listening_type):
+        return ListeningLesson.objects.create(module=self.module, title=listening_type,
+                                              audio_file='listening_audios/test.mp3', listening_type=listening_type)
+
+    def test_multiple_choice(self):
+        listening = self.create_listening('multiple_choice')
+        question = ListeningQuestion.objects.create(listening_lesson=listening, question_text='?')
+        ListeningOption.objects.create(question=question, option_text='a', option_letter='A')
+        correct = ListeningOption.objects.create(question=question, option_text='b', option_letter='B',
+                                                 is_correct=True)
+        empty_question = ListeningQuestion.objects.create(listening_lesson=listening, question_text='?', order=1)
+        listening.refresh_from_db()
+
+        answer_key = get_listening_answer_key(listening)
+        self.assertEqual(answer_key, {f'question_{question.id}': str(correct.id),
+                                      f'question_{empty_question.id}': None})
+
+        correct_answers, total, results = grade(answer_key, {f'question_{question.id}': correct.id})
+        self.assertEqual((correct_answers, total), (1, 2))
+        self.assertEqual(results[f'question_{empty_question.id}'], 'not_answered')
+
+    def test_gap_tfng_and_matching(self):
+        gap_listening = self.create_listening('gap_filling')
+        gap = GapFillingQuestion.objects.create(listening_lesson=gap_listening, text_with_gaps='(a) ___')
+        GapOption.objects.create(gap_filling=gap, gap_letter='a', correct_word='Went', options='go,went')
+        gap_listening.refresh_from_db()
+        self.assertEqual(grade(get_listening_answer_key(gap_listening), {f'gap_{gap.id}_a': ' went '})[0], 1)
+
+        tfng_listening = self.create_listening('true_false_not_given')
+        tfng = TrueFalseNotGiven.objects.create(listening_lesson=tfng_listening, statement='-', correct_answer='false')
+        tfng_listening.refresh_from_db()
+        self.assertEqual(grade(get_listening_answer_key(tfng_listening), {f'tfng_{tfng.id}': 'true'})[2],
+                         {f'tfng_{tfng.id}': 'wrong'})
+
+        match_listening = self.create_listening('matching')
+        match = MatchingQuestion.objects.create(listening_lesson=match_listening, title='-', instruction='-',
+                                                column_a='1', column_b='A', correct_matches='{"1": "A", "2": "C"}')
+        match_listening.refresh_from_db()
+        self.assertEqual(grade(get_listening_answer_key(match_listening), {f'match_{match.id}_1': 'A'})[:2],
+                         (1, 2))
+
+    def test_matching_with_non_object_json_is_skipped(self):
+        listening = self.create_listening('matching')
+        valid = MatchingQuestion.objects.create(listening_lesson=listening, title='-', instruction='-',
+                                                column_a='1', column_b='A', correct_matches='{"1": "A"}')
+        for correct_matches in ('[]', 'null', '"A"', '{1: A}'):
+            MatchingQuestion.objects.create(listening_lesson=listening, title='-', instruction='-',
+                                            column_a='1', column_b='A', correct_matches=correct_matches)
+        listening.refresh_from_db()
+
+        with self.assertLogs('courses.answer_keys', 'WARNING') as logs:
+            answer_key = get_listening_answer_key(listening)
+        self.assertEqual(answer_key, {f'match_{valid.id}_1': 'A'})
+        self.assertEqual(len(logs.records), 4)
+
+    def test_cached_key_needs_no_queries_and_follows_edits(self):
+        listening = self.create_listening('true_false_not_given')
+        tfng = TrueFalseNotGiven.objects.create(listening_lesson=listening, statement='-', correct_answer='true')
+        listening.refresh_from_db()
+        get_listening_answer_key(listening)
+
+        with self.assertNumQueries(0):
+            answer_key = get_listening_answer_key(listening)
+        self.assertEqual(answer_key[f'tfng_{tfng.id}'], 'true')
+
+        tfng.correct_answer = 'not_given'
+        tfng.save()
+        listening.refresh_from_db()
+        self.assertEqual(get_listening_answer_key(listening)[f'tfng_{tfng.id}'], 'not_given')
+
+
+DEMO_SPEAKING_ANALYSIS = {
+    'fluency_score': 70, 'vocabulary_score': 60, 'grammar_score': 65, 'pronunciation_score': 75,
+    'overall_score': 68, 'feedback': 'Good job!', 'suggestions': ['Practice daily'],
+    'duration': 12, 'word_count': 30,
+}
+
+
+@override_settings(AI_INLINE_WORKERS=0)
+class GradingTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('student', password='secret')
+        course = Course.objects.create(name='IELTS', description='-', course_type='english')
+        self.module = Module.objects.create(course=course, title='Modul')
+        self.client.force_login(self.user)
+
+    def test_grade_mixed_key(self):
+        answer_key = {'question_1': '5', 'question_2': None, 'gap_1_a': 'went', 'tfng_1': 'true', 'match_1_1': 'A'}
+        result = grade(answer_key, {'question_1': 5, 'question_2': '7', 'gap_1_a': ' Went ', 'tfng_1': 'false',
+                                    'match_1_1': 'A'})
+        self.assertEqual((result.correct, result.total, result.score), (3, 5, 60))
+        self.assertEqual((result.passed('listening'), result.passed('reading'), result.passed('video')),
+                         (True, True, False))
+        self.assertFalse(grade({}, {}).passed('listening'))
+        self.assertEqual(result.results, {'question_1': 'correct', 'question_2': 'not_answered',
+                                          'gap_1_a': 'correct', 'tfng_1': 'wrong', 'match_1_1': 'correct'})
+
+        # fields - faqat yuborilgan maydonlar, kalitda yo'q maydon noto'g'ri
+        self.assertEqual(grade(answer_key, {'question_1': '5', 'question_9': '1'}, ['question_1', 'question_9'])[:2],
+                         (1, 2))
+
+    def create_lesson_test(self, count):
+        lesson = Lesson.objects.create(module=self.module, title=f'Video {count}')
+        submitted = []
+        for i in range(count):
+            question = Question.objects.create(lesson=lesson, question_text='?')
+            Answer.objects.create(question=question, answer_text='a')
+            correct = Answer.objects.create(question=question, answer_text='b', is_correct=True)
+            submitted.append({'question_id': question.id, 'answer': str(correct.id) if i % 2 == 0 else '0'})
+        text_question = Question.objects.create(lesson=lesson, question_text='?', question_type='text')
+        submitted.append({'question_id': text_question.id, 'answer': 'matn'})
+        return lesson, submitted
+
+    def post_counting_queries(self, url, payload):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, json.dumps(payload), content_type='application/json')
+        return response.json(), len(queries)
+
+    def test_submit_test_constant_queries(self):
+        query_counts = []
+        for count in (2, 8):
+            lesson, submitted = self.create_lesson_test(count)
+            data, queries = self.post_counting_queries(reverse('submit_test', args=[lesson.id]),
+                                                       {'answers': submitted})
+            query_counts.append(queries)
+            self.assertEqual((data['correct_answers'], data['total_questions']), (count // 2, count + 1))
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_submit_reading_test_constant_queries(self):
+        query_counts = []
+        for count in (2, 8):
+            reading = ReadingLesson.objects.create(
+                module=self.module, title=f'Reading {count}', reading_type='multiple_choice', description='-',
+                reading_text='-', instruction='-')
+            payload = {'time_spent': 30}
+            for i in range(count):
+                question = ReadingQuestion.objects.create(reading_lesson=reading, question_text='?',
+                                                          question_type='multiple_choice', order=i)
+                correct = ReadingAnswer.objects.create(question=question, answer_text='a', is_correct=True)
+                if i % 2 == 0:
+                    payload[f'question_{question.id}'] = str(correct.id)
+            data, queries = self.post_counting_queries(reverse('submit_reading_test', args=[reading.id]), payload)
+            query_counts.append(queries)
+            self.assertEqual((data['correct_answers'], data['total_questions']), (count // 2, count))
+            self.assertEqual(list(data['results'].values()).count('not_answered'), count // 2)
+        self.assertEqual(query_counts[0], query_counts[1])
+
+
+class BatchSubmitTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('student', password='secret')
+        course = Course.objects.create(name='IELTS', description='-', course_type='english')
+        self.module = Module.objects.create(course=course, title='Modul')
+        self.client.force_login(self.user)
+
+    def create_exam(self, count):
+        """Har bir turdan `count` ta dars va hammasi to'g'ri javoblar"""
+        items = []
+        for i in range(count):
+            lesson = Lesson.objects.create(module=self.module, title=f'Video {i}')
+            question = Question.objects.create(lesson=lesson, question_text='?')
+            correct = Answer.objects.create(question=question, answer_text='a', is_correct=True)
+            items.append({'type': 'video', 'id': lesson.id, 'answers': {f'question_{question.id}': str(correct.id)}})
+
+            listening = ListeningLesson.objects.create(module=self.module, title=f'Listening {i}',
+                                                       audio_file='listening_audios/test.mp3',
+                                                       listening_type='true_false_not_given')
+            tfng = TrueFalseNotGiven.objects.create(listening_lesson=listening, statement='-', correct_answer='true')
+            items.append({'type': 'listening', 'id': listening.id, 'answers': {f'tfng_{tfng.id}': 'true'}})
+
+            reading = ReadingLesson.objects.create(module=self.module, title=f'Reading {i}',
+                                                   reading_type='multiple_choice', description='-',
+                                                   reading_text='-', instruction='-')
+            question = ReadingQuestion.objects.create(reading_lesson=reading, question_text='?',
+                                                      question_type='multiple_choice')
+            correct = ReadingAnswer.objects.create(question=question, answer_text='a', is_correct=True)
+            items.append({'type': 'reading', 'id': reading.id, 'time_spent': 60,
+                          'answers': {f'question_{question.id}': str(correct.id)}})
+        return items
+
+    def post(self, items):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('submit_batch'), json.dumps({'results': items}),
+                                        content_type='application/json')
+        return response, len(queries)
+
+    def test_grades_and_upserts_progress(self):
+        items = self.create_exam(2)
+        record_progress(self.user, ListeningLesson.objects.get(id=items[1]['id']), 10, False)
+
+        response, _ = self.post(items)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(all(result['passed'] for result in response.json()['results']))
+
+        self.assertEqual(LessonProgress.objects.filter(user=self.user).count(), 6)
+        self.assertEqual(get_progress(self.user, ListeningLesson.objects.get(id=items[1]['id'])).score, 100)
+        reading_progress = UserReadingProgress.objects.get(reading_lesson_id=items[2]['id'])
+        self.assertEqual((reading_progress.time_spent, reading_progress.correct_answers), (60, 1))
+
+    def test_constant_queries(self):
+        query_counts = []
+        for count in (1, 5):
+            items = self.create_exam(count)
+            self.post(items)  # listening kalitlari keshga tushadi
+            query_counts.append(self.post(items)[1])
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_missing_lesson(self):
+        response, _ = self.post([{'type': 'reading', 'id': 999, 'answers': {}}])
+        self.assertEqual(response.status_code, 404)
+        response, _ = self.post([{'type': 'speaking', 'id': 1}])
+        self.assertEqual(response.status_code, 400)
+        response, _ = self.post([{'type': ['video'], 'id': 1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(LessonProgress.objects.exists())
+
+
+@override_settings(QUERY_BUDGET_STRICT=True, QUERY_STATS_ENABLED=True, AI_INLINE_WORKERS=0,
+                   WRITING_QUEUE_ENABLED=True)
+class QueryBudgetTest(TestCase):
+    """Detail va submit view'lar QUERY_BUDGETS chegarasida (savollar soni 6 ta bo'lsa ham)"""
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.user = User.objects.create_user('student', password='secret')
+        self.course = Course.objects.create(name='IELTS', description='-', course_type='english')
+        self.module = Module.objects.create(course=self.course, title='Modul')
+        for order in range(1, 6):
+            create_module_content(Module.objects.create(course=self.course, title=f'Modul {order}', order=order), 1)
+        self.video, self.listening, self.speaking, self.reading, self.writing = \
+            create_module_content(self.module, 1)
+        self.gap_listening = ListeningLesson.objects.create(
+            module=self.module, title='Gap', audio_file='listening_audios/test.mp3', listening_type='gap_filling')
+
+        self.answers = {}
+        self.video_answers = []
+        for i in range(6):
+            question = Question.objects.create(lesson=self.video, question_text='?')
+            Answer.objects.create(question=question, answer_text='a')
+            correct = Answer.objects.create(question=question, answer_text='b', is_correct=True)
+            self.answers[f'question_{question.id}'] = str(correct.id)
+            self.video_answers.append({'question_id': question.id, 'answer': str(correct.id)})
+            option = ListeningOption.objects.create(question=ListeningQuestion.objects.create(
+                listening_lesson=self.listening, question_text='?', order=i), option_text='a', option_letter='A',
+                is_correct=True)
+            self.answers[f'question_{option.question_id}'] = str(option.id)
+            gap = GapFillingQuestion.objects.create(listening_lesson=self.gap_listening, text_with_gaps='(a) ___',
+                                                    order=i)
+            GapOption.objects.create(gap_filling=gap, gap_letter='a', correct_word='went', options='go,went')
+            reading_question = ReadingQuestion.objects.create(reading_lesson=self.reading, question_text='?',
+                                                              question_type='multiple_choice', order=i)
+            self.answers[f'question_{reading_question.id}'] = str(ReadingAnswer.objects.create(
+                question=reading_question, answer_text='a', is_correct=True).id)
+            SpeakingQuestion.objects.create(speaking_lesson=self.speaking, question_text='?', order=i)
+            SpeakingAttempt.objects.create(user=self.user, speaking_lesson=self.speaking)
+            WritingAttempt.objects.create(user=self.user, writing_lesson=self.writing, answer_text='-')
+            record_progress(self.user, self.video, 80, True)
+
+        content_types()
+        get_course_outline(Course.objects.get(pk=self.course.pk))
+        get_module_outline(Module.objects.get(pk=self.module.pk))
+        self.client.force_login(self.user)
+
+    def test_detail_views(self):
+        for name, lesson in [('course_detail', self.course), ('module_detail', self.module),
+                             ('lesson_detail', self.video), ('listening_detail', self.listening),
+                             ('listening_detail', self.gap_listening), ('speaking_detail', self.speaking),
+                             ('reading_detail', self.reading), ('writing_detail', self.writing)]:
+            with self.subTest(name):
+                response = self.client.get(reverse(name, args=[lesson.id]))
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['X-DB-Query-Budget'], str(QUERY_BUDGETS[name]))
+                self.assertEqual(response['X-DB-Repeated-Queries'], '0')
+
+    def post(self, name, args, payload, **kwargs):
+        response = self.client.post(reverse(name, args=args), json.dumps(payload), content_type='application/json',
+                                    **kwargs)
+        self.assertIn(response.status_code, (200, 202), name)
+        return response
+
+    def test_submit_views(self):
+        self.post('submit_test', [self.video.id], {'answers': self.video_answers})
+        self.post('submit_question', [], {'lesson_id': self.video.id, 'question_text': '?'})
+        self.post('check_listening_answers', [self.listening.id], self.answers)
+        self.post('save_listening_progress', [], {'listening_id': self.listening.id, 'score': 80})
+        self.post('submit_listening_test', [self.gap_listening.id], {'answers': {}})
+        self.post('submit_reading_test', [self.reading.id], dict(self.answers, time_spent=30))
+        self.post('submit_writing', [self.writing.id], {'answer_text': 'My essay', 'time_spent': 60})
+        self.post('submit_batch', [], {'results': [
+            {'type': 'video', 'id': self.video.id, 'answers': self.answers},
+            {'type': 'listening', 'id': self.listening.id, 'answers': self.answers},
+            {'type': 'reading', 'id': self.reading.id, 'answers': self.answers},
+        ]})
+        with override_settings(MEDIA_ROOT=self.media_root):
+            audio = SimpleUploadedFile('recording.wav', b'RIFF0000WAVE', content_type='audio/wav')
+            response = self.client.post(reverse('process_speaking'), {'speaking_id': self.speaking.id,
+                                                                      'audio': audio})
+        self.assertEqual(response.status_code, 202)
+
+    def test_budget_exceeded(self):
+        self.assertEqual(set(QUERY_BUDGETS) - {getattr(pattern, 'name', None) for pattern in get_resolver().url_patterns}, set())
+
+        with self.assertRaises(QueryBudgetExceeded) as raised:
+            with override_settings(QUERY_NPLUSONE_THRESHOLD=3):
+                with query_budget('submit_question') as stats:
+                    for lesson in Lesson.objects.all():
+                        lesson.module.title
+        self.assertIn('SELECT', str(raised.exception))
+        self.assertEqual(stats.repeated()[0][1], Lesson.objects.count())
+
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('student', password='secret')
+        self.course = Course.objects.create(name='IELTS', description='-', course_type='english')
+        self.module = Module.objects.create(course=self.course, title='Modul')
+        self.client.force_login(self.user)
+
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_request_cache_and_external_metrics(self):
+        requests_before = self.sample('http_request_duration_seconds_count', view='course_detail', method='GET',
+                                      status='200')
+        misses_before = self.sample('cache_requests_total', cache='course_outline', result='miss')
+        hits_before = self.sample('cache_requests_total', cache='course_outline', result='hit')
+
+        url = reverse('course_detail', args=[self.course.id])
+        self.client.get(url)
+        self.client.get(url)
+
+        self.assertEqual(self.sample('http_request_duration_seconds_count', view='course_detail', method='GET',
+                                     status='200'), requests_before + 2)
+        self.assertEqual(self.sample('cache_requests_total', cache='course_outline', result='miss'),
+                         misses_before + 1)
+        self.assertEqual(self.sample('cache_requests_total', cache='course_outline', result='hit'),
+                         hits_before + 1)
+        self.assertGreater(self.sample('http_request_db_queries_sum', view='course_detail'), 0)
+
+        # Metrikalar uchun faqat sanaladi, SQL shakli tahlil qilinmaydi
+        with override_settings(QUERY_STATS_ENABLED=False), \
+                mock.patch('courses.query_budget.query_shape') as query_shape:
+            self.client.get(url)
+        query_shape.assert_not_called()
+
+        errors_before = self.sample('external_calls_total', service='stt', outcome='error')
+        with mock.patch('courses.stt.transcribe', side_effect=sr.RequestError('offline')):
+            speech_to_text('missing.wav')
+        self.assertEqual(self.sample('external_calls_total', service='stt', outcome='error'), errors_before + 1)
+
+    def test_endpoint(self):
+        speaking = create_module_content(self.module, 1)[2]
+        SpeakingAttempt.objects.create(user=self.user, speaking_lesson=speaking, status='pending')
+        self.client.get(reverse('module_detail', args=[self.module.id]))
+
+        # Token sozlanmagan - DEBUG bo'lsa ham yopiq, faqat METRICS_PUBLIC bilan ochiladi
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+        with override_settings(METRICS_PUBLIC=True):
+            response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('job_queue_depth{queue="speaking"} 1.0', body)
+        self.assertIn('http_request_duration_seconds_bucket{le="0.005",method="GET",status="200",'
+                      'view="module_detail"}', body)
+
+        with override_settings(METRICS_TOKEN='secret'):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+            self.assertEqual(response.status_code, 200)
+
+    def test_deploy_check_requires_shared_multiproc_dir(self):
+        with override_settings(PROMETHEUS_MULTIPROC_DIR_CONFIGURED=False):
+            self.assertEqual([warning.id for warning in check_metrics_multiproc_dir(None)], ['courses.W001'])
+        with override_settings(PROMETHEUS_MULTIPROC_DIR_CONFIGURED=True):
+            self.assertEqual(check_metrics_multiproc_dir(None), [])
+
+
+class SpeakingJobQueueTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+        self.user = User.objects.create_user('student', password='secret')
+        course = Course.objects.create(name='IELTS', description='-', course_type='english')
+        module = Module.objects.create(course=course, title='Modul')
+        self.speaking = create_module_content(module, 1)[2]
+        self.client.force_login(self.user)
+
+    def submit(self):
+        audio = SimpleUploadedFile('recording.wav', b'RIFF0000WAVE', content_type='audio/wav')
+        return self.client.post(reverse('process_speaking'), {'speaking_id': self.speaking.id, 'audio': audio})
+
+    def test_submit_returns_job_immediately(self):
+        with mock.patch('courses.views.speech_to_text') as stt:
+            response = self.submit()
+
+        self.assertEqual(response.status_code, 202)
+        stt.assert_not_called()
+        attempt = SpeakingAttempt.objects.get(id=response.json()['job_id'])
+        self.assertEqual(attempt.status, 'pending')
+
+        status = self.client.get(response.json()['status_url']).json()
+        self.assertEqual(status['stages'], {'stt': 'pending', 'analysis': 'pending', 'tts': 'pending'})
+
+    def test_attempt_returns_its_own_feedback_audio(self):
+        attempt = SpeakingAttempt.objects.create(user=self.user, speaking_lesson=self.speaking,
+                                                 ai_feedback='Good.', feedback_audio='speaking_feedback/tts_abc.mp3')
+
+        with mock.patch('os.listdir') as listdir:
+            data = self.client.get(reverse('get_speaking_attempt', args=[attempt.id])).json()
+
+        listdir.assert_not_called()
+        self.assertEqual(data['attempt']['tts_audio_url'], '/media/speaking_feedback/tts_abc.mp3')
+
+    def test_backfill_matches_only_unambiguous_legacy_files(self):
+        backfill = importlib.import_module('courses.migrations.0013_backfill_speaking_feedback_audio')
+        files = [(1010, 'speaking_feedback/feedback_a.mp3'), (5030, 'speaking_feedback/feedback_b.mp3'),
+                 (9000, 'speaking_feedback/feedback_orphan.mp3'), (3010, 'speaking_feedback/feedback_c.mp3'),
+                 (3020, 'speaking_feedback/feedback_d.mp3')]
+        # 5000 va 5020 - ikki talaba bir vaqtda; 3000 ga ikkita fayl to'g'ri keladi
+        attempts = [(1000, 1), (3000, 2), (5000, 3), (5020, 4)]
+
+        self.assertEqual(backfill.match_feedback_files(files, attempts), {1: 'speaking_feedback/feedback_a.mp3'})
+
+    def test_worker_runs_all_stages(self):
+        job = self.submit().json()
+
+        with mock.patch('courses.views.speech_to_text', return_value='hello world'), \
+                mock.patch('courses.views.analyze_speech_with_ai', return_value=dict(DEMO_SPEAKING_ANALYSIS)), \
+                mock.patch('courses.views.text_to_speech', return_value=None), \
+                self.assertLogs('courses', 'INFO') as logs:
+            self.assertTrue(WorkerPool(['speaking']).run_once())
+
+        # settings.LOGGING: courses.* INFO loglari tashlab yuborilmaydi
+        self.assertTrue(logging.getLogger('courses.timing').isEnabledFor(logging.INFO))
+        self.assertIn('stage_timing', logs.output[0])
+        tts_failed = [record for record in logs.records if record.getMessage() == 'TTS audio generation failed']
+        self.assertEqual(tts_failed[0].attempt_id, job['attempt_id'])
+
+        status = self.client.get(job['status_url']).json()
+        self.assertEqual(status['status'], 'done')
+        self.assertEqual(status['transcript'], 'hello world')
+        self.assertEqual(status['scores']['overall'], 68)
+        self.assertTrue(get_progress(self.user, self.speaking).completed)
+
+        timings = SpeakingAttempt.objects.get(id=job['job_id']).stage_timings
+        self.assertEqual(set(timings), {'upload', 'stt', 'analysis', 'tts', 'persist'})
+
+    # Admin sahifasi {% static %} ishlatadi - manifest (collectstatic) talab qilinmasin
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_stage_latency_admin(self):
+        for ms in range(1, 11):
+            SpeakingAttempt.objects.create(user=self.user, speaking_lesson=self.speaking,
+                                           stage_timings={'stt': ms * 100.0, 'analysis': ms * 10.0})
+        SpeakingAttempt.objects.create(user=self.user, speaking_lesson=self.speaking, status='failed',
+                                       stage_timings={'stt': 99999.0})
+        self.user.is_staff = self.user.is_superuser = True
+        self.user.save()
+
+        response = self.client.get(reverse('admin:courses_speakingattempt_latency'))
+        rows = {row['stage']: row for row in response.context['rows']}
+        self.assertEqual([row['stage'] for row in response.context['rows']], ['stt', 'analysis', 'total'])
+        self.assertEqual((rows['stt']['count'], rows['stt']['p50'], rows['stt']['max']), (10, 500.0, 1000.0))
+        self.assertEqual(rows['total']['p99'], 1100.0)
+
+    def test_failed_stage_is_reported(self):
+        job = self.submit().json()
+
+        with mock.patch('courses.views.speech_to_text', return_value='hello world'), \
+                mock.patch('courses.views.analyze_speech_with_ai', side_effect=RuntimeError('AI down')):
+            WorkerPool(['speaking']).run_once()
+
+        status = self.client.get(job['status_url']).json()
+        self.assertEqual(status['status'], 'failed')
+        self.assertEqual(status['error'], 'AI down')
+        self.assertEqual(status['stages'], {'stt': 'done', 'analysis': 'failed', 'tts': 'pending'})
+
+
+DEMO_WRITING_ANALYSIS = {
+    'content_score': 70, 'coherence_score': 60, 'vocabulary_score': 65, 'grammar_score': 75,
+    'overall_score': 67, 'feedback': 'Well organised.', 'suggestions': ['Use linking words'],
+}
+
+
+@override_settings(AI_INLINE_WORKERS=0)
+class ProgressWriterTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('student', password='secret')
+        course = Course.objects.create(name='IELTS', description='-', course_type='english')
+        module = Module.objects.create(course=course, title='Modul')
+        cache.clear()
+        self.module = module
+        # View'lardagi kabi: darslar modul bilan birga (tarkib keshi versiyasi - module.updated_at)
+        self.video, self.listening, _, self.reading, self.writing = [
+            type(lesson).objects.select_related('module').get(pk=lesson.pk)
+            for lesson in create_module_content(module, 1)]
+        content_types()  # ContentType keshi
+        get_module_outline(self.video.module)
+
+    def test_single_statement_upsert_keeps_first_completion(self):
+        # progress upsert + modul yig'ma progressi (agregat + upsert)
+        with self.assertNumQueries(3):
+            record_progress(self.user, self.listening, 80, True)
+        completed_at = get_progress(self.user, self.listening).completed_at
+        self.assertIsNotNone(completed_at)
+
+        with self.assertNumQueries(3):
+            record_progress(self.user, self.listening, 20, False)
+        progress = get_progress(self.user, self.listening)
+        self.assertEqual((progress.score, progress.completed, progress.completed_at), (20, False, completed_at))
+
+        record_reading_progresses(self.user, [(self.reading.id, 60, True, 90, 3, 5)])
+        record_reading_progresses(self.user, [(self.reading.id, 100, True, 45, 5, 5)])
+        reading_progress = UserReadingProgress.objects.get(user=self.user)
+        self.assertEqual((reading_progress.score, reading_progress.time_spent, reading_progress.correct_answers),
+                         (100, 45, 5))
+
+    def test_user_progress_in_one_query_and_removed_with_lesson(self):
+        record_progress(self.user, self.video, 90, True)
+        record_progress(self.user, self.reading, 40, False)
+
+        with self.assertNumQueries(1):
+            progress = get_user_progress(self.user)
+        self.assertEqual(progress, {('video', self.video.id): {'completed': True, 'score': 90},
+                                    ('reading', self.reading.id): {'completed': False, 'score': 40}})
+
+        self.video.delete()
+        self.assertEqual(list(get_user_progress(self.user)), [('reading', self.reading.id)])
+
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_admin_changelist_prefetches_lessons(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='secret'))
+        url = reverse('admin:courses_lessonprogress_changelist')
+        record_progress(self.user, self.video, 100, True)
+        with CaptureQueriesContext(connection) as single:
+            self.client.get(url)
+
+        for lesson in (self.listening, self.reading, self.writing):
+            record_progress(self.user, lesson, 50, False)
+        for index in range(3):
+            extra = Lesson.objects.create(module=self.module, title=f'Extra {index}')
+            record_progress(self.user, extra, 10, False)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url)
+        self.assertContains(response, 'Extra 2')
+        # Har bir qo'shimcha dars turi uchun bitta so'rov, qatorlar soniga bog'liq emas
+        self.assertEqual(len(many), len(single) + 3)
+
+    def test_writing_counters_are_accumulated(self):
+        for score, time_spent in ((70, 100), (50, 30), (60, 20)):
+            record_writing_attempt(self.user, self.writing, score, time_spent)
+
+        progress = UserWritingProgress.objects.get(user=self.user, writing_lesson=self.writing)
+        self.assertEqual((progress.score, progress.best_score, progress.attempts_count, progress.time_spent),
+                         (60, 70, 3, 150))
+        self.assertEqual(get_progress(self.user, self.writing).score, 60)
+
+    def test_module_summary_is_maintained_and_rebuilt(self):
+        record_progress(self.user, self.video, 100, True)
+        record_progress(self.user, self.listening, 50, False)
+
+        summary = ModuleProgressSummary.objects.get(user=self.user, module=self.module)
+        self.assertEqual((summary.completed_count, summary.total_count, summary.average_score, summary.percent),
+                         (1, 5, 75, 20))
+
+        ReadingLesson.objects.create(module=self.module, title='Reading 2', reading_type='multiple_choice',
+                                     description='-', reading_text='-', instruction='-')
+        summary.refresh_from_db()
+        self.assertEqual(summary.total_count, 6)
+
+        self.video.delete()
+        summary = ModuleProgressSummary.objects.get(user=self.user, module=self.module)
+        self.assertEqual((summary.completed_count, summary.total_count, summary.average_score), (0, 5, 50))
+
+        # Boshqa foydalanuvchining yig'masi faqat jami darslar soni bo'yicha yangilanadi
+        other = User.objects.create_user('other', password='secret')
+        record_progress(other, self.writing, 90, True)
+        with mock.patch('courses.signals.refresh_summaries', wraps=refresh_summaries) as refresh:
+            self.listening.delete()
+        refresh.assert_called_once_with([self.user.id], [self.module])
+        self.assertEqual(ModuleProgressSummary.objects.get(user=other).total_count, 4)
+        summary = ModuleProgressSummary.objects.get(user=self.user, module=self.module)
+        self.assertEqual((summary.completed_count, summary.total_count, summary.average_score), (0, 4, 0))
+
+        ModuleProgressSummary.objects.all().delete()
+        call_command('rebuild_progress_summaries', stdout=io.StringIO())
+        rebuilt = ModuleProgressSummary.objects.get(user=other, module=self.module)
+        self.assertEqual((rebuilt.completed_count, rebuilt.total_count, rebuilt.average_score), (1, 4, 90))
+
+        self.client.force_login(other)
+        response = self.client.get(reverse('course_detail', args=[self.module.course_id]))
+        self.assertEqual(response.context['modules'][0].progress_summary.pk, rebuilt.pk)
+
+    def test_moved_lesson_moves_summary_progress(self):
+        other_module = Module.objects.create(course=self.module.course, title='Modul 2', order=1)
+        record_progress(self.user, self.video, 100, True)
+        record_progress(self.user, self.reading, 40, True)
+
+        self.video.module = other_module
+        self.video.save()
+
+        old = ModuleProgressSummary.objects.get(user=self.user, module=self.module)
+        new = ModuleProgressSummary.objects.get(user=self.user, module=other_module)
+        self.assertEqual((old.completed_count, old.total_count, old.average_score), (1, 4, 40))
+        self.assertEqual((new.completed_count, new.total_count, new.average_score), (1, 1, 100))
+
+        # Modul darslari va yig'masi bilan birga o'chiriladi
+        self.module.delete()
+        self.assertEqual(list(ModuleProgressSummary.objects.values_list('module_id', flat=True)), [other_module.id])
+
+
+    def test_migration_backfills_summaries_from_existing_progress(self):
+        backfill = importlib.import_module('courses.migrations.0022_backfill_module_progress_summaries')
+        record_progress(self.user, self.video, 100, True)
+        record_progress(self.user, self.listening, 50, False)
+        ModuleProgressSummary.objects.all().delete()
+        # Eski qatorlar: updated_at - 0020 migratsiyasi vaqti, haqiqiy faollik completed_at/created_at da
+        deployed = timezone.now()
+        completed = deployed - timedelta(days=30)
+        LessonProgress.objects.update(updated_at=deployed, created_at=deployed - timedelta(days=40))
+        LessonProgress.objects.filter(completed=True).update(completed_at=completed)
+
+        backfill.backfill(django_apps, None)
+
+        summary = ModuleProgressSummary.objects.get(user=self.user, module=self.module)
+        self.assertEqual((summary.completed_count, summary.total_count, summary.average_score), (1, 5, 75))
+        self.assertEqual(summary.last_activity, completed)
+
+
+class WritingQueueTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('student', password='secret')
+        course = Course.objects.create(name='IELTS', description='-', course_type='english')
+        module = Module.objects.create(course=course, title='Modul')
+        self.writing = create_module_content(module, 1)[4]
+        self.client.force_login(self.user)
+
+    def submit(self):
+        return self.client.post(reverse('submit_writing', args=[self.writing.id]),
+                                {'answer_text': 'My essay', 'time_spent': 120, 'word_count': 2},
+                                content_type='application/json')
+
+    @override_settings(WRITING_QUEUE_ENABLED=True)
+    def test_queued_mode(self):
+        with mock.patch('courses.views.analyze_writing_with_ai') as analyze:
+            response = self.submit()
+        analyze.assert_not_called()
+        self.assertEqual(response.status_code, 202)
+
+        status_url = response.json()['status_url']
+        self.assertEqual(self.client.get(status_url).json()['attempt']['status'], 'pending')
+
+        with mock.patch('courses.views.analyze_writing_with_ai', return_value=dict(DEMO_WRITING_ANALYSIS)):
+            WorkerPool(['writing']).run_once()
+
+        attempt = self.client.get(status_url).json()['attempt']
+        self.assertEqual(attempt['status'], 'done')
+        self.assertEqual(attempt['overall_score'], 67)
+        progress = UserWritingProgress.objects.get(user=self.user, writing_lesson=self.writing)
+        self.assertEqual((progress.attempts_count, progress.best_score, progress.time_spent), (1, 67, 120))
+
+    @override_settings(WRITING_QUEUE_ENABLED=False)
+    def test_synchronous_mode(self):
+        with mock.patch('courses.views.analyze_writing_with_ai', return_value=dict(DEMO_WRITING_ANALYSIS)):
+            response = self.submit()
+
+        self.assertEqual(response.json()['scores']['overall'], 67)
+        self.assertEqual(WritingAttempt.objects.get().status, 'done')
+        self.assertEqual(set(WritingAttempt.objects.get().stage_timings), {'analysis', 'persist'})
+
+
+class FakeGigaChat:
+    def __init__(self, **kwargs):
+        self.token = None
+
+    def chat(self, prompt):
+        self.token = self.token or 'access-token'
+        return prompt
+
+    def close(self):
+        pass
+
+
+class GigaChatClientManagerTest(TestCase):
+    @mock.patch('courses.ai_client.GigaChat', FakeGigaChat)
+    def test_client_and_token_are_reused(self):
+        manager = GigaChatClientManager()
+        events = []
+        manager.add_listener(events.append)
+
+        for _ in range(3):
+            with manager.session() as giga:
+                giga.chat('prompt')
+
+        stats = manager.stats()
+        self.assertEqual(stats['clients_created'], 1)
+        self.assertEqual((stats['calls'], stats['warm_calls']), (3, 2))
+        self.assertEqual((stats['token_refreshes'], stats['token_reuses']), (1, 2))
+        self.assertEqual(len(events), 3)
+        self.assertTrue(events[-1]['token_reused'])
+
+
+class FakeGTTS:
+    def __init__(self, text, lang, slow=False):
+        self.text = text
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.text.encode('utf-8'))
+
+
+class TTSCacheTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def test_same_text_reuses_audio(self):
+        with mock.patch('courses.views.gTTS', side_effect=FakeGTTS) as gtts:
+            first = text_to_speech('Good answer, keep practising.')
+            second = text_to_speech('Good answer, keep practising.')
+            other = text_to_speech('Good answer, keep practising.', lang='uz')
+
+        self.assertEqual(gtts.call_count, 2)
+        self.assertEqual(first.pk, second.pk)
+        self.assertNotEqual(first.pk, other.pk)
+        self.assertEqual(TTSCacheEntry.objects.get(pk=first.pk).hits, 1)
+
+    @override_settings(TTS_CACHE_MAX_ENTRIES=1)
+    def test_least_recently_used_entry_is_evicted(self):
+        with mock.patch('courses.views.gTTS', side_effect=FakeGTTS):
+            old = text_to_speech('First feedback')
+            new = text_to_speech('Second feedback')
+
+        self.assertEqual(list(TTSCacheEntry.objects.values_list('pk', flat=True)), [new.pk])
+        self.assertFalse(os.path.exists(old.audio_file.path))
+        self.assertTrue(os.path.exists(new.audio_file.path))
+
+
+@override_settings(UPLOAD_CHUNK_MAX_SIZE=4)
+@override_settings(AI_INLINE_WORKERS=0)
+class ChunkedUploadTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+        self.admin = User.objects.create_user('admin', password='secret', is_staff=True)
+        course = Course.objects.create(name='IELTS', description='-', course_type='english')
+        module = Module.objects.create(course=course, title='Modul')
+        self.lesson = Lesson.objects.create(module=module, title='Lecture')
+        self.client.force_login(self.admin)
+
+    def start(self, payload):
+        return self.client.post(reverse('chunked_upload_start'), {
+            'target': 'lesson', 'object_id': self.lesson.id, 'filename': 'lecture.MOV',
+            'size': len(payload), 'sha256': hashlib.sha256(payload).hexdigest(),
+        }, content_type='application/json').json()
+
+    def send(self, upload_id, offset, chunk):
+        return self.client.put(reverse('chunked_upload_chunk', args=[upload_id]), chunk,
+                               content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset))
+
+    def status(self, upload_id):
+        return self.client.get(reverse('chunked_upload_chunk', args=[upload_id])).json()
+
+    def complete(self, upload_id):
+        return self.client.post(reverse('chunked_upload_complete', args=[upload_id]))
+
+    def test_interrupted_upload_resumes_and_attaches_file(self):
+        payload = b'0123456789'
+        upload = self.start(payload)
+        self.assertEqual(self.send(upload['upload_id'], 0, payload[:4]).json()['offset'], 4)
+
+        # Uzilishdan keyin xuddi shu fayl uchun yuklash davom ettiriladi
+        resumed = self.start(payload)
+        self.assertEqual((resumed['upload_id'], resumed['offset']), (upload['upload_id'], 4))
+        self.assertEqual(self.send(upload['upload_id'], 0, payload[:4]).status_code, 409)
+        self.send(upload['upload_id'], 4, payload[4:8])
+        self.send(upload['upload_id'], 8, payload[8:])
+
+        # sha256 so'rov ichida emas, 'upload_verify' navbatida hisoblanadi
+        response = self.complete(upload['upload_id'])
+        self.assertEqual((response.status_code, response.json()['status']), (202, 'verifying'))
+        self.assertEqual(self.complete(upload['upload_id']).status_code, 202)
+        self.lesson.refresh_from_db()
+        self.assertFalse(self.lesson.video_file)
+
+        self.assertTrue(WorkerPool(['upload_verify']).run_once())
+        self.assertEqual(self.status(upload['upload_id'])['status'], 'complete')
+        self.assertEqual(self.complete(upload['upload_id']).status_code, 200)
+        self.lesson.refresh_from_db()
+        self.assertEqual(self.lesson.video_file.name, upload['file_name'])
+        with self.lesson.video_file.open('rb') as f:
+            self.assertEqual(f.read(), payload)
+
+    def test_checksum_mismatch_is_rejected(self):
+        upload = self.start(b'abcd')
+        self.send(upload['upload_id'], 0, b'abce')
+
+        self.assertEqual(self.complete(upload['upload_id']).status_code, 202)
+        WorkerPool(['upload_verify']).run_once()
+        status = self.status(upload['upload_id'])
+        self.assertEqual(status['status'], 'failed')
+        self.assertIn('sha256', status['error'])
+        self.assertEqual(ChunkedUpload.objects.get(id=upload['upload_id']).verify_status, 'failed')
+        self.lesson.refresh_from_db()
+        self.assertFalse(self.lesson.video_file)
+
+    def test_stale_offset_does_not_touch_file(self):
+        upload = self.start(b'abcdef')
+        self.send(upload['upload_id'], 0, b'abc')
+        # Bir xil offsetdagi kechikkan qayta urinish yozilgan qismni qayta yozmaydi
+        response = self.send(upload['upload_id'], 0, b'xyz')
+        self.assertEqual((response.status_code, response.json()['offset']), (409, 3))
+        with open(os.path.join(self.media_root, upload['file_name']), 'rb') as f:
+            self.assertEqual(f.read(), b'abc')
+
+    def test_students_cannot_upload(self):
+        self.client.force_login(User.objects.create_user('student', password='secret'))
+        self.assertEqual(self.client.post(reverse('chunked_upload_start')).status_code, 302)
+
+
+class MediaRangeTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root, MEDIA_ACCEL_REDIRECT_PREFIX='')
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+        os.makedirs(os.path.join(self.media_root, 'lesson_videos'))
+        with open(os.path.join(self.media_root, 'lesson_videos', 'lecture.mp4'), 'wb') as f:
+            f.write(b'0123456789')
+        self.url = '/media/lesson_videos/lecture.mp4'
+        self.user = User.objects.create_user('student', password='secret')
+        self.client.force_login(self.user)
+
+    def write(self, name, content=b'data'):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return '/media/' + name
+
+    def test_range_request_returns_partial_content(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(response['Content-Length'], '4')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(b''.join(response.streaming_content), b'789')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=20-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    def test_validators_and_offload(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+
+        cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+        # Fayl o'zgargan bo'lsa If-Range bilan butun fayl beriladi
+        stale = self.client.get(self.url, HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE='"old"')
+        self.assertEqual(stale.status_code, 200)
+
+        with override_settings(MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/'):
+            offloaded = self.client.get(self.url)
+        self.assertEqual(offloaded['X-Accel-Redirect'], '/protected-media/lesson_videos/lecture.mp4')
+
+        self.assertEqual(self.client.get('/media/../settings.py').status_code, 404)
+
+    def test_access_is_limited_to_lesson_media_and_own_recordings(self):
+        own = self.write(f'speaking_audio/user_{self.user.id}/answer.webm')
+        other = self.write('speaking_audio/user_999999/answer.webm')
+        private = self.write('chunked/secret.bin')
+        uploading = self.write('lesson_videos/partial.mov')
+        ChunkedUpload.objects.create(user=self.user, target='lesson', object_id=1, filename='partial.mov',
+                                     file_name='lesson_videos/partial.mov', size=100, sha256='0' * 64)
+
+        self.assertEqual(self.client.get(own).status_code, 200)
+        self.assertEqual(self.client.get(other).status_code, 404)
+        self.assertEqual(self.client.get(private).status_code, 404)
+        self.assertEqual(self.client.get(uploading).status_code, 404)
+        self.assertEqual(self.client.get('/media/lesson_videos/../chunked/secret.bin').status_code, 404)
+
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+
+@override_settings(AI_INLINE_WORKERS=0)
+class LessonTranscodeTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+        course = Course.objects.create(name='IELTS', description='-', course_type='english')
+        self.module = Module.objects.create(course=course, title='Modul')
+
+    def fake_ffmpeg(self, args, heartbeat=None):
+        if 'ffprobe' in args[0]:
+            return (b'{"streams": [{"codec_type": "video", "width": 1280, "height": 720}, '
+                    b'{"codec_type": "audio"}], "format": {"duration": "95.0"}}')
+        open(args[-1], 'wb').close()
+        return b''
+
+    def test_uploaded_video_is_transcoded_to_hls(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            lesson = Lesson.objects.create(module=self.module, title='Lecture',
+                                           video_file=SimpleUploadedFile('lecture.MOV', b'raw'))
+        lesson.refresh_from_db()
+        self.assertEqual(lesson.transcode_status, 'pending')
+        self.assertEqual(lesson.video_type(), 'file')
+
+        with mock.patch('courses.transcode.run_ffmpeg', side_effect=self.fake_ffmpeg) as ffmpeg:
+            self.assertTrue(WorkerPool(['transcode']).run_once())
+
+        # ffprobe + bitta ffmpeg: manba bir marta dekodlanadi, sifatlar va poster split orqali
+        self.assertEqual(ffmpeg.call_count, 2)
+        args = ffmpeg.call_args_list[1][0][0]
+        self.assertIn('[0:v]split=4[v0][v1][v2][v3]', args[args.index('-filter_complex') + 1])
+        self.assertEqual(args[args.index('-var_stream_map') + 1], 'v:0,a:0,name:360p v:1,a:1,name:540p v:2,a:2,name:720p')
+
+        lesson.refresh_from_db()
+        self.assertEqual(lesson.transcode_status, 'done')
+        self.assertEqual(lesson.video_type(), 'hls')
+        self.assertTrue(lesson.get_video_source().endswith('/master.m3u8'))
+        self.assertTrue(lesson.poster)
+
+        with open(os.path.join(self.media_root, lesson.hls_manifest)) as f:
+            master = f.read()
+        self.assertIn('RESOLUTION=1280x720\n720p/index.m3u8', master)
+        self.assertIn('RESOLUTION=640x360\n360p/index.m3u8', master)
+        self.assertNotIn('1080p', master)
+
+    def test_video_replaced_during_transcode_is_left_pending(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            lesson = Lesson.objects.create(module=self.module, title='Lecture',
+                                           video_file=SimpleUploadedFile('lecture.MOV', b'raw'))
+        queue = get_queue('transcode')
+
+        def replace_video(args, heartbeat=None):
+            if 'ffprobe' not in args[0]:
+                # Admin yangi video yuklaydi: enqueue holatni 'pending' ga qaytaradi
+                Lesson.objects.filter(pk=lesson.pk).update(video_file='lesson_videos/new.mp4')
+                queue.set_status(lesson, 'pending', error='')
+                heartbeat()
+            return self.fake_ffmpeg(args, heartbeat)
+
+        with mock.patch('courses.transcode.run_ffmpeg', side_effect=replace_video):
+            WorkerPool(['transcode']).run_once()
+
+        lesson.refresh_from_db()
+        self.assertEqual(lesson.transcode_status, 'pending')
+        self.assertEqual((lesson.hls_manifest, lesson.poster.name), ('', ''))
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'lesson_hls', f'lesson_{lesson.id}')), [])
+
+    def test_ffmpeg_failure_keeps_original_video(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            lesson = Lesson.objects.create(module=self.module, title='Lecture',
+                                           video_file=SimpleUploadedFile('lecture.MOV', b'raw'))
+
+        with mock.patch('courses.transcode.run_ffmpeg', side_effect=RuntimeError('ffmpeg missing')):
+            WorkerPool(['transcode']).run_once()
+
+        lesson.refresh_from_db()
+        self.assertEqual((lesson.transcode_status, lesson.transcode_error), ('failed', 'ffmpeg missing'))
+        self.assertEqual(lesson.get_video_source(), lesson.video_file.url)
+
+
+@override_settings(AI_INLINE_WORKERS=0)
+class ListeningAudioProcessingTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+        course = Course.objects.create(name='IELTS', description='-', course_type='english')
+        self.module = Module.objects.create(course=course, title='Modul')
+
+    def fake_ffmpeg(self, args, heartbeat=None):
+        if 'ffprobe' in args[0]:
+            return b'{"format": {"duration": "125.4"}}'
+        open(args[-1], 'wb').close()
+        return b''
+
+    def test_peaks_from_pcm(self):
+        samples = array.array('h', [100, -200, 32767, 0, -16384, 50])
+        chunks = [samples.tobytes()[:5], samples.tobytes()[5:]]
+
+        peaks = listening_audio.peaks_from_pcm(chunks, duration=6 / 8000, buckets=3)
+        self.assertEqual(peaks, [0.006, 1.0, 0.5])
+
+    def test_uploaded_audio_gets_compressed_derivative(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            listening = ListeningLesson.objects.create(module=self.module, title='Part 1',
+                                                       listening_type='multiple_choice',
+                                                       audio_file=SimpleUploadedFile('part1.mp3', b'mp3'))
+        version = listening.updated_at
+
+        pcm = array.array('h', [1000, -3000] * 400).tobytes()
+        with mock.patch('courses.listening_audio.run_ffmpeg', side_effect=self.fake_ffmpeg), \
+                mock.patch('courses.listening_audio.decode_pcm', return_value=iter([pcm])):
+            self.assertTrue(WorkerPool(['listening_audio']).run_once())
+
+        listening.refresh_from_db()
+        self.assertEqual(listening.audio_status, 'done')
+        self.assertEqual(listening.audio_duration, 125.4)
+        self.assertEqual(listening.audio_duration_display(), '2:05')
+        self.assertTrue(listening.get_audio_url().endswith('.m4a'))
+        self.assertEqual(listening.audio_mime_type(), 'audio/mp4')
+        # Javoblar kaliti versiyasi o'zgarmaydi
+        self.assertEqual(listening.updated_at, version)
+
+        with listening.audio_waveform.open('r') as f:
+            waveform = json.load(f)
+        self.assertEqual(waveform['duration'], 125.4)
+        self.assertTrue(all(peak == 0.092 for peak in waveform['peaks']))
+
+    def test_audio_replaced_during_processing_is_left_pending(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            listening = ListeningLesson.objects.create(module=self.module, title='Part 1',
+                                                       listening_type='multiple_choice',
+                                                       audio_file=SimpleUploadedFile('part1.mp3', b'mp3'))
+        queue = get_queue('listening_audio')
+
+        def replace_audio(args, heartbeat=None):
+            if 'ffprobe' not in args[0]:
+                # Admin yangi audio yuklaydi: enqueue holatni 'pending' ga qaytaradi
+                ListeningLesson.objects.filter(pk=listening.pk).update(audio_file='listening_audios/new.mp3')
+                queue.set_status(listening, 'pending', error='')
+                heartbeat()
+            return self.fake_ffmpeg(args, heartbeat)
+
+        pcm = array.array('h', [1000, -3000] * 400).tobytes()
+        with mock.patch('courses.listening_audio.run_ffmpeg', side_effect=replace_audio), \
+                mock.patch('courses.listening_audio.decode_pcm', return_value=iter([pcm])):
+            WorkerPool(['listening_audio']).run_once()
+
+        listening.refresh_from_db()
+        self.assertEqual(listening.audio_status, 'pending')
+        self.assertEqual((listening.audio_compressed.name, listening.audio_waveform.name), ('', ''))
+        self.assertEqual(listening.audio_duration, None)
+        for directory in (listening_audio.COMPRESSED_DIR, listening_audio.WAVEFORM_DIR):
+            self.assertEqual(os.listdir(os.path.join(self.media_root, directory)), [])
+
+
+class SegmentedSpeechToTextTest(TestCase):
+    def write_wav(self, pattern, sample_rate=16000):
+        """pattern: [(soniya, amplituda)] - 0 jimlik, boshqasi ton"""
+        samples = array.array('h')
+        for seconds, amplitude in pattern:
+            count = int(seconds * sample_rate)
+            samples.extend(int(amplitude * math.sin(i / 4)) for i in range(count))
+
+        handle, path = tempfile.mkstemp(suffix='.wav')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        with wave.open(path, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(sample_rate)
+            wav.writeframes(samples.tobytes())
+        return path
+
+    def test_segments_are_recognized_in_order(self):
+        path = self.write_wav([(0.5, 0), (1.0, 8000), (1.0, 0), (2.0, 8000), (0.5, 0)])
+
+        def recognize(audio, language):
+            seconds = len(audio.frame_data) / audio.sample_rate / audio.sample_width
+            return 'long answer' if seconds > 1.8 else 'short'
+
+        with mock.patch('speech_recognition.Recognizer.recognize_google', side_effect=recognize):
+            result = stt.transcribe(path)
+
+        self.assertEqual(result['text'], 'short long answer')
+        self.assertEqual(len(result['segments']), 2)
+        first, second = result['segments']
+        self.assertAlmostEqual(first['start'], 0.3, delta=0.05)
+        self.assertAlmostEqual(second['end'], 4.7, delta=0.05)
+
+    def test_failed_segment_is_retried_alone(self):
+        path = self.write_wav([(1.0, 8000), (1.0, 0), (1.0, 8000)])
+        calls = []
+
+        def recognize(audio, language):
+            calls.append(audio)
+            if len(calls) == 1:
+                raise sr.RequestError('timeout')
+            return 'hello'
+
+        with mock.patch('speech_recognition.Recognizer.recognize_google', side_effect=recognize), \
+                override_settings(STT_MAX_WORKERS=1):
+            result = stt.transcribe(path)
+
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(result['text'], 'hello hello')
+
+    def test_unexpected_engine_error_is_recorded_per_segment(self):
+        path = self.write_wav([(1.0, 8000), (1.0, 0), (1.0, 8000), (1.0, 0), (2.0, 8000)])
+
+        def recognize(audio, language):
+            if len(audio.frame_data) / audio.sample_rate / audio.sample_width < 1.8:
+                return 'hello'
+            raise ConnectionResetError('connection reset')
+
+        with mock.patch('speech_recognition.Recognizer.recognize_google', side_effect=recognize), \
+                self.assertLogs('courses.stt', 'WARNING'):
+            result = stt.transcribe(path)
+
+        self.assertEqual(result['text'], 'hello hello')
+        self.assertEqual(result['segments'][2]['error'], 'connection reset')
+
+    def test_mostly_failed_transcript_fails_the_attempt(self):
+        path = self.write_wav([(1.0, 8000), (1.0, 0), (1.0, 8000), (1.0, 0), (2.0, 8000)])
+
+        def recognize(audio, language):
+            if len(audio.frame_data) / audio.sample_rate / audio.sample_width < 1.8:
+                raise sr.RequestError('timeout')
+            return 'hello'
+
+        with mock.patch('speech_recognition.Recognizer.recognize_google', side_effect=recognize), \
+                self.assertLogs('courses.stt', 'WARNING') as logs:
+            with self.assertRaises(stt.TranscriptionFailed):
+                speech_to_text(path)
+            # Chegaradan kam segment tanilmasa qolgani baholanadi, xatolar logga yoziladi
+            with override_settings(STT_MAX_FAILED_RATIO=0.7):
+                self.assertEqual(stt.transcribe(path)['text'], 'hello')
+        self.assertIn('segment #0 ', logs.output[0])
+
+    def test_local_engine_batches_segments(self):
+        class FakeLocalEngine(stt.STTEngine):
+            name = 'fake'
+            batched = True
+            batch_sizes = []
+
+            def recognize_batch(self, items):
+                self.batch_sizes.append(len(items))
+                return [f'part{len(raw) // 1000}' for raw, _, _ in items]
+
+        engine = FakeLocalEngine()
+        path = self.write_wav([(1.0, 8000), (1.0, 0), (2.0, 8000)])
+
+        with mock.patch.dict(stt._batchers, {'fake': stt.MicroBatcher(engine, max_batch=8, max_wait=0.2)}), \
+                mock.patch('courses.stt.get_engine', return_value=engine):
+            result = stt.transcribe(path)
+
+        self.assertEqual(engine.batch_sizes, [2])
+        self.assertEqual(result['engine'], 'fake')
+        self.assertEqual(result['text'], 'part38 part70')
+
+
+    @override_settings(STT_VOSK_MODEL_PATH='/models/vosk', STT_VOSK_THREADS=4)
+    def test_vosk_batch_is_decoded_in_parallel(self):
+        state = {'running': 0, 'peak': 0, 'created': 0}
+        lock = threading.Lock()
+        all_started = threading.Barrier(4, timeout=5)
+
+        class KaldiRecognizer:
+            def __init__(self, model, sample_rate):
+                state['created'] += 1
+
+            def AcceptWaveform(self, raw):
+                with lock:
+                    state['running'] += 1
+                    state['peak'] = max(state['peak'], state['running'])
+                all_started.wait()
+                self.text = f'part{len(raw)}'
+                with lock:
+                    state['running'] -= 1
+
+            def FinalResult(self):
+                return json.dumps({'text': self.text})
+
+            def Reset(self):
+                pass
+
+        vosk = mock.Mock(KaldiRecognizer=KaldiRecognizer)
+        with mock.patch.dict('sys.modules', {'vosk': vosk}):
+            engine = stt.VoskEngine()
+        items = [(b'x' * size, 16000, 'en-US') for size in (1, 2, 3, 4)]
+
+        self.assertEqual(engine.recognize_batch(items), ['part1', 'part2', 'part3', 'part4'])
+        self.assertEqual(state['peak'], 4)
+        # Recognizer'lar keyingi guruhda qayta ishlatiladi
+        all_started = threading.Barrier(1)
+        self.assertEqual(engine.recognize_batch(items[:2]), ['part1', 'part2'])
+        self.assertEqual(state['created'], 4)
+
+class AudioIngestTest(TestCase):
+    write_wav = SegmentedSpeechToTextTest.write_wav
+
+    def test_container_is_sniffed_from_content(self):
+        self.assertEqual(audio_ingest.sniff_container(b'\x1a\x45\xdf\xa3\x9f\x42\x86\x81'), 'webm')
+        self.assertEqual(audio_ingest.sniff_container(b'OggS\x00\x02'), 'ogg')
+        self.assertEqual(audio_ingest.sniff_container(b'RIFF\x24\x00\x00\x00WAVEfmt '), 'wav')
+        self.assertEqual(audio_ingest.sniff_container(b'\x00\x00\x00\x1cftypM4A '), 'mp4')
+        self.assertIsNone(audio_ingest.sniff_container(b'not audio'))
+
+    def test_canonical_wav_is_trimmed_without_ffmpeg(self):
+        path = self.write_wav([(1.0, 0), (1.0, 8000), (1.0, 0)])
+
+        with mock.patch('courses.audio_ingest.decode_with_ffmpeg') as ffmpeg:
+            pcm, sample_rate, stats = audio_ingest.ingest(path)
+
+        ffmpeg.assert_not_called()
+        self.assertEqual(sample_rate, 16000)
+        self.assertAlmostEqual(stats['offset'], 0.8, delta=0.03)
+        self.assertAlmostEqual(stats['trimmed_seconds'], 1.4, delta=0.05)
+        self.assertEqual(stats['pcm_bytes'], len(pcm))
+
+    def test_webm_upload_is_decoded_by_ffmpeg(self):
+        handle, path = tempfile.mkstemp(suffix='.wav')
+        with os.fdopen(handle, 'wb') as f:
+            f.write(b'\x1a\x45\xdf\xa3' + b'\x00' * 64)
+        self.addCleanup(os.remove, path)
+        tone = array.array('h', [8000, -8000] * 8000).tobytes()
+
+        with mock.patch('courses.audio_ingest.decode_with_ffmpeg', return_value=tone) as ffmpeg:
+            pcm, _, stats = audio_ingest.ingest(path)
+
+        ffmpeg.assert_called_once_with(path)
+        self.assertEqual(stats['container'], 'webm')
+        self.assertEqual(pcm, tone)
+
+
+class BenchFlowsTest(TransactionTestCase):
+    """generate_bench_data + bench_flows (oqimlar alohida ulanishda, shuning uchun TransactionTestCase)"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        call_command('generate_bench_data', courses=1, modules=1, lessons=1, questions=2, users=3,
+                     stdout=io.StringIO())
+
+    def test_benchmark_reports_percentiles_and_saves_baseline(self):
+        baseline = os.path.join(self.tmp, 'baseline.json')
+
+        call_command('bench_flows', iterations=2, baseline=baseline, save_baseline=True, stdout=io.StringIO())
+
+        with open(baseline) as f:
+            report = json.load(f)
+        self.assertEqual(report['meta']['users'], 3)
+        self.assertEqual(set(report['results']),
+                         {'browse_module', 'listening_test', 'reading_test', 'submit_writing'})
+        for requests in report['results'].values():
+            for name, row in requests.items():
+                self.assertEqual(row['errors'], 0, name)
+                self.assertEqual(row['requests'], 2)
+                self.assertLessEqual(row['p50_ms'], row['p95_ms'])
+                self.assertLessEqual(row['queries'], QUERY_BUDGETS[name], name)
+        self.assertEqual(WritingAttempt.objects.count(), 2)
+
+        out = io.StringIO()
+        call_command('bench_flows', scenarios=['browse_module'], iterations=2, baseline=baseline,
+                     tolerance=100, stdout=out)
+        self.assertIn('No regressions', out.getvalue())
+
+    def test_compare_flags_query_and_latency_regressions(self):
+        baseline = {'reading_test': {'reading_detail': {'queries': 5, 'p95_ms': 10.0}}}
+        results = {'reading_test': {'reading_detail': {'queries': 6, 'p95_ms': 20.0}}}
+
+        self.assertEqual(len(compare(results, baseline, tolerance=0.5)), 2)
+        self.assertEqual(compare(results, baseline, tolerance=0.5, latency=False),
+                         ['reading_test/reading_detail: queries 5 -> 6'])
+        self.assertEqual(compare(results, baseline, tolerance=1.5), ['reading_test/reading_detail: queries 5 -> 6'])
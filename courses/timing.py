@@ -0,0 +1,98 @@
+# courses/timing.py - Speaking/writing AI pipeline bosqichlari vaqtini o'lchash
+#
+# Har bir urinish uchun StageTimer: `with timer.span('stt'): ...` bosqich vaqtini
+# (ms) o'lchaydi, bitta JSON qator sifatida logga yozadi va urinishning
+# `stage_timings` maydonida saqlaydi. Navbatdan qayta olingan urinishda oldingi
+# bosqichlar vaqti saqlanib qoladi. Admin sahifasi shu maydonlardan har bir
+# bosqich bo'yicha p50/p90/p95/p99 kechikishlarni hisoblaydi.
+
+import json
+import logging
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Bosqichlar tartibi (urinish turi -> bosqichlar)
+#   upload   - audio faylni saqlash (web so'rovi ichida)
+#   stt      - nutqni matnga o'girish
+#   analysis - GigaChat tahlili
+#   tts      - AI javobini ovozga o'girish
+#   persist  - natija va progressni bazaga yozish
+PIPELINE_STAGES = {
+    'speaking': ('upload', 'stt', 'analysis', 'tts', 'persist'),
+    'writing': ('analysis', 'persist'),
+}
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+class StageTimer:
+    """Bitta urinish bosqichlari vaqti (ms)"""
+
+    def __init__(self, kind, attempt=None):
+        self.kind = kind
+        self.attempt = attempt
+        self.timings = {}
+
+    @contextmanager
+    def span(self, stage):
+        """Blok vaqtini `stage` bosqichiga qo'shish (xato bo'lsa ham yoziladi)"""
+        started = time.perf_counter()
+        ok = True
+        try:
+            yield
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            ms = round((time.perf_counter() - started) * 1000, 1)
+            self.timings[stage] = round(self.timings.get(stage, 0) + ms, 1)
+            logger.info("stage_timing %s", json.dumps({
+                'kind': self.kind,
+                'attempt': self.attempt.pk if self.attempt else None,
+                'stage': stage,
+                'ms': ms,
+                'ok': ok,
+            }))
+
+    def save(self, attempt=None):
+        """O'lchangan vaqtlarni urinishning stage_timings maydoniga qo'shib yozish"""
+        self.attempt = attempt or self.attempt
+        if not self.timings:
+            return
+        timings = dict(self.attempt.stage_timings or {}, **self.timings)
+        type(self.attempt).objects.filter(pk=self.attempt.pk).update(stage_timings=timings)
+        self.attempt.stage_timings = timings
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def stage_percentiles(kind, model, limit=1000):
+    """Oxirgi `limit` ta tugagan urinish bo'yicha har bir bosqich (va jami) kechikishi.
+
+    Natija: [{'stage', 'count', 'p50', 'p90', 'p95', 'p99', 'max'}] (ms)
+    """
+    samples = {}
+    rows = model.objects.filter(status='done').order_by('-pk').values_list('stage_timings', flat=True)[:limit]
+    for timings in rows:
+        if not timings:
+            continue
+        for stage, ms in timings.items():
+            samples.setdefault(stage, []).append(ms)
+        samples.setdefault('total', []).append(round(sum(timings.values()), 1))
+
+    stages = [stage for stage in PIPELINE_STAGES[kind] if stage in samples]
+    stages += sorted(set(samples) - set(stages) - {'total'}) + (['total'] if samples else [])
+
+    report = []
+    for stage in stages:
+        values = samples[stage]
+        row = {'stage': stage, 'count': len(values), 'max': max(values)}
+        row.update({f'p{percent}': percentile(values, percent) for percent in PERCENTILES})
+        report.append(row)
+    return report
@@ -0,0 +1,216 @@
+# courses/transcode.py - Dars videolarini HLS (ko'p bitreytli) formatga o'girish
+#
+# Telefonda yozilgan .MOV fayllar mobil internetda juda og'ir. Har bir yuklangan
+# Lesson.video_file uchun 'transcode' navbatida ffmpeg (lokal subprocess) bir nechta
+# sifatdagi HLS versiyalar va poster rasm yaratadi:
+#
+#   media/lesson_hls/lesson_<id>/<versiya>/master.m3u8
+#   media/lesson_hls/lesson_<id>/<versiya>/<360p|720p|...>/index.m3u8 + seg_XXXX.ts
+#   media/lesson_posters/lesson_<id>_<versiya>.jpg
+#
+# Tayyor bo'lgach Lesson.get_video_source() master manifestni qaytaradi.
+
+import json
+import logging
+import os
+import shutil
+import subprocess
+import uuid
+
+from django.conf import settings
+from django.utils import timezone
+
+from .jobs import DONE, get_queue
+
+logger = logging.getLogger(__name__)
+
+HLS_DIR = 'lesson_hls'
+POSTER_DIR = 'lesson_posters'
+
+# ffmpeg ishlayotganda navbatdagi yozuv "tirik"ligini bildirish oralig'i (soniya)
+HEARTBEAT_INTERVAL = 30
+
+
+class TranscodeError(Exception):
+    pass
+
+
+def run_ffmpeg(args, heartbeat=None):
+    """ffmpeg/ffprobe ni ishga tushirish. Uzoq jarayonda heartbeat() vaqti-vaqti bilan chaqiriladi."""
+    process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    while True:
+        try:
+            stdout, stderr = process.communicate(timeout=HEARTBEAT_INTERVAL)
+            break
+        except subprocess.TimeoutExpired:
+            if heartbeat:
+                heartbeat()
+
+    if process.returncode != 0:
+        message = stderr.decode('utf-8', 'replace').strip().splitlines()
+        raise TranscodeError(f"{os.path.basename(args[0])} xatosi: {message[-1] if message else process.returncode}")
+    return stdout
+
+
+def probe_video(path):
+    """Video o'lchami, davomiyligi va audio bor-yo'qligi (ffprobe)"""
+    output = run_ffmpeg([
+        settings.FFPROBE_BINARY, '-v', 'error',
+        '-show_entries', 'stream=codec_type,width,height:format=duration', '-of', 'json', path,
+    ])
+    data = json.loads(output)
+    streams = data.get('streams') or []
+    video = [stream for stream in streams if stream.get('codec_type') == 'video']
+    if not video:
+        raise TranscodeError("Faylda video oqimi topilmadi")
+    return {
+        'width': int(video[0]['width']),
+        'height': int(video[0]['height']),
+        'duration': float(data.get('format', {}).get('duration') or 0),
+        'audio': any(stream.get('codec_type') == 'audio' for stream in streams),
+    }
+
+
+def select_renditions(source_height):
+    """Manbadan katta bo'lmagan sifatlar (kamida eng pasti)"""
+    renditions = sorted(settings.HLS_RENDITIONS, key=lambda r: r['height'])
+    selected = [r for r in renditions if r['height'] <= source_height]
+    return selected or renditions[:1]
+
+
+def even(value):
+    return max(2, int(round(value / 2.0)) * 2)
+
+
+def transcode_args(source, renditions, output_dir, poster_path, poster_at, audio=True):
+    """Barcha sifatlar va poster uchun bitta ffmpeg buyrug'i.
+
+    Manba bir marta dekodlanadi: `split` filtri kadrlarni har bir sifat (va poster)
+    uchun tarqatadi, `-var_stream_map` esa har bir sifatni o'z papkasiga yozadi.
+    """
+    segment_seconds = settings.HLS_SEGMENT_SECONDS
+    count = len(renditions)
+    branches = ''.join(f'[v{i}]' for i in range(count + 1))
+    filters = [f'[0:v]split={count + 1}{branches}']
+    filters += [f"[v{i}]scale=-2:{rendition['height']}[out{i}]" for i, rendition in enumerate(renditions)]
+    filters.append(f"[v{count}]select='gte(t,{poster_at:.2f})',scale=-2:{renditions[-1]['height']}[poster]")
+
+    args = [settings.FFMPEG_BINARY, '-y', '-v', 'error', '-i', source, '-filter_complex', ';'.join(filters)]
+    stream_map = []
+    for i, rendition in enumerate(renditions):
+        bitrate = rendition['video_bitrate']
+        args += ['-map', f'[out{i}]', f'-b:v:{i}', bitrate, f'-maxrate:v:{i}', bitrate, f'-bufsize:v:{i}', bitrate]
+        if audio:
+            args += ['-map', '0:a:0', f'-b:a:{i}', rendition['audio_bitrate']]
+        stream_map.append(f"v:{i},a:{i},name:{rendition['name']}" if audio else f"v:{i},name:{rendition['name']}")
+
+    args += [
+        '-c:v', 'libx264', '-preset', 'veryfast', '-profile:v', 'main', '-pix_fmt', 'yuv420p',
+        # Segmentlar bir xil joydan boshlansin (sifatlar o'rtasida almashish uchun)
+        '-force_key_frames', f'expr:gte(t,n_forced*{segment_seconds})', '-sc_threshold', '0',
+    ]
+    if audio:
+        args += ['-c:a', 'aac', '-ac', '2']
+    args += [
+        '-f', 'hls', '-hls_time', str(segment_seconds), '-hls_playlist_type', 'vod',
+        '-var_stream_map', ' '.join(stream_map),
+        '-hls_segment_filename', os.path.join(output_dir, '%v', 'seg_%04d.ts'),
+        os.path.join(output_dir, '%v', 'index.m3u8'),
+        # Poster - xuddi shu dekodlangan kadrlardan
+        '-map', '[poster]', '-frames:v', '1', poster_path,
+    ]
+    return args
+
+
+def bitrate_to_bps(value):
+    value = str(value).lower()
+    if value.endswith('k'):
+        return int(float(value[:-1]) * 1000)
+    if value.endswith('m'):
+        return int(float(value[:-1]) * 1000000)
+    return int(value)
+
+
+def master_playlist(renditions, probe):
+    """Master manifest: har bir sifat uchun BANDWIDTH va RESOLUTION"""
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3']
+    for rendition in renditions:
+        height = rendition['height']
+        width = even(probe['width'] * height / probe['height'])
+        bandwidth = bitrate_to_bps(rendition['video_bitrate']) + bitrate_to_bps(rendition['audio_bitrate'])
+        lines.append(f'#EXT-X-STREAM-INF:BANDWIDTH={bandwidth},RESOLUTION={width}x{height}')
+        lines.append(f"{rendition['name']}/index.m3u8")
+    return '\n'.join(lines) + '\n'
+
+
+def transcode_lesson(lesson, heartbeat=None):
+    """HLS versiyalar va poster yaratish. Natija: (manifest nomi, poster nomi)"""
+    source = lesson.video_file.path
+    probe = probe_video(source)
+    renditions = select_renditions(probe['height'])
+
+    version = uuid.uuid4().hex[:8]
+    relative_dir = f'{HLS_DIR}/lesson_{lesson.id}/{version}'
+    output_dir = os.path.join(settings.MEDIA_ROOT, relative_dir)
+
+    poster_name = f'{POSTER_DIR}/lesson_{lesson.id}_{version}.jpg'
+    poster_path = os.path.join(settings.MEDIA_ROOT, poster_name)
+    poster_at = min(settings.HLS_POSTER_SECOND, probe['duration'] / 2) if probe['duration'] else 0
+
+    try:
+        for rendition in renditions:
+            os.makedirs(os.path.join(output_dir, rendition['name']), exist_ok=True)
+        os.makedirs(os.path.dirname(poster_path), exist_ok=True)
+        run_ffmpeg(transcode_args(source, renditions, output_dir, poster_path, poster_at, probe['audio']), heartbeat)
+
+        with open(os.path.join(output_dir, 'master.m3u8'), 'w') as f:
+            f.write(master_playlist(renditions, probe))
+    except Exception:
+        shutil.rmtree(output_dir, ignore_errors=True)
+        raise
+
+    return f'{relative_dir}/master.m3u8', poster_name
+
+
+def remove_previous_outputs(lesson, keep_manifest):
+    """Eski HLS versiyalarini o'chirish"""
+    lesson_dir = os.path.join(settings.MEDIA_ROOT, HLS_DIR, f'lesson_{lesson.id}')
+    keep_version = keep_manifest.split('/')[-2]
+    if os.path.isdir(lesson_dir):
+        for name in os.listdir(lesson_dir):
+            if name != keep_version:
+                shutil.rmtree(os.path.join(lesson_dir, name), ignore_errors=True)
+
+
+def run_lesson_transcode(lesson):
+    """'transcode' navbati handleri"""
+    queue = get_queue('transcode')
+
+    if not lesson.video_file:
+        queue.set_status(lesson, 'done', error='')
+        return
+
+    source_name = lesson.video_file.name
+    old_poster = lesson.poster.name if lesson.poster else ''
+    manifest, poster = transcode_lesson(lesson, heartbeat=lambda: queue.heartbeat(lesson, queue.first_stage))
+
+    # Ish davomida admin videoni almashtirgan bo'lsa (yangi fayl allaqachon navbatda) natija eskirgan
+    finished = type(lesson).objects.filter(
+        pk=lesson.pk, video_file=source_name, transcode_status=queue.first_stage,
+    ).update(hls_manifest=manifest, poster=poster, transcode_status=DONE, transcode_error='',
+             transcode_updated_at=timezone.now())
+    if not finished:
+        shutil.rmtree(os.path.dirname(os.path.join(settings.MEDIA_ROOT, manifest)), ignore_errors=True)
+        lesson.poster.storage.delete(poster)
+        logger.info("Lesson #%s video changed during transcoding, result of %s dropped", lesson.pk, source_name)
+        return
+
+    lesson.hls_manifest = manifest
+    lesson.poster.name = poster
+    lesson.transcode_status = DONE
+
+    remove_previous_outputs(lesson, manifest)
+    if old_poster and old_poster != poster:
+        lesson.poster.storage.delete(old_poster)
+
+    logger.info("Lesson #%s transcoded to HLS: %s", lesson.pk, manifest)
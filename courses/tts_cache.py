@@ -0,0 +1,115 @@
+# courses/tts_cache.py - AI feedback uchun TTS audio keshi
+#
+# Fayl nomi matn, til va engine'dan olingan sha256 kalitdan tuziladi, shuning uchun
+# bir xil feedback (demo tahlil, tez-tez takrorlanadigan iboralar) uchun gTTS qayta
+# chaqirilmaydi. Papka hajmi TTS_CACHE_MAX_BYTES / TTS_CACHE_MAX_ENTRIES bilan
+# cheklangan: oshib ketsa eng uzoq ishlatilmagan (LRU) yozuvlar o'chiriladi.
+
+import hashlib
+import logging
+import os
+import uuid
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import SpeakingAttempt, TTSCacheEntry
+
+logger = logging.getLogger(__name__)
+
+TTS_CACHE_DIR = 'speaking_feedback'
+
+# Qidiruv tartibi: asosiy engine, keyin fallback
+TTS_ENGINES = ('gtts', 'pyttsx3')
+
+
+def tts_cache_key(text, lang, engine):
+    payload = '\0'.join([engine, lang, text]).encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()
+
+
+def cache_dir():
+    path = os.path.join(settings.MEDIA_ROOT, TTS_CACHE_DIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def temp_path(suffix='.mp3'):
+    """Sintez uchun vaqtinchalik fayl (tayyor bo'lgach store() ga beriladi)"""
+    return os.path.join(cache_dir(), f'.tmp_{uuid.uuid4().hex}{suffix}')
+
+
+def lookup(text, lang):
+    """Keshdagi audio yozuvini topish. Topilmasa None."""
+    keys = [tts_cache_key(text, lang, engine) for engine in TTS_ENGINES]
+    entries = {entry.key: entry for entry in TTSCacheEntry.objects.filter(key__in=keys)}
+
+    for key in keys:
+        entry = entries.get(key)
+        if entry is None:
+            continue
+        if not entry.audio_file or not os.path.exists(entry.audio_file.path):
+            # Fayl qo'lda o'chirilgan - yozuv ham keraksiz
+            entry.delete()
+            continue
+
+        now = timezone.now()
+        TTSCacheEntry.objects.filter(pk=entry.pk).update(hits=F('hits') + 1, last_used_at=now)
+        entry.hits += 1
+        entry.last_used_at = now
+        return entry
+
+    return None
+
+
+def store(text, lang, engine, path):
+    """Sintez qilingan faylni kesh nomiga ko'chirib, yozuv yaratish"""
+    key = tts_cache_key(text, lang, engine)
+    name = f'{TTS_CACHE_DIR}/tts_{key}.mp3'
+    final_path = os.path.join(settings.MEDIA_ROOT, name)
+    os.replace(path, final_path)
+
+    try:
+        entry, created = TTSCacheEntry.objects.get_or_create(key=key, defaults={
+            'engine': engine,
+            'lang': lang,
+            'audio_file': name,
+            'size': os.path.getsize(final_path),
+        })
+    except IntegrityError:
+        # Boshqa worker xuddi shu matnni bir vaqtda yozib qo'ydi
+        entry = TTSCacheEntry.objects.get(key=key)
+
+    evict()
+    return entry
+
+
+def evict():
+    """Hajm/son chegarasidan oshgan bo'lsa eng eski yozuvlarni o'chirish"""
+    max_bytes = settings.TTS_CACHE_MAX_BYTES
+    max_entries = settings.TTS_CACHE_MAX_ENTRIES
+
+    total_bytes = TTSCacheEntry.objects.aggregate(total=Sum('size'))['total'] or 0
+    total_entries = TTSCacheEntry.objects.count()
+    if total_bytes <= max_bytes and total_entries <= max_entries:
+        return 0
+
+    evicted = 0
+    for entry in TTSCacheEntry.objects.order_by('last_used_at').iterator():
+        if total_bytes <= max_bytes and total_entries <= max_entries:
+            break
+
+        SpeakingAttempt.objects.filter(feedback_tts=entry).update(feedback_audio='', feedback_tts=None)
+        try:
+            entry.audio_file.delete(save=False)
+        except OSError:
+            logger.exception("TTS cache file delete failed: %s", entry.audio_file.name)
+        entry.delete()
+
+        total_bytes -= entry.size
+        total_entries -= 1
+        evicted += 1
+
+    return evicted
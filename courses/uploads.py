@@ -0,0 +1,181 @@
+# courses/uploads.py - Katta dars fayllarini bo'laklab, davom ettirish mumkin bo'lgan yuklash
+#
+# Oddiy admin formasi butun faylni bitta so'rovda vaqtinchalik faylga buferlaydi va
+# 2GB .MOV ma'ruzalarda hostingdagi timeout'ga uriladi. Bu yerda har bir bo'lak
+# to'g'ridan-to'g'ri yakuniy fayl yo'liga (upload_to bo'yicha) yoziladi; uzilgan
+# yuklash `received` offsetidan davom etadi. Oxirida sha256 'upload_verify'
+# navbatida (so'rovdan tashqarida) tekshiriladi va fayl nomi modelga qayta
+# nusxalanmasdan biriktiriladi.
+
+import hashlib
+import os
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+
+from .jobs import DONE, FAILED, enqueue, get_queue
+from .models import ChunkedUpload
+
+# target -> (model, fayl maydoni)
+UPLOAD_TARGETS = {
+    'lesson': ('courses.Lesson', 'video_file'),
+    'listening': ('courses.ListeningLesson', 'audio_file'),
+}
+
+READ_BLOCK_SIZE = 1024 * 1024
+
+
+class UploadError(Exception):
+    """Yuklash xatoligi (status - HTTP javob kodi)"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def get_target(target, object_id):
+    """Fayl biriktiriladigan obyekt va uning FileField maydoni"""
+    if target not in UPLOAD_TARGETS:
+        raise UploadError(f"Noma'lum target: {target}")
+    model_label, field_name = UPLOAD_TARGETS[target]
+    model = apps.get_model(model_label)
+    try:
+        instance = model.objects.select_related('module__course').get(pk=object_id)
+    except model.DoesNotExist:
+        raise UploadError("Dars topilmadi", status=404)
+    return instance, instance._meta.get_field(field_name)
+
+
+def file_path(upload):
+    return os.path.join(settings.MEDIA_ROOT, upload.file_name)
+
+
+def start_upload(user, target, object_id, filename, size, sha256):
+    """Yangi yuklashni boshlash yoki tugallanmagan xuddi shu yuklashni qaytarish"""
+    if size <= 0 or size > settings.MAX_UPLOAD_SIZE:
+        raise UploadError(f"Fayl hajmi 0 dan katta va {settings.MAX_UPLOAD_SIZE} baytdan oshmasligi kerak")
+    if len(sha256) != 64:
+        raise UploadError("sha256 noto'g'ri")
+    sha256 = sha256.lower()
+
+    instance, field = get_target(target, object_id)
+
+    existing = ChunkedUpload.objects.filter(
+        user=user, target=target, object_id=object_id, filename=filename,
+        size=size, sha256=sha256, status='uploading',
+    ).first()
+    if existing and os.path.exists(file_path(existing)):
+        # Yozilgan qism haqiqiy fayl hajmidan katta bo'lishi mumkin emas
+        on_disk = os.path.getsize(file_path(existing))
+        if on_disk < existing.received:
+            existing.received = on_disk
+            existing.save(update_fields=['received', 'updated_at'])
+        return existing
+
+    storage = field.storage
+    name = storage.get_available_name(field.generate_filename(instance, filename))
+    path = storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Nomni band qilish (bo'laklar shu faylga yoziladi)
+    open(path, 'wb').close()
+
+    return ChunkedUpload.objects.create(
+        user=user, target=target, object_id=object_id, filename=filename,
+        file_name=name, size=size, sha256=sha256,
+    )
+
+
+def write_chunk(upload, offset, stream, length):
+    """Bo'lakni `offset` dan boshlab yozish. Yangi offset qaytariladi.
+
+    Yozish yuklash qatori qulflangan holda bajariladi: bir xil offsetdagi parallel
+    qayta urinish faylga tegmasdan 409 oladi.
+    """
+    if length <= 0 or length > settings.UPLOAD_CHUNK_MAX_SIZE:
+        raise UploadError(f"Bo'lak hajmi 1..{settings.UPLOAD_CHUNK_MAX_SIZE} bayt bo'lishi kerak")
+
+    with transaction.atomic():
+        locked = ChunkedUpload.objects.select_for_update().get(pk=upload.pk)
+        if locked.status != 'uploading':
+            raise UploadError("Yuklash yakunlangan", status=409)
+        if offset != locked.received:
+            raise UploadError(f"Offset mos emas, kutilgan: {locked.received}", status=409)
+        if offset + length > locked.size:
+            raise UploadError("Bo'lak fayl hajmidan oshib ketadi")
+
+        written = 0
+        with open(file_path(locked), 'r+b') as f:
+            f.seek(offset)
+            while written < length:
+                block = stream.read(min(READ_BLOCK_SIZE, length - written))
+                if not block:
+                    break
+                f.write(block)
+                written += len(block)
+            f.truncate()
+
+        locked.received = offset + written
+        locked.save(update_fields=['received', 'updated_at'])
+
+    upload.received = locked.received
+    return upload.received
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(READ_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def complete_upload(upload):
+    """To'liq yuklangan faylni tekshirish navbatiga qo'yish (2GB gacha faylning sha256 i
+    so'rov ichida hisoblanmaydi). Takroriy chaqiruv joriy holatni qaytaradi."""
+    if upload.status in ('verifying', 'complete'):
+        return upload
+    if upload.status != 'uploading':
+        raise UploadError("Yuklash yakunlangan", status=409)
+    if upload.received != upload.size:
+        raise UploadError(f"Fayl to'liq yuklanmagan: {upload.received}/{upload.size}", status=409)
+
+    # Parallel complete so'rovlaridan faqat bittasi navbatga qo'yadi
+    claimed = ChunkedUpload.objects.filter(pk=upload.pk, status='uploading', received=upload.size).update(
+        status='verifying')
+    if claimed:
+        upload.status = 'verifying'
+        enqueue('upload_verify', upload)
+    else:
+        upload.refresh_from_db()
+    return upload
+
+
+def fail_upload(upload, message):
+    upload.status = 'failed'
+    upload.error_message = message
+    upload.save(update_fields=['status', 'error_message', 'updated_at'])
+
+
+def run_upload_verify(upload):
+    """'upload_verify' navbati handleri: checksumni tekshirib, faylni darsga biriktirish"""
+    queue = get_queue('upload_verify')
+    path = file_path(upload)
+    try:
+        if file_sha256(path) != upload.sha256:
+            os.remove(path)
+            fail_upload(upload, "sha256 mos kelmadi, faylni qaytadan yuklang")
+            queue.set_status(upload, FAILED, error=upload.error_message)
+            return
+
+        instance, field = get_target(upload.target, upload.object_id)
+        setattr(instance, field.attname, upload.file_name)
+        instance.save(update_fields=[field.name])
+    except Exception as e:
+        # Yuklash 'verifying' holatida qotib qolmasligi uchun; navbat holatini JobQueue.run yozadi
+        fail_upload(upload, str(e))
+        raise
+
+    upload.status = 'complete'
+    upload.save(update_fields=['status', 'updated_at'])
+    queue.set_status(upload, DONE, error='')
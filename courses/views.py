@@ -2,11 +2,24 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm
-from django.http import JsonResponse
+from django.http import JsonResponse, FileResponse, Http404, HttpResponse, HttpResponseNotModified, \
+    StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db.models import Prefetch
 import json
-from .models import Course, Module, Lesson, Question, Answer, UserProgress, UserQuestion, ListeningLesson, \
-                    SpeakingLesson, SpeakingAttempt, SpeakingQuestion
+from .models import Course, Module, Lesson, Question, Answer, UserQuestion, ListeningLesson, GapOption, \
+                    SpeakingLesson, SpeakingAttempt, SpeakingQuestion, ChunkedUpload
+from .ai_client import gigachat_client
+from .answer_keys import compile_lesson_answer_key, compile_reading_answer_key, get_listening_answer_key
+from .grading import grade
+from .jobs import enqueue, get_queue
+from .timing import StageTimer
+from .outline import course_totals, get_course_outline, get_module_outline
+from . import audio_ingest, media, metrics, stt, submissions, tts_cache, uploads
+from .progress import get_module_progress, get_module_summaries, get_progress, apply_progress, record_progress, \
+    record_reading_progresses, record_writing_attempt
 from django.utils import timezone
 import requests
 import tempfile
@@ -17,12 +30,20 @@ import re
 import pyttsx3
 import threading
 import base64
+import logging
 
 
 import subprocess
 import os
+import mimetypes
+from urllib.parse import quote
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+from django.utils.crypto import constant_time_compare
 from gigachat import GigaChat
 
+logger = logging.getLogger(__name__)
+
 # Bosh sahifa
 def home(request):
     courses = Course.objects.filter(is_active=True)
@@ -49,99 +70,29 @@ def register(request):
 @login_required
 def course_detail(request, course_id):
     course = get_object_or_404(Course, id=course_id, is_active=True)
-    modules = course.modules.all().order_by('order')
 
-    # Jami darslar soni
-    total_video_lessons = 0
-    total_listening_lessons = 0
+    # Modullar va ulardagi darslar soni (annotatsiyali bitta so'rov, keshlanadi)
+    modules = get_course_outline(course)
+    totals = course_totals(modules)
 
+    # Modullar bo'yicha yakunlash foizi (yig'ma jadvaldan bitta so'rov)
+    summaries = get_module_summaries(request.user, [module.id for module in modules])
     for module in modules:
-        total_video_lessons += module.lessons.count()
-        total_listening_lessons += module.listening_lessons.count()
+        module.progress_summary = summaries.get(module.id)
 
     return render(request, 'course_detail.html', {
         'course': course,
         'modules': modules,
-        'total_video_lessons': total_video_lessons,
-        'total_listening_lessons': total_listening_lessons
-    })
-
-# Modul detallari (SIMPLIFIED VERSION)
-# Modul detallari - Barcha darslarni order bo'yicha tartiblash
-@login_required
-def module_detail(request, module_id):
-    module = get_object_or_404(Module, id=module_id)
-
-    # Barcha dars turlarini olish
-    video_lessons = module.lessons.all()
-    listening_lessons = module.listening_lessons.all()
-
-    # SPEAKING DARSLARNI QO'SHGANINGIZGA ISHONCH HOSIL QILING
-    speaking_lessons = module.speaking_lessons.all()  # ← BU QATOR MAVJUD BO'LISHI KERAK
-
-    # Barcha darslarni birlashtirish
-    all_lessons = []
-
-    # Video darslar
-    for lesson in video_lessons:
-        progress = UserProgress.objects.filter(user=request.user, lesson=lesson).first()
-        all_lessons.append({
-            'id': lesson.id,
-            'title': lesson.title,
-            'duration': lesson.duration,
-            'order': lesson.order,
-            'completed': progress.completed if progress else False,
-            'score': progress.score if progress else 0,
-            'type': 'video',
-            'object': lesson
-        })
-
-    # Listening darslar
-    for listening in listening_lessons:
-        progress = UserProgress.objects.filter(user=request.user, listening_lesson=listening).first()
-        all_lessons.append({
-            'id': listening.id,
-            'title': listening.title,
-            'duration': f"{listening.timer_minutes} min" if listening.timer_minutes > 0 else "Vaqtsiz",
-            'order': listening.order,
-            'completed': progress.completed if progress else False,
-            'score': progress.score if progress else 0,
-            'type': 'listening',
-            'listening_type': listening.get_listening_type_display(),
-            'object': listening
-        })
-
-    # SPEAKING DARSLARNI QO'SHISH - BU BO'LIMNI TEKSHIRING
-    for speaking in speaking_lessons:  # ← speaking_lessons O'ZGARUVCHISI MAVJUD BO'LISHI KERAK
-        progress = UserProgress.objects.filter(user=request.user, speaking_lesson=speaking).first()
-        all_lessons.append({
-            'id': speaking.id,
-            'title': speaking.title,
-            'duration': f"{speaking.target_duration} soniya",  # ← speaking.target_duration BO'LISHI KERAK
-            'order': speaking.order,
-            'completed': progress.completed if progress else False,
-            'score': progress.score if progress else 0,
-            'type': 'speaking',  # ← TURI 'speaking' BO'LISHI KERAK
-            'speaking_type': speaking.get_speaking_type_display(),
-            # ← speaking_type QO'SHILGANLIGIGA ISHONCH HOSIL QILING
-            'object': speaking
-        })
-
-    # Order bo'yicha tartiblash
-    all_lessons.sort(key=lambda x: x['order'])
-
-    # Har bir darsga ketma-ket raqam berish
-    for index, lesson in enumerate(all_lessons, 1):
-        lesson['display_order'] = index
-
-    return render(request, 'module_detail.html', {
-        'module': module,
-        'lessons': all_lessons
+        'total_video_lessons': totals['video'],
+        'total_listening_lessons': totals['listening'],
+        'total_speaking_lessons': totals['speaking'],
+        'total_reading_lessons': totals['reading'],
+        'total_writing_lessons': totals['writing'],
     })
 
 @login_required
 def lesson_detail(request, lesson_id):
-    lesson = get_object_or_404(Lesson, id=lesson_id)
+    lesson = get_object_or_404(Lesson.objects.select_related('module__course'), id=lesson_id)
     module = lesson.module
     course = module.course
 
@@ -159,11 +110,11 @@ def lesson_detail(request, lesson_id):
     prev_lesson = lessons[current_index - 1] if current_index > 0 else None
     next_lesson = lessons[current_index + 1] if current_index < len(lessons) - 1 else None
 
-    # Test savollari
-    questions = lesson.questions.all()
+    # Test savollari (variantlari bilan - savollar soniga bog'liq bo'lmagan 2 ta so'rov)
+    questions = lesson.questions.prefetch_related('answers')
 
     # Foydalanuvchi progressi
-    user_progress = UserProgress.objects.filter(user=request.user, lesson=lesson).first()
+    user_progress = get_progress(request.user, lesson)
     completed = user_progress.completed if user_progress else False
 
     return render(request, 'lesson_detail.html', {
@@ -185,43 +136,28 @@ def lesson_detail(request, lesson_id):
 def submit_test(request, lesson_id):
     if request.method == 'POST':
         data = json.loads(request.body)
-        lesson = get_object_or_404(Lesson, id=lesson_id)
-
-        # Baholash
-        total_questions = len(data.get('answers', []))
-        correct_answers = 0
+        lesson = get_object_or_404(Lesson.objects.select_related('module'), id=lesson_id)
 
+        # Baholash (yuborilgan javoblar bo'yicha, darsning javoblar kaliti bilan)
+        fields = []
+        submission = {}
         for answer_data in data.get('answers', []):
-            question_id = answer_data.get('question_id')
-            user_answer = answer_data.get('answer')
-
-            question = get_object_or_404(Question, id=question_id)
-            if question.question_type == 'single':
-                correct_answer = question.answers.filter(is_correct=True).first()
-                if correct_answer and str(correct_answer.id) == user_answer:
-                    correct_answers += 1
+            field = f"question_{answer_data.get('question_id')}"
+            fields.append(field)
+            submission[field] = answer_data.get('answer')
 
-        score = (correct_answers / total_questions) * 100 if total_questions > 0 else 0
-        passed = score >= 70
+        result = grade(compile_lesson_answer_key(lesson), submission, fields)
+        passed = result.passed('video')
 
         # Progressni saqlash
-        user_progress, created = UserProgress.objects.get_or_create(
-            user=request.user,
-            lesson=lesson,
-            defaults={'score': score, 'completed': passed}
-        )
-
-        if not created:
-            user_progress.score = score
-            user_progress.completed = passed
-            user_progress.save()
+        record_progress(request.user, lesson, result.score, passed)
 
         return JsonResponse({
             'success': True,
-            'score': score,
+            'score': result.score,
             'passed': passed,
-            'correct_answers': correct_answers,
-            'total_questions': total_questions
+            'correct_answers': result.correct,
+            'total_questions': result.total
         })
 
     return JsonResponse({'success': False, 'error': 'Invalid request method'})
@@ -277,38 +213,15 @@ def extract_youtube_id(url):
 
 @login_required
 def listening_detail(request, listening_id):
-    listening = get_object_or_404(ListeningLesson, id=listening_id)
+    listening = get_object_or_404(ListeningLesson.objects.select_related('module__course'), id=listening_id)
     module = listening.module
     course = module.course
 
-    # Barcha darslarni olish
-    all_lessons = list(module.lessons.all().order_by('order'))
-    all_listenings = list(module.listening_lessons.all().order_by('order'))
-
-    # Barcha darslarni birlashtirish va tartiblash
-    all_content = []
-    for l in all_lessons:
-        all_content.append(('video', l))
-    for l in all_listenings:
-        all_content.append(('listening', l))
-
-    all_content.sort(key=lambda x: x[1].order)
-
-    # Joriy darsni topish
-    current_index = None
-    for i, (content_type, content) in enumerate(all_content):
-        if content_type == 'listening' and content.id == listening_id:
-            current_index = i
-            break
-
-    prev_content = all_content[current_index - 1] if current_index and current_index > 0 else None
-    next_content = all_content[current_index + 1] if current_index and current_index < len(all_content) - 1 else None
+    # Oldingi va keyingi darslar (modul tarkibi keshidan)
+    prev_content, next_content = get_module_outline(module).neighbours('listening', listening.id)
 
     # Foydalanuvchi progressi
-    user_progress = UserProgress.objects.filter(
-        user=request.user,
-        listening_lesson=listening
-    ).first()
+    user_progress = get_progress(request.user, listening)
 
     # Listening turiga qarab ma'lumotlarni olish
     context = {
@@ -322,12 +235,11 @@ def listening_detail(request, listening_id):
 
     # Listening turiga qarab qo'shimcha ma'lumotlar
     if listening.listening_type == 'multiple_choice':
-        context['questions'] = listening.questions.all().order_by('order')
+        context['questions'] = listening.questions.all().order_by('order').prefetch_related('options')
     elif listening.listening_type == 'gap_filling':
-        context['gap_fillings'] = listening.gap_fillings.all().order_by('order')
-        # Gap optionlarni alohida olish
-        for gap in context['gap_fillings']:
-            gap.options_list = gap.options.all().order_by('gap_letter')
+        # Gap optionlari bitta so'rovda (gap.options_list)
+        context['gap_fillings'] = listening.gap_fillings.all().order_by('order').prefetch_related(
+            Prefetch('options', queryset=GapOption.objects.order_by('gap_letter'), to_attr='options_list'))
     elif listening.listening_type == 'true_false_not_given':
         context['tfng_questions'] = listening.tfng_questions.all().order_by('order')
     elif listening.listening_type == 'matching':
@@ -349,106 +261,23 @@ def check_listening_answers(request, listening_id):
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
-            listening = get_object_or_404(ListeningLesson, id=listening_id)
-
-            total_questions = 0
-            correct_answers = 0
-            results = {}
-
-            if listening.listening_type == 'multiple_choice':
-                # Multiple choice tekshirish
-                questions = listening.questions.all().order_by('order')
-                total_questions = questions.count()
-
-                for question in questions:
-                    user_answer = data.get(f'question_{question.id}')
-                    correct_option = question.options.filter(is_correct=True).first()
-
-                    if user_answer and correct_option:
-                        # User answer option ID, correct option ID bilan solishtirish
-                        if str(user_answer) == str(correct_option.id):
-                            correct_answers += 1
-                            results[f'question_{question.id}'] = 'correct'
-                        else:
-                            results[f'question_{question.id}'] = 'wrong'
-                    else:
-                        results[f'question_{question.id}'] = 'not_answered'
-
-            elif listening.listening_type == 'gap_filling':
-                # Gap filling tekshirish
-                gap_fillings = listening.gap_fillings.all().order_by('order')
-                for gap in gap_fillings:
-                    gap_options = gap.options.all()
-                    total_questions += gap_options.count()
-
-                    for gap_opt in gap_options:
-                        user_answer = data.get(f'gap_{gap.id}_{gap_opt.gap_letter}')
-                        if user_answer and user_answer.strip().lower() == gap_opt.correct_word.lower():
-                            correct_answers += 1
-                            results[f'gap_{gap.id}_{gap_opt.gap_letter}'] = 'correct'
-                        else:
-                            results[f'gap_{gap.id}_{gap_opt.gap_letter}'] = 'wrong'
-
-            elif listening.listening_type == 'true_false_not_given':
-                # TFNG tekshirish
-                tfng_questions = listening.tfng_questions.all().order_by('order')
-                total_questions = tfng_questions.count()
-
-                for tfng in tfng_questions:
-                    user_answer = data.get(f'tfng_{tfng.id}')
-                    if user_answer and user_answer == tfng.correct_answer:
-                        correct_answers += 1
-                        results[f'tfng_{tfng.id}'] = 'correct'
-                    else:
-                        results[f'tfng_{tfng.id}'] = 'wrong'
-
-            elif listening.listening_type == 'matching':
-                # Matching tekshirish
-                matching_questions = listening.matching_questions.all().order_by('order')
-                for match in matching_questions:
-                    try:
-                        correct_matches = json.loads(match.correct_matches)
-                        total_questions += len(correct_matches)
-
-                        for key, value in correct_matches.items():
-                            user_answer = data.get(f'match_{match.id}_{key}')
-                            if user_answer and str(user_answer) == str(value):
-                                correct_answers += 1
-                                results[f'match_{match.id}_{key}'] = 'correct'
-                            else:
-                                results[f'match_{match.id}_{key}'] = 'wrong'
-                    except:
-                        pass
-
-            # Ballarni hisoblash (agar total_questions 0 bo'lsa, 0 qaytaramiz)
-            if total_questions > 0:
-                score = (correct_answers / total_questions) * 100
-                passed = score >= 50  # 50% minimal
-            else:
-                score = 0
-                passed = False
+            listening = get_object_or_404(ListeningLesson.objects.select_related('module'), id=listening_id)
 
-            # Progressni saqlash
-            user_progress, created = UserProgress.objects.get_or_create(
-                user=request.user,
-                listening_lesson=listening,
-                defaults={'score': score, 'completed': passed, 'completed_at': timezone.now() if passed else None}
-            )
+            # Javoblar kaliti (keshdan) bo'yicha tekshirish
+            answer_key = get_listening_answer_key(listening)
+            result = grade(answer_key, data)
+            passed = result.passed('listening')
 
-            if not created:
-                user_progress.score = score
-                user_progress.completed = passed
-                if passed:
-                    user_progress.completed_at = timezone.now()
-                user_progress.save()
+            # Progressni saqlash
+            record_progress(request.user, listening, result.score, passed)
 
             return JsonResponse({
                 'success': True,
-                'score': score,
+                'score': result.score,
                 'passed': passed,
-                'correct_answers': correct_answers,
-                'total_questions': total_questions,
-                'results': results
+                'correct_answers': result.correct,
+                'total_questions': result.total,
+                'results': result.results
             })
 
         except Exception as e:
@@ -472,19 +301,9 @@ def save_listening_progress(request):
         listening_id = data.get('listening_id')
         score = data.get('score', 0)
 
-        listening = get_object_or_404(ListeningLesson, id=listening_id)
+        listening = get_object_or_404(ListeningLesson.objects.select_related('module'), id=listening_id)
 
-        user_progress, created = UserProgress.objects.get_or_create(
-            user=request.user,
-            listening_lesson=listening,
-            defaults={'score': score, 'completed': True}
-        )
-
-        if not created:
-            user_progress.score = score
-            user_progress.completed = True
-            user_progress.completed_at = timezone.now()
-            user_progress.save()
+        record_progress(request.user, listening, score, True)
 
         return JsonResponse({'success': True, 'message': 'Progress saqlandi'})
 
@@ -516,121 +335,28 @@ def submit_listening_test(request, listening_id):
                         data[key] = value[0]
                 print(f"Received form data: {data}")
 
-            listening = get_object_or_404(ListeningLesson, id=listening_id)
+            listening = get_object_or_404(ListeningLesson.objects.select_related('module'), id=listening_id)
             print(f"Listening found: {listening.title}, Type: {listening.listening_type}")
 
-            total_questions = 0
-            correct_answers = 0
-            results = {}
-
-            if listening.listening_type == 'multiple_choice':
-                # Multiple choice tekshirish
-                questions = listening.questions.all().order_by('order')
-                total_questions = questions.count()
-                print(f"Total multiple choice questions: {total_questions}")
-
-                for question in questions:
-                    question_key = f'question_{question.id}'
-                    user_answer = data.get(question_key)
-                    correct_option = question.options.filter(is_correct=True).first()
-
-                    print(
-                        f"Question {question.id}: User answer = {user_answer}, Correct option ID = {correct_option.id if correct_option else None}")
-
-                    if user_answer and correct_option:
-                        if str(user_answer) == str(correct_option.id):
-                            correct_answers += 1
-                            results[question_key] = 'correct'
-                            print(f"Question {question.id}: CORRECT")
-                        else:
-                            results[question_key] = 'wrong'
-                            print(f"Question {question.id}: WRONG")
-                    else:
-                        results[question_key] = 'not_answered'
-                        print(f"Question {question.id}: NOT ANSWERED")
-
-            elif listening.listening_type == 'gap_filling':
-                # Gap filling tekshirish
-                gap_fillings = listening.gap_fillings.all().order_by('order')
-                for gap in gap_fillings:
-                    gap_options = gap.options.all()
-                    total_questions += gap_options.count()
-
-                    for gap_opt in gap_options:
-                        gap_key = f'gap_{gap.id}_{gap_opt.gap_letter}'
-                        user_answer = data.get(gap_key)
-                        if user_answer and user_answer.strip().lower() == gap_opt.correct_word.lower():
-                            correct_answers += 1
-                            results[gap_key] = 'correct'
-                        else:
-                            results[gap_key] = 'wrong'
-
-            elif listening.listening_type == 'true_false_not_given':
-                # TFNG tekshirish
-                tfng_questions = listening.tfng_questions.all().order_by('order')
-                total_questions = tfng_questions.count()
-
-                for tfng in tfng_questions:
-                    tfng_key = f'tfng_{tfng.id}'
-                    user_answer = data.get(tfng_key)
-                    if user_answer and user_answer == tfng.correct_answer:
-                        correct_answers += 1
-                        results[tfng_key] = 'correct'
-                    else:
-                        results[tfng_key] = 'wrong'
-
-            elif listening.listening_type == 'matching':
-                # Matching tekshirish
-                matching_questions = listening.matching_questions.all().order_by('order')
-                for match in matching_questions:
-                    try:
-                        correct_matches = json.loads(match.correct_matches)
-                        total_questions += len(correct_matches)
-
-                        for key, value in correct_matches.items():
-                            match_key = f'match_{match.id}_{key}'
-                            user_answer = data.get(match_key)
-                            if user_answer and str(user_answer) == str(value):
-                                correct_answers += 1
-                                results[match_key] = 'correct'
-                            else:
-                                results[match_key] = 'wrong'
-                    except:
-                        pass
-
-            # Ballarni hisoblash
-            if total_questions > 0:
-                score = (correct_answers / total_questions) * 100
-                passed = score >= 50  # 50% minimal
-            else:
-                score = 0
-                passed = False
+            # Javoblar kaliti (keshdan) bo'yicha tekshirish
+            answer_key = get_listening_answer_key(listening)
+            result = grade(answer_key, data)
+            passed = result.passed('listening')
 
-            print(f"Score: {score}, Passed: {passed}, Correct: {correct_answers}/{total_questions}")
+            print(f"Score: {result.score}, Passed: {passed}, Correct: {result.correct}/{result.total}")
 
             # Progressni saqlash
-            user_progress, created = UserProgress.objects.get_or_create(
-                user=request.user,
-                listening_lesson=listening,
-                defaults={'score': score, 'completed': passed, 'completed_at': timezone.now() if passed else None}
-            )
-
-            if not created:
-                user_progress.score = score
-                user_progress.completed = passed
-                if passed:
-                    user_progress.completed_at = timezone.now()
-                user_progress.save()
+            record_progress(request.user, listening, result.score, passed)
 
-            print(f"Progress saved: User={request.user}, Score={score}, Completed={passed}")
+            print(f"Progress saved: User={request.user}, Score={result.score}, Completed={passed}")
 
             return JsonResponse({
                 'success': True,
-                'score': score,
+                'score': result.score,
                 'passed': passed,
-                'correct_answers': correct_answers,
-                'total_questions': total_questions,
-                'results': results,
+                'correct_answers': result.correct,
+                'total_questions': result.total,
+                'results': result.results,
                 'message': 'Test muvaffaqiyatli topshirildi!'
             })
 
@@ -671,6 +397,7 @@ from django.contrib.auth import login, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm
 from django.http import JsonResponse, HttpResponse
+from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
 from django.conf import settings
@@ -680,7 +407,7 @@ import speech_recognition as sr
 from gtts import gTTS
 from gigachat import GigaChat
 
-from .models import Course, Module, Lesson, Question, Answer, UserProgress, \
+from .models import Course, Module, Lesson, Question, Answer, \
     UserQuestion, ListeningLesson, SpeakingLesson, SpeakingAttempt, \
     SpeakingQuestion
 
@@ -689,95 +416,76 @@ from .models import Course, Module, Lesson, Question, Answer, UserProgress, \
 # YORDAMCHI FUNKSIYALAR (OTHER.PY O'RNIGA)
 # ============================================
 
+
 def speech_to_text(audio_path):
-    """Audio faylni textga o'girish"""
+    """Audio faylni textga o'girish (segmentlarga bo'lib, parallel - courses/stt.py)"""
     language = "en-US"
 
     try:
-        print(f"Converting {audio_path} to text...")
-
-        # Audio faylni o'qish
-        r = sr.Recognizer()
-
-        with sr.AudioFile(audio_path) as source:
-            print("Audio file opened, adjusting for ambient noise...")
-
-            # Atrof-muhit shovqinini kamaytirish
-            r.adjust_for_ambient_noise(source, duration=0.5)
-
-            # Audioni yozib olish
-            audio = r.record(source)
+        with metrics.external_call('stt'):
+            result = stt.transcribe(audio_path, language=language)
 
-            print("Recognizing speech...")
-            # Google Speech Recognition orqali matnga o'girish
-            text = r.recognize_google(audio, language=language)
+        if not result['text']:
+            logger.info("STT returned no text", extra={'audio_path': audio_path, 'segments': len(result['segments'])})
+            return "Could not understand audio. Please speak more clearly."
 
-            print(f"Success! Transcript: {text[:100]}...")
-            return text
+        logger.info("STT finished", extra={'audio_path': audio_path, 'segments': len(result['segments']),
+                                           'audio_seconds': result['seconds'], 'chars': len(result['text'])})
+        return result['text']
 
-    except sr.UnknownValueError:
-        print("Google Speech Recognition could not understand audio")
-        return "Could not understand audio. Please speak more clearly."
+    except stt.TranscriptionFailed:
+        # Qisqargan transcript baholanmaydi - urinish 'failed' holatiga o'tadi
+        raise
 
     except sr.RequestError as e:
-        print(f"Could not request results from Google Speech Recognition service; {e}")
+        logger.warning("STT service error: %s", e, extra={'audio_path': audio_path})
         return f"Speech recognition service error: {e}"
 
     except Exception as e:
-        print(f"Speech-to-text error: {e}")
-        # Fallback: Oddiy o'qish
-        try:
-            r = sr.Recognizer()
-            with sr.AudioFile(audio_path) as source:
-                audio = r.record(source)
-                text = r.recognize_google(audio, language='en-US')
-                return text
-        except:
-            return "Speech recognition failed. Please try again."
+        logger.exception("Speech-to-text error", extra={'audio_path': audio_path})
+        return "Speech recognition failed. Please try again."
+
 
+def text_to_speech(text, lang='en'):
+    """Textni audio faylga o'girish (natija tts_cache orqali qayta ishlatiladi).
 
-def text_to_speech(text, lang='en', save_path=None):
-    """Textni audio faylga o'girish"""
+    TTSCacheEntry qaytaradi, muvaffaqiyatsiz bo'lsa None.
+    """
 
     if not text:
-        print("No text provided for TTS")
+        logger.info("TTS skipped: no text")
         return None
 
-    try:
-        print(f"Converting text to speech: {text[:100]}...")
-
-        # Agar save_path berilmagan bo'lsa, default papka
-        if not save_path:
-            save_path = os.path.join(settings.MEDIA_ROOT, 'speaking_feedback')
+    # Matnni qisqartirish (TTS chegarasi uchun)
+    if len(text) > 1000:
+        logger.info("TTS text truncated", extra={'chars': len(text)})
+        text = text[:1000] + "..."
 
-        # Agar papka mavjud bo'lmasa, yaratish
-        if not os.path.exists(save_path):
-            os.makedirs(save_path)
+    cached = tts_cache.lookup(text, lang)
+    metrics.record_cache_lookup('tts', cached)
+    if cached:
+        logger.info("TTS cache hit", extra={'tts_file': cached.audio_file.name})
+        return cached
 
-        # Audio fayl nomini yaratish (unique name)
-        filename = f"feedback_{uuid.uuid4().hex[:8]}.mp3"
-        filepath = os.path.join(save_path, filename)
+    filepath = tts_cache.temp_path()
 
-        # Matnni qisqartirish (TTS chegarasi uchun)
-        if len(text) > 1000:
-            print(f"Text too long ({len(text)} chars), truncating...")
-            text = text[:1000] + "..."
-
-        # TTS obyektini yaratish
-        tts = gTTS(text=text, lang=lang, slow=False)
+    try:
+        with metrics.external_call('gtts'):
+            # TTS obyektini yaratish
+            tts = gTTS(text=text, lang=lang, slow=False)
 
-        # Audio faylni saqlash
-        tts.save(filepath)
+            # Audio faylni saqlash
+            tts.save(filepath)
 
-        print(f"TTS audio saved: {filepath}")
-        return filepath
+        entry = tts_cache.store(text, lang, 'gtts', filepath)
+        logger.info("TTS audio saved", extra={'tts_file': entry.audio_file.name, 'engine': 'gtts'})
+        return entry
 
     except Exception as e:
-        print(f"Text-to-speech error: {e}")
+        logger.warning("gTTS error, trying pyttsx3: %s", e)
 
         # Alternative: Use pyttsx3 as fallback
         try:
-            print("Trying pyttsx3 as fallback...")
             import pyttsx3
 
             engine = pyttsx3.init()
@@ -792,17 +500,18 @@ def text_to_speech(text, lang='en', save_path=None):
                     break
 
             # Audio faylni saqlash
-            filename = f"feedback_{uuid.uuid4().hex[:8]}.mp3"
-            filepath = os.path.join(save_path, filename)
+            with metrics.external_call('pyttsx3'):
+                engine.save_to_file(text, filepath)
+                engine.runAndWait()
 
-            engine.save_to_file(text, filepath)
-            engine.runAndWait()
-
-            print(f"Fallback TTS audio saved: {filepath}")
-            return filepath
+            entry = tts_cache.store(text, lang, 'pyttsx3', filepath)
+            logger.info("TTS audio saved", extra={'tts_file': entry.audio_file.name, 'engine': 'pyttsx3'})
+            return entry
 
         except Exception as e2:
-            print(f"Fallback TTS also failed: {e2}")
+            logger.exception("Fallback TTS also failed")
+            if os.path.exists(filepath):
+                os.remove(filepath)
             return None
 
 
@@ -810,12 +519,10 @@ def analyze_speech_with_ai(text, speaking_lesson):
     """GigaChat AI yordamida nutqni tahlil qilish"""
 
     if not text or len(text.strip()) < 5:
-        print("Text too short for analysis")
+        logger.info("Speech analysis skipped: text too short, using demo analysis")
         return generate_demo_analysis(text, speaking_lesson)
 
     try:
-        print(f"Analyzing text with GigaChat: {text[:100]}...")
-
         # Promptni yaratish
         prompt = f"""
         You are an expert English speaking assessment AI. Analyze this speaking attempt:
@@ -852,25 +559,17 @@ def analyze_speech_with_ai(text, speaking_lesson):
         }}
         """
 
-        print("Sending prompt to GigaChat...")
-
         # GigaChat dan foydalanish
-        with GigaChat(
-                credentials="MDE5YWFjYWMtNTdmYi03NTMwLTg4MTctMTQwN2IwNTNlM2FmOjAwNmQ3ZGYwLTM4N2EtNGI2ZS05ODQxLWZhZjAyOTJjZTAyMw==",
-                verify_ssl_certs=False,
-                model="GigaChat"
-        ) as giga:
+        with gigachat_client.session() as giga:
             response = giga.chat(prompt)
             analysis_text = response.choices[0].message.content
 
-            print(f"GigaChat response: {analysis_text[:200]}...")
+            logger.debug("GigaChat response: %s", analysis_text[:200])
 
             # JSON ni extract qilish
             analysis = extract_json_from_text(analysis_text)
 
             if analysis:
-                print("JSON successfully extracted")
-
                 # Word count va duration hisoblash
                 word_count = len(text.split())
                 duration = int((word_count / 150) * 60) if word_count > 0 else 0
@@ -932,13 +631,11 @@ def analyze_speech_with_ai(text, speaking_lesson):
                 return analysis
 
             else:
-                print("Could not extract JSON, using demo analysis")
+                logger.warning("Could not extract JSON from GigaChat response, using demo analysis")
                 return generate_demo_analysis(text, speaking_lesson)
 
     except Exception as e:
-        print(f"GigaChat analysis error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("GigaChat speech analysis error")
         return generate_demo_analysis(text, speaking_lesson)
 
 
@@ -951,8 +648,6 @@ def extract_json_from_text(text):
 
         if json_match:
             json_str = json_match.group()
-            print(f"Found JSON string: {json_str[:200]}...")
-
             # JSON string sifatida parse qilish
             return json.loads(json_str)
 
@@ -962,18 +657,16 @@ def extract_json_from_text(text):
 
         if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
             json_str = text[start_idx:end_idx + 1]
-            print(f"Extracted JSON (alt): {json_str[:200]}...")
             return json.loads(json_str)
 
         return None
 
     except json.JSONDecodeError as e:
-        print(f"JSON decode error: {e}")
-        print(f"Problematic text: {text[:500]}")
+        logger.warning("JSON decode error: %s", e, extra={'text': text[:500]})
         return None
 
     except Exception as e:
-        print(f"JSON extract error: {e}")
+        logger.exception("JSON extract error")
         return None
 
 
@@ -1018,35 +711,13 @@ def generate_demo_analysis(text, speaking_lesson):
 @login_required
 def speaking_detail(request, speaking_id):
     """Speaking darsini ko'rsatish"""
-    speaking = get_object_or_404(SpeakingLesson, id=speaking_id, is_active=True)
+    speaking = get_object_or_404(SpeakingLesson.objects.select_related('module__course'), id=speaking_id,
+                                 is_active=True)
     module = speaking.module
     course = module.course
 
-    # Barcha darslarni olish
-    all_lessons = list(module.lessons.all().order_by('order'))
-    all_listenings = list(module.listening_lessons.all().order_by('order'))
-    all_speakings = list(module.speaking_lessons.all().order_by('order'))
-
-    # Barcha darslarni birlashtirish
-    all_content = []
-    for l in all_lessons:
-        all_content.append(('video', l))
-    for l in all_listenings:
-        all_content.append(('listening', l))
-    for l in all_speakings:
-        all_content.append(('speaking', l))
-
-    all_content.sort(key=lambda x: x[1].order)
-
-    # Oldingi va keyingi darslarni topish
-    current_index = None
-    for i, (content_type, content) in enumerate(all_content):
-        if content_type == 'speaking' and content.id == speaking_id:
-            current_index = i
-            break
-
-    prev_content = all_content[current_index - 1] if current_index and current_index > 0 else None
-    next_content = all_content[current_index + 1] if current_index and current_index < len(all_content) - 1 else None
+    # Oldingi va keyingi darslar (modul tarkibi keshidan)
+    prev_content, next_content = get_module_outline(module).neighbours('speaking', speaking.id)
 
     # Foydalanuvchi urinishlari
     attempts = SpeakingAttempt.objects.filter(
@@ -1068,24 +739,14 @@ def speaking_detail(request, speaking_id):
 @csrf_exempt
 @login_required
 def process_speaking(request):
-    """Speaking audio ni qayta ishlash - TO'LIQ ISHLAYDI"""
+    """Speaking audio ni qabul qilish va tahlil navbatiga qo'yish"""
     if request.method == 'POST':
         try:
-            print("=" * 50)
-            print("PROCESS_SPEAKING STARTED")
-            print("=" * 50)
-
             # 1. Ma'lumotlarni olish
             speaking_id = request.POST.get('speaking_id')
             audio_file = request.FILES.get('audio')
 
-            print(f"Speaking ID: {speaking_id}")
-            print(f"Audio file: {audio_file}")
-            print(f"File size: {audio_file.size if audio_file else 0} bytes")
-            print(f"User: {request.user.username}")
-
             if not speaking_id or not audio_file:
-                print("ERROR: Missing speaking_id or audio_file")
                 return JsonResponse({
                     'success': False,
                     'error': 'Audio fayl yoki speaking ID yo\'q'
@@ -1093,136 +754,40 @@ def process_speaking(request):
 
             # 2. Speaking darsini topish
             speaking = get_object_or_404(SpeakingLesson, id=speaking_id)
-            print(f"Speaking lesson: {speaking.title}")
 
-            # 3. Audio ni vaqtinchalik saqlash
-            temp_file = None
-            try:
-                # Create temp file
-                with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp:
-                    for chunk in audio_file.chunks():
-                        tmp.write(chunk)
-                    temp_path = tmp.name
-
-                print(f"Audio saved to temp file: {temp_path}")
-                print(f"Temp file size: {os.path.getsize(temp_path)} bytes")
-
-                # 4. Speech-to-Text (STT)
-                print("Starting speech-to-text conversion...")
-                transcript = speech_to_text(temp_path)
-                print(f"Transcript received: {transcript[:100]}...")
-
-                # 5. AI Analysis
-                print("Starting AI analysis...")
-                analysis_result = analyze_speech_with_ai(transcript, speaking)
-                print(f"Analysis complete. Overall score: {analysis_result.get('overall_score', 0)}")
-
-                # 6. AI Feedback uchun TTS audio yaratish
-                tts_audio_url = None
-                feedback_text = analysis_result.get('feedback', 'Good job! Keep practicing.')
-
-                print("Generating TTS audio...")
-                tts_file_path = text_to_speech(
-                    text=feedback_text,
-                    lang='en',
-                    save_path=os.path.join(settings.MEDIA_ROOT, 'speaking_feedback')
-                )
+            # Fayl kengaytmasi haqiqiy konteynerga mos bo'lsin (MediaRecorder odatda webm yuboradi)
+            container = audio_ingest.sniff_container(audio_file.read(16))
+            audio_file.seek(0)
+            if container:
+                audio_file.name = f"recording.{audio_ingest.CONTAINER_EXTENSIONS[container]}"
 
-                if tts_file_path and os.path.exists(tts_file_path):
-                    # Relative URL ni olish
-                    relative_path = tts_file_path.replace(settings.MEDIA_ROOT, '')
-                    if relative_path.startswith('/'):
-                        relative_path = relative_path[1:]
-                    tts_audio_url = f"/media/{relative_path}"
-                    print(f"TTS audio URL: {tts_audio_url}")
-                else:
-                    print("WARNING: TTS audio generation failed")
-
-                # 7. Original audio faylni saqlash uchun tayyorlash
-                audio_file.seek(0)  # Faylni boshiga qaytarish
-                audio_content = ContentFile(audio_file.read())
-
-                # 8. SpeakingAttempt ni yaratish
-                print("Creating SpeakingAttempt record...")
+            # 3. Audio ni saqlab, navbatga qo'yish (STT -> tahlil -> TTS workerda bajariladi)
+            timer = StageTimer('speaking')
+            with timer.span('upload'):
                 attempt = SpeakingAttempt.objects.create(
                     user=request.user,
                     speaking_lesson=speaking,
-                    audio_file=audio_content,
-                    transcript=transcript,
-                    fluency_score=analysis_result.get('fluency_score', 0),
-                    vocabulary_score=analysis_result.get('vocabulary_score', 0),
-                    grammar_score=analysis_result.get('grammar_score', 0),
-                    pronunciation_score=analysis_result.get('pronunciation_score', 0),
-                    overall_score=analysis_result.get('overall_score', 0),
-                    ai_feedback=feedback_text,
-                    suggestions="\n".join(analysis_result.get('suggestions', [])),
-                    duration=analysis_result.get('duration', 0),
-                    word_count=analysis_result.get('word_count', 0)
+                    audio_file=audio_file,
+                    status='pending'
                 )
+            timer.save(attempt)
+            enqueue('speaking', attempt)
 
-                print(f"Attempt created with ID: {attempt.id}")
+            logger.info("Speaking attempt queued", extra={'attempt_id': attempt.id, 'user_id': request.user.id,
+                                                          'audio_bytes': audio_file.size})
 
-                # 9. Progress ni saqlash
-                user_progress, created = UserProgress.objects.get_or_create(
-                    user=request.user,
-                    speaking_lesson=speaking,
-                    defaults={
-                        'score': analysis_result.get('overall_score', 0),
-                        'completed': analysis_result.get('overall_score', 0) >= 50,
-                        'completed_at': timezone.now() if analysis_result.get('overall_score', 0) >= 50 else None
-                    }
-                )
-
-                if not created:
-                    user_progress.score = analysis_result.get('overall_score', 0)
-                    user_progress.completed = analysis_result.get('overall_score', 0) >= 50
-                    if user_progress.completed and not user_progress.completed_at:
-                        user_progress.completed_at = timezone.now()
-                    user_progress.save()
-
-                print(f"Progress saved: {user_progress.score} points")
-
-                # 10. Natijalarni tayyorlash
-                result_data = {
-                    'success': True,
-                    'attempt_id': attempt.id,
-                    'transcript': transcript,
-                    'feedback': feedback_text,
-                    'suggestions': analysis_result.get('suggestions', []),
-                    'tts_audio_url': tts_audio_url,
-                    'scores': {
-                        'overall': analysis_result.get('overall_score', 0),
-                        'fluency': analysis_result.get('fluency_score', 0),
-                        'vocabulary': analysis_result.get('vocabulary_score', 0),
-                        'grammar': analysis_result.get('grammar_score', 0),
-                        'pronunciation': analysis_result.get('pronunciation_score', 0),
-                    },
-                    'stats': {
-                        'word_count': analysis_result.get('word_count', 0),
-                        'duration': analysis_result.get('duration', 0)
-                    }
-                }
-
-                print("=" * 50)
-                print("PROCESS_SPEAKING COMPLETED SUCCESSFULLY")
-                print("=" * 50)
-
-                return JsonResponse(result_data)
-
-            finally:
-                # 11. Vaqtincha faylni o'chirish
-                if temp_file and os.path.exists(temp_file):
-                    try:
-                        os.unlink(temp_file)
-                        print("Temp file cleaned up")
-                    except:
-                        pass
+            return JsonResponse({
+                'success': True,
+                'job_id': attempt.id,
+                'attempt_id': attempt.id,
+                'status': attempt.status,
+                'status_url': reverse('speaking_job_status', args=[attempt.id])
+            }, status=202)
 
         except Exception as e:
-            print(f"ERROR in process_speaking: {str(e)}")
+            logger.exception("process_speaking error", extra={'user_id': request.user.id})
             import traceback
             error_trace = traceback.format_exc()
-            print(f"Traceback:\n{error_trace}")
 
             return JsonResponse({
                 'success': False,
@@ -1230,27 +795,137 @@ def process_speaking(request):
                 'traceback': error_trace
             })
 
-    print("Invalid request method")
     return JsonResponse({'success': False, 'error': 'Invalid request method'})
 
 
+def run_speaking_attempt(attempt):
+    """Speaking urinishini qayta ishlash (worker): STT -> AI tahlil -> TTS.
+
+    Har bir bosqich natijasi darhol saqlanadi, shuning uchun to'xtab qolgan
+    vazifa qayta navbatga qo'yilganda tugagan bosqichlar takrorlanmaydi.
+    """
+    queue = get_queue('speaking')
+    speaking = attempt.speaking_lesson
+    timer = StageTimer('speaking', attempt)
+    try:
+        run_speaking_stages(queue, attempt, speaking, timer)
+    finally:
+        timer.save()
+
+
+def run_speaking_stages(queue, attempt, speaking, timer):
+    """run_speaking_attempt bosqichlari (har biri timer span'i ichida)"""
+    # 1. Speech-to-Text (STT)
+    if not attempt.transcript:
+        queue.set_status(attempt, 'stt')
+        with timer.span('stt'):
+            attempt.transcript = speech_to_text(attempt.audio_file.path)
+        with timer.span('persist'):
+            attempt.save(update_fields=['transcript', 'updated_at'])
+
+    # 2. AI Analysis
+    if not attempt.ai_feedback:
+        queue.set_status(attempt, 'analysis')
+        with timer.span('analysis'):
+            analysis_result = analyze_speech_with_ai(attempt.transcript, speaking)
+
+        attempt.fluency_score = analysis_result.get('fluency_score', 0)
+        attempt.vocabulary_score = analysis_result.get('vocabulary_score', 0)
+        attempt.grammar_score = analysis_result.get('grammar_score', 0)
+        attempt.pronunciation_score = analysis_result.get('pronunciation_score', 0)
+        attempt.overall_score = analysis_result.get('overall_score', 0)
+        attempt.ai_feedback = analysis_result.get('feedback', 'Good job! Keep practicing.')
+        attempt.suggestions = "\n".join(analysis_result.get('suggestions', []))
+        attempt.duration = analysis_result.get('duration', 0)
+        attempt.word_count = analysis_result.get('word_count', 0)
+        with timer.span('persist'):
+            attempt.save()
+
+            # Progress ni saqlash
+            record_progress(attempt.user, speaking, attempt.overall_score, attempt.overall_score >= 50)
+
+    # 3. AI Feedback uchun TTS audio yaratish
+    queue.set_status(attempt, 'tts')
+    with timer.span('tts'):
+        tts_entry = text_to_speech(text=attempt.ai_feedback, lang='en')
+
+    if tts_entry:
+        attempt.feedback_tts = tts_entry
+        attempt.feedback_audio.name = tts_entry.audio_file.name
+        with timer.span('persist'):
+            attempt.save(update_fields=['feedback_tts', 'feedback_audio', 'updated_at'])
+    else:
+        logger.warning("TTS audio generation failed", extra={'attempt_id': attempt.id})
+
+    queue.set_status(attempt, 'done')
+
+
+def speaking_job_stages(attempt):
+    """Har bir bosqich holati: done / running / pending / failed"""
+    if attempt.status == 'done':
+        return {stage: 'done' for stage in SpeakingAttempt.STAGES}
+
+    finished = {'stt': bool(attempt.transcript), 'analysis': bool(attempt.ai_feedback), 'tts': False}
+    stages = {}
+    for stage in SpeakingAttempt.STAGES:
+        if attempt.status == stage:
+            stages[stage] = 'running'
+        elif finished[stage]:
+            stages[stage] = 'done'
+        elif attempt.status == 'failed' and 'failed' not in stages.values():
+            stages[stage] = 'failed'
+        else:
+            stages[stage] = 'pending'
+    return stages
+
+
+@login_required
+def speaking_job_status(request, attempt_id):
+    """Speaking tahlili holatini qaytarish (polling uchun)"""
+    attempt = get_object_or_404(SpeakingAttempt, id=attempt_id, user=request.user)
+
+    result_data = {
+        'success': True,
+        'job_id': attempt.id,
+        'attempt_id': attempt.id,
+        'status': attempt.status,
+        'status_display': attempt.get_status_display(),
+        'stages': speaking_job_stages(attempt),
+    }
+
+    if attempt.status == 'failed':
+        result_data['error'] = attempt.error_message
+
+    if attempt.status == 'done':
+        result_data.update({
+            'transcript': attempt.transcript,
+            'feedback': attempt.ai_feedback,
+            'suggestions': attempt.suggestions.split('\n') if attempt.suggestions else [],
+            'tts_audio_url': attempt.feedback_audio.url if attempt.feedback_audio else None,
+            'scores': {
+                'overall': attempt.overall_score,
+                'fluency': attempt.fluency_score,
+                'vocabulary': attempt.vocabulary_score,
+                'grammar': attempt.grammar_score,
+                'pronunciation': attempt.pronunciation_score,
+            },
+            'stats': {
+                'word_count': attempt.word_count,
+                'duration': attempt.duration
+            }
+        })
+
+    return JsonResponse(result_data)
+
+
 @login_required
 def get_speaking_attempt(request, attempt_id):
     """Speaking urinishini olish"""
     try:
         attempt = get_object_or_404(SpeakingAttempt, id=attempt_id, user=request.user)
 
-        # AI feedback audio borligini tekshirish
-        tts_audio_url = None
-        if attempt.ai_feedback:
-            # Feedback audio faylini qidirish
-            feedback_dir = os.path.join(settings.MEDIA_ROOT, 'speaking_feedback')
-            if os.path.exists(feedback_dir):
-                # Attempt ID ga mos audio faylni qidirish
-                for file in os.listdir(feedback_dir):
-                    if file.startswith(f"feedback_") and file.endswith('.mp3'):
-                        tts_audio_url = f"/media/speaking_feedback/{file}"
-                        break
+        # AI feedback audio (urinishning o'z fayli)
+        tts_audio_url = attempt.feedback_audio.url if attempt.feedback_audio else None
 
         return JsonResponse({
             'success': True,
@@ -1268,12 +943,13 @@ def get_speaking_attempt(request, attempt_id):
                 'word_count': attempt.word_count,
                 'created_at': attempt.created_at.strftime('%Y-%m-%d %H:%M'),
                 'audio_url': attempt.audio_file.url if attempt.audio_file else '',
-                'tts_audio_url': tts_audio_url
+                'tts_audio_url': tts_audio_url,
+                'status': attempt.status
             }
         })
 
     except Exception as e:
-        print(f"Error in get_speaking_attempt: {e}")
+        logger.exception("get_speaking_attempt error", extra={'attempt_id': attempt_id})
         return JsonResponse({'success': False, 'error': str(e)})
 
 
@@ -1287,47 +963,19 @@ from .models import ReadingLesson, ReadingQuestion, ReadingAnswer, UserReadingPr
 @login_required
 def reading_detail(request, reading_id):
     """Reading darsini ko'rsatish"""
-    reading = get_object_or_404(ReadingLesson, id=reading_id, is_active=True)
+    reading = get_object_or_404(ReadingLesson.objects.select_related('module__course'), id=reading_id,
+                                is_active=True)
     module = reading.module
     course = module.course
 
-    # Barcha darslarni olish
-    all_lessons = list(module.lessons.all().order_by('order'))
-    all_listenings = list(module.listening_lessons.all().order_by('order'))
-    all_speakings = list(module.speaking_lessons.all().order_by('order'))
-    all_readings = list(module.reading_lessons.all().order_by('order'))
-
-    # Barcha darslarni birlashtirish
-    all_content = []
-    for l in all_lessons:
-        all_content.append(('video', l))
-    for l in all_listenings:
-        all_content.append(('listening', l))
-    for l in all_speakings:
-        all_content.append(('speaking', l))
-    for l in all_readings:
-        all_content.append(('reading', l))
-
-    all_content.sort(key=lambda x: x[1].order)
-
-    # Oldingi va keyingi darslarni topish
-    current_index = None
-    for i, (content_type, content) in enumerate(all_content):
-        if content_type == 'reading' and content.id == reading_id:
-            current_index = i
-            break
-
-    prev_content = all_content[current_index - 1] if current_index and current_index > 0 else None
-    next_content = all_content[current_index + 1] if current_index and current_index < len(all_content) - 1 else None
-
-    # Savollarni olish
-    questions = reading.questions.all().order_by('order')
+    # Oldingi va keyingi darslar (modul tarkibi keshidan)
+    prev_content, next_content = get_module_outline(module).neighbours('reading', reading.id)
+
+    # Savollarni olish (variantlari bilan)
+    questions = reading.questions.all().order_by('order').prefetch_related('answers')
 
     # Progress - faqat umumiy progressni olish
-    user_progress = UserProgress.objects.filter(
-        user=request.user,
-        reading_lesson=reading
-    ).first()
+    user_progress = get_progress(request.user, reading)
 
     # Reading progress
     reading_progress = UserReadingProgress.objects.filter(
@@ -1354,84 +1002,28 @@ def submit_reading_test(request, reading_id):
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
-            reading = get_object_or_404(ReadingLesson, id=reading_id)
+            reading = get_object_or_404(ReadingLesson.objects.select_related('module'), id=reading_id)
 
-            total_questions = 0
-            correct_answers = 0
-            results = {}
             time_spent = data.get('time_spent', 0)
 
             # Savollarni tekshirish
-            questions = reading.questions.all().order_by('order')
+            result = grade(compile_reading_answer_key(reading), data)
+            passed = result.passed('reading')
 
-            for question in questions:
-                user_answer = data.get(f'question_{question.id}')
-                correct_answer = question.answers.filter(is_correct=True).first()
-
-                if user_answer and correct_answer:
-                    if str(user_answer) == str(correct_answer.id):
-                        correct_answers += 1
-                        results[f'question_{question.id}'] = 'correct'
-                    else:
-                        results[f'question_{question.id}'] = 'wrong'
-                else:
-                    results[f'question_{question.id}'] = 'not_answered'
-
-                total_questions += 1
-
-            # Ballarni hisoblash
-            if total_questions > 0:
-                score = (correct_answers / total_questions) * 100
-                passed = score >= 60  # IELTS standard 60%
-            else:
-                score = 0
-                passed = False
-
-            # Umumiy Progressni saqlash
-            user_progress, created = UserProgress.objects.get_or_create(
-                user=request.user,
-                reading_lesson=reading,
-                defaults={'score': score, 'completed': passed}
-            )
-
-            if not created:
-                user_progress.score = score
-                user_progress.completed = passed
-                if passed:
-                    user_progress.completed_at = timezone.now()
-                user_progress.save()
-
-            # Maxsus Reading progressni saqlash
-            reading_progress, created = UserReadingProgress.objects.get_or_create(
-                user=request.user,
-                reading_lesson=reading,
-                defaults={
-                    'score': score,
-                    'completed': passed,
-                    'time_spent': time_spent,
-                    'correct_answers': correct_answers,
-                    'total_questions': total_questions
-                }
-            )
-
-            if not created:
-                reading_progress.score = score
-                reading_progress.completed = passed
-                reading_progress.time_spent = time_spent
-                reading_progress.correct_answers = correct_answers
-                reading_progress.total_questions = total_questions
-                if passed:
-                    reading_progress.completed_at = timezone.now()
-                reading_progress.save()
+            # Umumiy va maxsus Reading progressni saqlash
+            record_progress(request.user, reading, result.score, passed)
+            record_reading_progresses(request.user, [
+                (reading.id, result.score, passed, time_spent, result.correct, result.total),
+            ])
 
             return JsonResponse({
                 'success': True,
-                'score': score,
+                'score': result.score,
                 'passed': passed,
-                'correct_answers': correct_answers,
-                'total_questions': total_questions,
+                'correct_answers': result.correct,
+                'total_questions': result.total,
                 'time_spent': time_spent,
-                'results': results
+                'results': result.results
             })
 
         except Exception as e:
@@ -1439,90 +1031,6 @@ def submit_reading_test(request, reading_id):
             return JsonResponse({'success': False, 'error': str(e)})
 
     return JsonResponse({'success': False, 'error': 'Invalid request method'})
-# courses/views.py - module_detail funksiyasini to'g'rilash
-
-@login_required
-def module_detail(request, module_id):
-    module = get_object_or_404(Module, id=module_id)
-
-    # Barcha dars turlarini olish
-    video_lessons = module.lessons.all()
-    listening_lessons = module.listening_lessons.all()
-    speaking_lessons = module.speaking_lessons.all()
-    reading_lessons = module.reading_lessons.all()
-
-    all_lessons = []
-
-    # Video darslar
-    for lesson in video_lessons:
-        progress = UserProgress.objects.filter(user=request.user, lesson=lesson).first()
-        all_lessons.append({
-            'id': lesson.id,
-            'title': lesson.title,
-            'duration': lesson.duration,
-            'order': lesson.order,
-            'completed': progress.completed if progress else False,
-            'score': progress.score if progress else 0,
-            'type': 'video',
-            'object': lesson
-        })
-
-    # Listening darslar
-    for listening in listening_lessons:
-        progress = UserProgress.objects.filter(user=request.user, listening_lesson=listening).first()
-        all_lessons.append({
-            'id': listening.id,
-            'title': listening.title,
-            'duration': f"{listening.timer_minutes} min",
-            'order': listening.order,
-            'completed': progress.completed if progress else False,
-            'score': progress.score if progress else 0,
-            'type': 'listening',
-            'listening_type': listening.get_listening_type_display(),
-            'object': listening
-        })
-
-    # Speaking darslar
-    for speaking in speaking_lessons:
-        progress = UserProgress.objects.filter(user=request.user, speaking_lesson=speaking).first()
-        all_lessons.append({
-            'id': speaking.id,
-            'title': speaking.title,
-            'duration': f"{speaking.target_duration} soniya",
-            'order': speaking.order,
-            'completed': progress.completed if progress else False,
-            'score': progress.score if progress else 0,
-            'type': 'speaking',
-            'speaking_type': speaking.get_speaking_type_display(),
-            'object': speaking
-        })
-
-    # READING DARSLARNI QO'SHISH
-    for reading in reading_lessons:
-        progress = UserProgress.objects.filter(user=request.user, reading_lesson=reading).first()
-        all_lessons.append({
-            'id': reading.id,
-            'title': reading.title,
-            'duration': f"{reading.timer_minutes} daqiqa",
-            'order': reading.order,
-            'completed': progress.completed if progress else False,
-            'score': progress.score if progress else 0,
-            'type': 'reading',
-            'reading_type': reading.get_reading_type_display(),
-            'object': reading
-        })
-
-    # Order bo'yicha tartiblash
-    all_lessons.sort(key=lambda x: x['order'])
-
-    # Har bir darsga ketma-ket raqam berish
-    for index, lesson in enumerate(all_lessons, 1):
-        lesson['display_order'] = index
-
-    return render(request, 'module_detail.html', {
-        'module': module,
-        'lessons': all_lessons
-    })
 
 
 # courses/views.py - WRITING VIEW LAR QO'SHISH
@@ -1536,41 +1044,13 @@ from gigachat import GigaChat
 @login_required
 def writing_detail(request, writing_id):
     """Writing darsini ko'rsatish"""
-    writing = get_object_or_404(WritingLesson, id=writing_id, is_active=True)
+    writing = get_object_or_404(WritingLesson.objects.select_related('module__course'), id=writing_id,
+                                is_active=True)
     module = writing.module
     course = module.course
 
-    # Barcha darslarni olish
-    all_lessons = list(module.lessons.all().order_by('order'))
-    all_listenings = list(module.listening_lessons.all().order_by('order'))
-    all_speakings = list(module.speaking_lessons.all().order_by('order'))
-    all_readings = list(module.reading_lessons.all().order_by('order'))
-    all_writings = list(module.writing_lessons.all().order_by('order'))
-
-    # Barcha darslarni birlashtirish
-    all_content = []
-    for l in all_lessons:
-        all_content.append(('video', l))
-    for l in all_listenings:
-        all_content.append(('listening', l))
-    for l in all_speakings:
-        all_content.append(('speaking', l))
-    for l in all_readings:
-        all_content.append(('reading', l))
-    for l in all_writings:
-        all_content.append(('writing', l))
-
-    all_content.sort(key=lambda x: x[1].order)
-
-    # Oldingi va keyingi darslarni topish
-    current_index = None
-    for i, (content_type, content) in enumerate(all_content):
-        if content_type == 'writing' and content.id == writing_id:
-            current_index = i
-            break
-
-    prev_content = all_content[current_index - 1] if current_index and current_index > 0 else None
-    next_content = all_content[current_index + 1] if current_index and current_index < len(all_content) - 1 else None
+    # Oldingi va keyingi darslar (modul tarkibi keshidan)
+    prev_content, next_content = get_module_outline(module).neighbours('writing', writing.id)
 
     # Urinishlar
     attempts = WritingAttempt.objects.filter(
@@ -1579,10 +1059,7 @@ def writing_detail(request, writing_id):
     ).order_by('-created_at')[:5]
 
     # Progress
-    user_progress = UserProgress.objects.filter(
-        user=request.user,
-        writing_lesson=writing
-    ).first()
+    user_progress = get_progress(request.user, writing)
 
     writing_progress = UserWritingProgress.objects.filter(
         user=request.user,
@@ -1608,8 +1085,6 @@ def analyze_writing_with_ai(text, writing_lesson):
         return generate_demo_writing_analysis(text, writing_lesson)
 
     try:
-        print(f"Analyzing writing with GigaChat: {text[:100]}...")
-
         prompt = f"""
         You are an expert IELTS writing examiner. Analyze this writing attempt:
 
@@ -1642,24 +1117,16 @@ def analyze_writing_with_ai(text, writing_lesson):
         }}
         """
 
-        print("Sending to GigaChat...")
-
-        with GigaChat(
-                credentials="MDE5YWFjYWMtNTdmYi03NTMwLTg4MTctMTQwN2IwNTNlM2FmOjAwNmQ3ZGYwLTM4N2EtNGI2ZS05ODQxLWZhZjAyOTJjZTAyMw==",
-                verify_ssl_certs=False,
-                model="GigaChat"
-        ) as giga:
+        with gigachat_client.session() as giga:
             response = giga.chat(prompt)
             analysis_text = response.choices[0].message.content
 
-            print(f"GigaChat response: {analysis_text[:200]}...")
+            logger.debug("GigaChat response: %s", analysis_text[:200])
 
             # JSON ni extract qilish
             analysis = extract_json_from_text(analysis_text)
 
             if analysis:
-                print("Writing analysis JSON extracted")
-
                 # Word count hisoblash
                 word_count = len(text.split())
 
@@ -1702,13 +1169,11 @@ def analyze_writing_with_ai(text, writing_lesson):
                 return analysis
 
             else:
-                print("Could not extract JSON, using demo analysis")
+                logger.warning("Could not extract JSON from GigaChat response, using demo analysis")
                 return generate_demo_writing_analysis(text, writing_lesson)
 
     except Exception as e:
-        print(f"Writing analysis error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("GigaChat writing analysis error")
         return generate_demo_writing_analysis(text, writing_lesson)
 
 
@@ -1751,7 +1216,7 @@ def submit_writing(request, writing_id):
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
-            writing = get_object_or_404(WritingLesson, id=writing_id)
+            writing = get_object_or_404(WritingLesson.objects.select_related('module'), id=writing_id)
 
             answer_text = data.get('answer_text', '').strip()
             time_spent = data.get('time_spent', 0)
@@ -1760,77 +1225,44 @@ def submit_writing(request, writing_id):
             if not answer_text:
                 return JsonResponse({'success': False, 'error': 'Iltimos, javob yozing!'})
 
-            # AI tahlili
-            print("Analyzing writing with AI...")
-            analysis_result = analyze_writing_with_ai(answer_text, writing)
-            print(f"Analysis complete. Overall score: {analysis_result.get('overall_score', 0)}")
-
-            # WritingAttempt ni yaratish
+            # WritingAttempt ni "navbatda" holatida yaratish
             attempt = WritingAttempt.objects.create(
                 user=request.user,
                 writing_lesson=writing,
                 answer_text=answer_text,
                 word_count=word_count,
-                content_score=analysis_result.get('content_score', 0),
-                coherence_score=analysis_result.get('coherence_score', 0),
-                vocabulary_score=analysis_result.get('vocabulary_score', 0),
-                grammar_score=analysis_result.get('grammar_score', 0),
-                overall_score=analysis_result.get('overall_score', 0),
-                ai_feedback=analysis_result.get('feedback', ''),
-                suggestions="\n".join(analysis_result.get('suggestions', [])),
-                time_spent=time_spent
-            )
-
-            # Umumiy Progressni saqlash
-            user_progress, created = UserProgress.objects.get_or_create(
-                user=request.user,
-                writing_lesson=writing,
-                defaults={'score': analysis_result.get('overall_score', 0), 'completed': True}
+                time_spent=time_spent,
+                status='pending'
             )
 
-            if not created:
-                user_progress.score = analysis_result.get('overall_score', 0)
-                user_progress.completed = True
-                if not user_progress.completed_at:
-                    user_progress.completed_at = timezone.now()
-                user_progress.save()
-
-            # Maxsus Writing progressni yangilash
-            writing_progress, created = UserWritingProgress.objects.get_or_create(
-                user=request.user,
-                writing_lesson=writing,
-                defaults={
-                    'score': analysis_result.get('overall_score', 0),
-                    'best_score': analysis_result.get('overall_score', 0),
-                    'completed': True,
-                    'attempts_count': 1,
-                    'time_spent': time_spent
-                }
-            )
+            # Navbat rejimi: AI tahlili fon workerida bajariladi, natija get_writing_attempt orqali olinadi
+            if settings.WRITING_QUEUE_ENABLED:
+                enqueue('writing', attempt)
+                return JsonResponse({
+                    'success': True,
+                    'attempt_id': attempt.id,
+                    'status': attempt.status,
+                    'status_url': reverse('get_writing_attempt', args=[attempt.id])
+                }, status=202)
 
-            if not created:
-                writing_progress.attempts_count += 1
-                writing_progress.time_spent += time_spent
-                if analysis_result.get('overall_score', 0) > writing_progress.best_score:
-                    writing_progress.best_score = analysis_result.get('overall_score', 0)
-                writing_progress.score = analysis_result.get('overall_score', 0)
-                writing_progress.completed = True
-                if not writing_progress.completed_at:
-                    writing_progress.completed_at = timezone.now()
-                writing_progress.save()
+            # Sinxron rejim
+            get_queue('writing').run(attempt)
+            if attempt.status != 'done':
+                return JsonResponse({'success': False, 'error': attempt.error_message})
 
             return JsonResponse({
                 'success': True,
                 'attempt_id': attempt.id,
+                'status': attempt.status,
                 'scores': {
-                    'overall': analysis_result.get('overall_score', 0),
-                    'content': analysis_result.get('content_score', 0),
-                    'coherence': analysis_result.get('coherence_score', 0),
-                    'vocabulary': analysis_result.get('vocabulary_score', 0),
-                    'grammar': analysis_result.get('grammar_score', 0),
+                    'overall': attempt.overall_score,
+                    'content': attempt.content_score,
+                    'coherence': attempt.coherence_score,
+                    'vocabulary': attempt.vocabulary_score,
+                    'grammar': attempt.grammar_score,
                 },
-                'feedback': analysis_result.get('feedback', ''),
-                'suggestions': analysis_result.get('suggestions', []),
+                'feedback': attempt.ai_feedback,
+                'suggestions': attempt.suggestions.split('\n') if attempt.suggestions else [],
                 'stats': {
                     'word_count': word_count,
                     'time_spent': time_spent
@@ -1838,15 +1270,49 @@ def submit_writing(request, writing_id):
             })
 
         except Exception as e:
-            print(f"Writing submission error: {e}")
+            logger.exception("Writing submission error", extra={'user_id': request.user.id})
             return JsonResponse({'success': False, 'error': str(e)})
 
     return JsonResponse({'success': False, 'error': 'Invalid request method'})
 
 
+def run_writing_attempt(attempt):
+    """Writing urinishini AI bilan baholash va progressni yangilash (worker)"""
+    get_queue('writing').set_status(attempt, 'analysis')
+    writing = attempt.writing_lesson
+    timer = StageTimer('writing', attempt)
+    try:
+        run_writing_stages(attempt, writing, timer)
+    finally:
+        timer.save()
+
+
+def run_writing_stages(attempt, writing, timer):
+    """run_writing_attempt bosqichlari (har biri timer span'i ichida)"""
+    # AI tahlili
+    with timer.span('analysis'):
+        analysis_result = analyze_writing_with_ai(attempt.answer_text, writing)
+    logger.info("Writing attempt analysed", extra={'attempt_id': attempt.id,
+                                                   'overall_score': analysis_result.get('overall_score', 0)})
+
+    attempt.content_score = analysis_result.get('content_score', 0)
+    attempt.coherence_score = analysis_result.get('coherence_score', 0)
+    attempt.vocabulary_score = analysis_result.get('vocabulary_score', 0)
+    attempt.grammar_score = analysis_result.get('grammar_score', 0)
+    attempt.overall_score = analysis_result.get('overall_score', 0)
+    attempt.ai_feedback = analysis_result.get('feedback', '')
+    attempt.suggestions = "\n".join(analysis_result.get('suggestions', []))
+    attempt.status = 'done'
+    with timer.span('persist'):
+        attempt.save()
+
+        # Umumiy va maxsus Writing progress (best_score, attempts_count, time_spent - bazada atomik)
+        record_writing_attempt(attempt.user, writing, attempt.overall_score, attempt.time_spent)
+
+
 @login_required
 def get_writing_attempt(request, attempt_id):
-    """Writing urinishini olish"""
+    """Writing urinishini olish (navbatdagi urinish uchun joriy holat)"""
     try:
         attempt = get_object_or_404(WritingAttempt, id=attempt_id, user=request.user)
 
@@ -1854,6 +1320,9 @@ def get_writing_attempt(request, attempt_id):
             'success': True,
             'attempt': {
                 'id': attempt.id,
+                'status': attempt.status,
+                'status_display': attempt.get_status_display(),
+                'error_message': attempt.error_message,
                 'answer_text': attempt.answer_text,
                 'content_score': attempt.content_score,
                 'coherence_score': attempt.coherence_score,
@@ -1869,48 +1338,42 @@ def get_writing_attempt(request, attempt_id):
         })
 
     except Exception as e:
-        print(f"Error in get_writing_attempt: {e}")
+        logger.exception("get_writing_attempt error", extra={'attempt_id': attempt_id})
         return JsonResponse({'success': False, 'error': str(e)})
 
 
 # Module detail funksiyasini yangilash (writing qo'shish)
 @login_required
 def module_detail(request, module_id):
-    module = get_object_or_404(Module, id=module_id)
+    module = get_object_or_404(Module.objects.select_related('course'), id=module_id)
 
     # Barcha dars turlarini olish
     video_lessons = module.lessons.all()
     listening_lessons = module.listening_lessons.all()
     speaking_lessons = module.speaking_lessons.all()
     reading_lessons = module.reading_lessons.all()
-    writing_lessons = module.writing_lessons.all()  # YANGI QATOR
+    writing_lessons = module.writing_lessons.all()
 
     all_lessons = []
 
     # Video darslar
     for lesson in video_lessons:
-        progress = UserProgress.objects.filter(user=request.user, lesson=lesson).first()
         all_lessons.append({
             'id': lesson.id,
             'title': lesson.title,
             'duration': lesson.duration,
             'order': lesson.order,
-            'completed': progress.completed if progress else False,
-            'score': progress.score if progress else 0,
             'type': 'video',
             'object': lesson
         })
 
     # Listening darslar
     for listening in listening_lessons:
-        progress = UserProgress.objects.filter(user=request.user, listening_lesson=listening).first()
         all_lessons.append({
             'id': listening.id,
             'title': listening.title,
             'duration': f"{listening.timer_minutes} min",
             'order': listening.order,
-            'completed': progress.completed if progress else False,
-            'score': progress.score if progress else 0,
             'type': 'listening',
             'listening_type': listening.get_listening_type_display(),
             'object': listening
@@ -1918,14 +1381,11 @@ def module_detail(request, module_id):
 
     # Speaking darslar
     for speaking in speaking_lessons:
-        progress = UserProgress.objects.filter(user=request.user, speaking_lesson=speaking).first()
         all_lessons.append({
             'id': speaking.id,
             'title': speaking.title,
             'duration': f"{speaking.target_duration} soniya",
             'order': speaking.order,
-            'completed': progress.completed if progress else False,
-            'score': progress.score if progress else 0,
             'type': 'speaking',
             'speaking_type': speaking.get_speaking_type_display(),
             'object': speaking
@@ -1933,34 +1393,31 @@ def module_detail(request, module_id):
 
     # Reading darslar
     for reading in reading_lessons:
-        progress = UserProgress.objects.filter(user=request.user, reading_lesson=reading).first()
         all_lessons.append({
             'id': reading.id,
             'title': reading.title,
             'duration': f"{reading.timer_minutes} daqiqa",
             'order': reading.order,
-            'completed': progress.completed if progress else False,
-            'score': progress.score if progress else 0,
             'type': 'reading',
             'reading_type': reading.get_reading_type_display(),
             'object': reading
         })
 
-    # WRITING DARSLARNI QO'SHISH - YANGI QATORLAR
+    # Writing darslar
     for writing in writing_lessons:
-        progress = UserProgress.objects.filter(user=request.user, writing_lesson=writing).first()
         all_lessons.append({
             'id': writing.id,
             'title': writing.title,
             'duration': f"{writing.timer_minutes} daqiqa",
             'order': writing.order,
-            'completed': progress.completed if progress else False,
-            'score': progress.score if progress else 0,
             'type': 'writing',
             'writing_type': writing.get_writing_type_display(),
             'object': writing
         })
 
+    # Progresslarni bitta so'rovda olib, darslarga qo'shish
+    apply_progress(all_lessons, get_module_progress(request.user, module))
+
     # Order bo'yicha tartiblash
     all_lessons.sort(key=lambda x: x['order'])
 
@@ -1970,5 +1427,169 @@ def module_detail(request, module_id):
 
     return render(request, 'module_detail.html', {
         'module': module,
-        'lessons': all_lessons
-    })
\ No newline at end of file
+        'lessons': all_lessons,
+        'progress_summary': get_module_summaries(request.user, [module.id]).get(module.id),
+    })
+
+
+# Katta video/audio fayllarni bo'laklab yuklash (faqat adminlar uchun)
+
+def chunked_upload_data(upload):
+    return {
+        'upload_id': str(upload.id),
+        'offset': upload.received,
+        'size': upload.size,
+        'status': upload.status,
+        'chunk_size': settings.UPLOAD_CHUNK_MAX_SIZE,
+        'file_name': upload.file_name,
+        'error': upload.error_message,
+    }
+
+
+@staff_member_required
+@require_http_methods(['POST'])
+def chunked_upload_start(request):
+    """Yuklashni boshlash yoki davom ettirish uchun offsetni olish.
+
+    JSON: {"target": "lesson"|"listening", "object_id", "filename", "size", "sha256"}
+    """
+    try:
+        data = json.loads(request.body)
+        upload = uploads.start_upload(
+            request.user, data.get('target'), int(data.get('object_id')),
+            os.path.basename(data.get('filename', '')), int(data.get('size')), str(data.get('sha256', '')),
+        )
+    except (ValueError, TypeError):
+        return JsonResponse({'success': False, 'error': "Noto'g'ri so'rov"}, status=400)
+    except uploads.UploadError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=e.status)
+
+    return JsonResponse({'success': True, **chunked_upload_data(upload)})
+
+
+@staff_member_required
+@require_http_methods(['GET', 'PUT'])
+def chunked_upload_chunk(request, upload_id):
+    """GET - holat (qayerdan davom ettirish). PUT - bo'lak, `Upload-Offset` headeri bilan."""
+    upload = get_object_or_404(ChunkedUpload, id=upload_id, user=request.user)
+
+    if request.method == 'GET':
+        return JsonResponse({'success': True, **chunked_upload_data(upload)})
+
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+        length = int(request.headers.get('Content-Length') or 0)
+        # Tana request.body orqali emas, oqim sifatida o'qiladi (xotiraga yuklanmaydi)
+        uploads.write_chunk(upload, offset, request, length)
+    except ValueError:
+        return JsonResponse({'success': False, 'error': "Upload-Offset headeri kerak"}, status=400)
+    except uploads.UploadError as e:
+        upload.refresh_from_db()
+        return JsonResponse({'success': False, 'error': str(e), **chunked_upload_data(upload)}, status=e.status)
+
+    return JsonResponse({'success': True, **chunked_upload_data(upload)})
+
+
+@staff_member_required
+@require_http_methods(['POST'])
+def chunked_upload_complete(request, upload_id):
+    """Faylni checksum tekshiruviga qo'yish. Tekshiruv davomida 202 qaytadi - holat GET
+    /chunk so'rovi bilan kuzatiladi ('complete' yoki 'failed')."""
+    upload = get_object_or_404(ChunkedUpload, id=upload_id, user=request.user)
+
+    try:
+        uploads.complete_upload(upload)
+    except uploads.UploadError as e:
+        return JsonResponse({'success': False, 'error': str(e), **chunked_upload_data(upload)}, status=e.status)
+
+    return JsonResponse({
+        'success': upload.status != 'failed',
+        'object_id': upload.object_id,
+        **chunked_upload_data(upload),
+    }, status=202 if upload.status == 'verifying' else 200)
+
+
+# Bir nechta dars natijalarini bitta so'rovda topshirish (mock imtihonlar)
+
+@csrf_exempt
+@login_required
+@require_http_methods(['POST'])
+def submit_batch(request):
+    """JSON: {"results": [{"type": "video"|"listening"|"reading", "id", "answers": {...}, "time_spent"}]}"""
+    try:
+        data = json.loads(request.body)
+        results = submissions.submit_batch(request.user, data.get('results'))
+    except (ValueError, AttributeError):
+        return JsonResponse({'success': False, 'error': "Noto'g'ri so'rov"}, status=400)
+    except submissions.SubmissionError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=e.status)
+
+    return JsonResponse({'success': True, 'results': results})
+
+
+# Prometheus metrikalari (barcha gunicorn workerlari bo'yicha jamlangan)
+@require_http_methods(['GET'])
+def prometheus_metrics(request):
+    # Token sozlanmagan bo'lsa /metrics faqat METRICS_PUBLIC bilan ochiq
+    if not settings.METRICS_ENABLED or not (settings.METRICS_TOKEN or settings.METRICS_PUBLIC):
+        raise Http404
+    if settings.METRICS_TOKEN and not constant_time_compare(
+            request.headers.get('Authorization', ''), f'Bearer {settings.METRICS_TOKEN}'):
+        return HttpResponse(status=401)
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+# Media fayllar (video/audio) - Range, ETag va X-Accel-Redirect bilan
+
+@login_required
+def serve_media(request, path):
+    """MEDIA_ROOT dagi faylni berish: 206 Partial Content, 304 va nginx offload.
+
+    Faqat dars materiallari va foydalanuvchining o'z yozuvlari beriladi, qolgani - 404.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Fayl topilmadi")
+    path = os.path.relpath(full_path, os.path.abspath(settings.MEDIA_ROOT)).replace(os.sep, '/')
+    if not media.can_serve(request.user, path) or not os.path.isfile(full_path):
+        raise Http404("Fayl topilmadi")
+
+    stat = os.stat(full_path)
+    etag = media.file_etag(stat)
+    validators = {'ETag': etag, 'Last-Modified': media.last_modified(stat), 'Accept-Ranges': 'bytes'}
+
+    if media.not_modified(request, stat, etag):
+        response = HttpResponseNotModified()
+        for header, value in validators.items():
+            response[header] = value
+        return response
+
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+
+    if settings.MEDIA_ACCEL_REDIRECT_PREFIX:
+        # Faylni nginx beradi (Range ham nginx tomonida)
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + quote(path)
+    else:
+        byte_range = None
+        if media.if_range_allows(request, stat, etag):
+            byte_range = media.parse_range(request.headers.get('Range'), stat.st_size)
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+
+        if byte_range is None:
+            response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(media.stream_range(full_path, start, end), status=206,
+                                             content_type=content_type)
+            response['Content-Length'] = str(end - start + 1)
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+
+    for header, value in validators.items():
+        response[header] = value
+    return response
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 import dj_database_url
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -50,7 +51,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'courses.metrics.MetricsMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'courses.query_budget.QueryBudgetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -127,6 +130,11 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MAX_UPLOAD_SIZE = 2000 * 1024 * 1024  # 2000MB
+UPLOAD_CHUNK_MAX_SIZE = 16 * 1024 * 1024  # bo'laklab yuklashda bitta bo'lak (16MB)
+
+# Production'da media fayllarni nginx bersin: masalan '/protected-media/' va nginx'da
+#   location /protected-media/ { internal; alias /path/to/media/; }
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get('MEDIA_ACCEL_REDIRECT_PREFIX', '')
 
 SPEAKING_MEDIA_ROOT = os.path.join(MEDIA_ROOT, 'speaking_feedback')
 os.makedirs(SPEAKING_MEDIA_ROOT, exist_ok=True)
@@ -140,3 +148,103 @@ LOGIN_URL = '/login/'
 # Audio settings
 MAX_SPEAKING_DURATION = 300  # 5 daqiqa
 MAX_AUDIO_SIZE = 10 * 1024 * 1024  # 10MB
+
+# Loglar: courses.* (bosqichlar vaqti - timing.py, stt, transcode, jobs) INFO darajasida konsolga.
+# Django standart sozlamasida INFO loglar tashlab yuboriladi.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {'format': '%(asctime)s %(levelname)s %(name)s %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'simple'},
+    },
+    'loggers': {
+        'courses': {
+            'handlers': ['console'],
+            'level': os.environ.get('COURSES_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+# Kesh sozlamalari
+MODULE_OUTLINE_CACHE_TIMEOUT = 60 * 60  # 1 soat
+ANSWER_KEY_CACHE_TIMEOUT = 60 * 60 * 24  # 1 kun
+
+# SQL so'rovlar statistikasi (courses/query_budget.py): X-DB-* sarlavhalari va N+1 logi
+QUERY_STATS_ENABLED = os.environ.get('QUERY_STATS_ENABLED', 'False') == 'True'
+QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT', 'False') == 'True'  # chegaradan oshsa xato
+QUERY_NPLUSONE_THRESHOLD = 5  # bir xil shakldagi so'rov shuncha marta takrorlansa - N+1 gumoni
+
+# Prometheus metrikalari (/metrics). Barcha jarayonlar (gunicorn workerlari va `manage.py run_workers`)
+# qiymatlarini bitta papkaga yozadi - prometheus_client import qilinishidan oldin o'rnatilishi kerak.
+# Web va worker alohida konteynerlarda (Render/Railway servislari) ishlasa, PROMETHEUS_MULTIPROC_DIR
+# ikkalasiga ulangan umumiy diskni ko'rsatishi shart - aks holda worker metrikalari /metrics da
+# ko'rinmaydi (`manage.py check --deploy` ogohlantiradi). Sozlanmagan bo'lsa - lokal vaqtinchalik papka.
+PROMETHEUS_MULTIPROC_DIR_CONFIGURED = 'PROMETHEUS_MULTIPROC_DIR' in os.environ
+PROMETHEUS_MULTIPROC_DIR = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR',
+                                                 os.path.join(tempfile.gettempdir(), 'edusulton-metrics'))
+os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True') == 'True'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')  # "Authorization: Bearer <token>"
+METRICS_PUBLIC = os.environ.get('METRICS_PUBLIC', 'False') == 'True'  # tokensiz ochiq /metrics (faqat lokal)
+
+# api/submit-batch/ - bitta so'rovdagi natijalar soni chegarasi
+BATCH_SUBMIT_MAX_ITEMS = 50
+
+# Fon vazifalari (speaking/writing tahlili) navbati
+AI_INLINE_WORKERS = int(os.environ.get('AI_INLINE_WORKERS', '2'))  # web jarayoni ichidagi worker oqimlari
+AI_WORKER_THREADS = int(os.environ.get('AI_WORKER_THREADS', '4'))  # manage.py run_workers uchun
+JOB_POLL_INTERVAL = 1.0  # soniya
+JOB_STALE_TIMEOUT = 10 * 60  # shu vaqtdan beri yangilanmagan vazifa qayta navbatga qo'yiladi
+WRITING_QUEUE_ENABLED = os.environ.get('WRITING_QUEUE_ENABLED', 'True') == 'True'
+STAGE_LATENCY_SAMPLE = 1000  # admin kechikish sahifasi: oxirgi shuncha urinish bo'yicha
+AI_MAX_CONCURRENT_CALLS = int(os.environ.get('AI_MAX_CONCURRENT_CALLS', '4'))  # bir vaqtdagi GigaChat so'rovlari
+
+# GigaChat
+GIGACHAT_CREDENTIALS = os.environ.get(
+    'GIGACHAT_CREDENTIALS',
+    'MDE5YWFjYWMtNTdmYi03NTMwLTg4MTctMTQwN2IwNTNlM2FmOjAwNmQ3ZGYwLTM4N2EtNGI2ZS05ODQxLWZhZjAyOTJjZTAyMw=='
+)
+GIGACHAT_MODEL = os.environ.get('GIGACHAT_MODEL', 'GigaChat')
+GIGACHAT_VERIFY_SSL_CERTS = False
+GIGACHAT_TIMEOUT = 60  # soniya
+
+# TTS (AI ovozli javobi) keshi - media/speaking_feedback
+TTS_CACHE_MAX_BYTES = int(os.environ.get('TTS_CACHE_MAX_BYTES', str(500 * 1024 * 1024)))  # 500MB
+TTS_CACHE_MAX_ENTRIES = int(os.environ.get('TTS_CACHE_MAX_ENTRIES', '10000'))
+
+# Dars videolarini HLS formatga o'girish (ffmpeg)
+FFMPEG_BINARY = os.environ.get('FFMPEG_BINARY', 'ffmpeg')
+FFPROBE_BINARY = os.environ.get('FFPROBE_BINARY', 'ffprobe')
+HLS_SEGMENT_SECONDS = 6
+HLS_POSTER_SECOND = 3  # poster kadri (soniya)
+HLS_RENDITIONS = [
+    {'name': '360p', 'height': 360, 'video_bitrate': '800k', 'audio_bitrate': '96k'},
+    {'name': '540p', 'height': 540, 'video_bitrate': '1400k', 'audio_bitrate': '128k'},
+    {'name': '720p', 'height': 720, 'video_bitrate': '2800k', 'audio_bitrate': '128k'},
+    {'name': '1080p', 'height': 1080, 'video_bitrate': '5000k', 'audio_bitrate': '160k'},
+]
+
+# Listening audiolarini siqish (ffmpeg)
+LISTENING_AUDIO_CODEC = 'aac'  # 'aac' (.m4a) yoki 'opus' (.webm)
+LISTENING_AUDIO_BITRATE = '64k'  # mono nutq uchun yetarli
+LISTENING_AUDIO_LOUDNORM = 'loudnorm=I=-16:TP=-1.5:LRA=11'
+LISTENING_WAVEFORM_PEAKS = 800
+
+# Speech-to-text: ovoz faolligi (VAD) bo'yicha segmentlash va parallel tanish
+STT_MAX_WORKERS = int(os.environ.get('STT_MAX_WORKERS', '4'))  # bitta audio uchun parallel so'rovlar
+STT_VAD_MIN_ENERGY = 300 ** 2  # jimlik deb hisoblanadigan eng yuqori energiya (16-bit RMS^2)
+STT_VAD_ENERGY_RATIO = 4.0  # shovqin darajasidan necha marta baland bo'lsa - nutq
+STT_VAD_MIN_SILENCE = 0.5  # segmentlarni ajratuvchi jimlik (soniya)
+STT_VAD_PADDING = 0.2  # segment atrofida qoldiriladigan zaxira (soniya)
+STT_SEGMENT_MIN_SECONDS = 0.3
+STT_SEGMENT_MAX_SECONDS = 15.0
+STT_MAX_FAILED_RATIO = 0.5  # shundan ko'p segment tanilmasa urinish xato bilan tugaydi
+STT_ENGINE = os.environ.get('STT_ENGINE', 'google')  # 'google' yoki 'vosk' (lokal CPU modeli)
+STT_VOSK_MODEL_PATH = os.environ.get('STT_VOSK_MODEL_PATH', '')  # masalan .../vosk-model-small-en-us-0.15
+STT_BATCH_SIZE = 8  # lokal modelda bitta guruhdagi segmentlar soni
+STT_VOSK_THREADS = int(os.environ.get('STT_VOSK_THREADS', str(os.cpu_count() or 2)))  # parallel dekodlash oqimlari
+STT_BATCH_WAIT = 0.05  # guruh yig'ish uchun kutish (soniya)
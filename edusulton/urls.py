@@ -1,7 +1,7 @@
 # edusulton/urls.py faylini to'liq quyidagicha yangilang:
 
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.contrib.auth import views as auth_views
 from courses import views
 from django.conf import settings
@@ -31,16 +31,28 @@ urlpatterns = [
     path('api/submit-listening-test/<int:listening_id>/', views.submit_listening_test, name='submit_listening_test'),
     path('api/process-speaking/', views.process_speaking, name='process_speaking'),
     path('api/speaking-attempt/<int:attempt_id>/', views.get_speaking_attempt, name='get_speaking_attempt'),
+    path('api/speaking-job/<int:attempt_id>/', views.speaking_job_status, name='speaking_job_status'),
 path('reading/<int:reading_id>/', views.reading_detail, name='reading_detail'),
     path('api/submit-reading-test/<int:reading_id>/', views.submit_reading_test, name='submit_reading_test'),
+    path('api/submit-batch/', views.submit_batch, name='submit_batch'),
     # Writing endpoints
     path('writing/<int:writing_id>/', views.writing_detail, name='writing_detail'),
     path('api/submit-writing/<int:writing_id>/', views.submit_writing, name='submit_writing'),
     path('api/writing-attempt/<int:attempt_id>/', views.get_writing_attempt, name='get_writing_attempt'),
+    # Katta fayllarni bo'laklab yuklash (adminlar uchun)
+    path('api/uploads/', views.chunked_upload_start, name='chunked_upload_start'),
+    path('api/uploads/<uuid:upload_id>/', views.chunked_upload_chunk, name='chunked_upload_chunk'),
+    path('api/uploads/<uuid:upload_id>/complete/', views.chunked_upload_complete, name='chunked_upload_complete'),
+    # Prometheus metrikalari
+    path('metrics', views.prometheus_metrics, name='metrics'),
 
 ]
 
-# DEBUG rejimida media va static fayllarni ko'rsatish
+# Media fayllar (video/audio) Range qo'llab-quvvatlashi bilan - har qanday rejimda
+urlpatterns += [
+    re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), views.serve_media, name='serve_media'),
+]
+
+# DEBUG rejimida static fayllarni ko'rsatish
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
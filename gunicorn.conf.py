@@ -0,0 +1,42 @@
+# gunicorn.conf.py - gunicorn ishga tushganda avtomatik o'qiladi
+#
+# Prometheus metrikalari har bir jarayonda alohida yig'iladi. Ular
+# PROMETHEUS_MULTIPROC_DIR papkasidagi fayllarga yoziladi va /metrics so'ralganda
+# barcha jarayonlar bo'yicha jamlanadi (courses/metrics.py). Papka settings.py da
+# o'rnatiladi va `manage.py run_workers` jarayoni bilan umumiy; master jarayon
+# ishga tushganda faqat to'xtagan jarayonlarning fayllari o'chiriladi.
+#
+# Web va worker alohida konteynerlarda bo'lsa PROMETHEUS_MULTIPROC_DIR umumiy diskda bo'lishi kerak
+# (settings.py).
+
+import os
+import tempfile
+
+# Workerlar fork qilinishidan oldin o'rnatiladi (settings.py dagi bilan bir xil)
+multiproc_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR',
+                                      os.path.join(tempfile.gettempdir(), 'edusulton-metrics'))
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def on_starting(server):
+    # Fayl nomlari: <metrika turi>_<pid>.db
+    os.makedirs(multiproc_dir, exist_ok=True)
+    for name in os.listdir(multiproc_dir):
+        pid = os.path.splitext(name)[0].rsplit('_', 1)[-1]
+        if pid.isdigit() and not process_alive(int(pid)):
+            os.remove(os.path.join(multiproc_dir, name))
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)